@@ -0,0 +1,116 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Preallocated epoch x satellite arrays used by extract_process_data.py to collect
+one hour of rows without growing Python lists.
+
+"""
+
+import numpy as np
+
+
+class EpochAccumulator:
+    """
+    Collects the per-epoch rows of one processed file (e.g. observationHH.json).
+
+    Every field (e.g. 'cn0_G1', 'VSG', 'elev_B') is a float array of shape
+    (numEpochs, numSats) allocated once from the number of raw files of the hour,
+    and each epoch writes its row in place. This replaces the list
+    concatenation ``cn0_G1 = cn0_G1 + row`` that copied the whole hour on every epoch.
+
+    Fields can also be views of a shared (numEpochs, planes, width) block, so that
+    a decoder can fill all the fields of an epoch with one assignment (see ubx_decode.py).
+    """
+
+    def __init__(self, numEpochs):
+        """
+        :param numEpochs: number of epochs (raw files) of the hour, rows to preallocate
+        """
+        self.numEpochs = numEpochs
+        self.arrays = {}
+        self.blocks = {}
+        self.fills = {}  # fill value of every field and block, to clear them
+        self.count = 0  # rows filled so far (highest epoch index + 1)
+
+    def add_field(self, name, numSats, fill=0.0):
+        """
+        Allocate a (numEpochs, numSats) array for a field.
+
+        :param name: field name as written in the output file, e.g. 'cn0_G1'
+        :param numSats: number of satellites (columns) of the constellation
+        :param fill: value of the rows that are never written
+        """
+        self.arrays[name] = np.full((self.numEpochs, numSats), fill, dtype=float)
+        self.fills[name] = fill
+
+    def add_block(self, name, layout, planes, width, fill=0.0):
+        """
+        Allocate a (numEpochs, planes, width) block and register its fields as views.
+
+        :param name: block name, e.g. 'obs'
+        :param layout: [(field name, block, plane, offset, numSats)], the entries of other blocks are skipped
+        :param planes: number of planes (fields laid out on the same columns)
+        :param width: number of columns of a plane
+        :param fill: value of the rows that are never written, a scalar or one value per plane
+        """
+        block = np.empty((self.numEpochs, planes, width), dtype=float)
+        block[...] = np.reshape(fill, (-1, 1))
+        self.blocks[name] = block
+        self.fills[name] = fill
+        for field, block_name, plane, offset, numSats in layout:
+            if block_name == name:
+                self.arrays[field] = block[:, plane, offset:offset + numSats]
+
+    def set_row(self, name, t, row):
+        """
+        Write the row of epoch t of a field.
+
+        :param name: field name
+        :param t: epoch index, from 0 to numEpochs - 1
+        :param row: values of the epoch, shape (numSats,) or (1, numSats)
+        """
+        self.arrays[name][t] = np.reshape(row, -1)
+        self._filled(t)
+
+    def block_row(self, name, t):
+        """
+        Return the writable (planes, width) row of epoch t of a block.
+
+        :param name: block name
+        :param t: epoch index, from 0 to numEpochs - 1
+        """
+        self._filled(t)
+        return self.blocks[name][t]
+
+    def block_rows(self, name, count):
+        """
+        Return the writable (count, planes, width) rows of a block, for the decoders that
+        fill several epochs at once (ubx_binary.py).
+
+        :param name: block name
+        :param count: number of epochs, from 1 to numEpochs
+        """
+        if count:
+            self._filled(count - 1)
+        return self.blocks[name][:count]
+
+    def clear(self):
+        """Reset all rows to their fill value, so that the arrays can collect the next chunk of epochs."""
+        for name, block in self.blocks.items():
+            block[...] = np.reshape(self.fills[name], (-1, 1))
+        for name, array in self.arrays.items():
+            if name in self.fills:
+                array[...] = self.fills[name]
+        self.count = 0
+
+    def _filled(self, t):
+        if t >= self.count:
+            self.count = t + 1
+
+    def get(self, name):
+        """Return the filled rows of a field as a (count, numSats) array."""
+        return self.arrays[name][:self.count]
+
+    def tolist(self, name):
+        """Return the filled rows of a field as a list of rows, as stored in the JSON files."""
+        return self.get(name).tolist()
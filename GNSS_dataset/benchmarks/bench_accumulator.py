@@ -0,0 +1,77 @@
+"""
+Benchmark of the per-hour accumulation of observationHH.json / satelliteInfomationHH.json rows.
+
+Compares the list concatenation used before (``cn0_G1 = cn0_G1 + row`` for every
+field and epoch, O(T^2) copies) with the preallocated EpochAccumulator arrays.
+
+Run from "./GNSS dataset/":
+    python benchmarks/bench_accumulator.py --epochs 3600
+"""
+
+import argparse, os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from accumulator import EpochAccumulator
+from extract_process_data import RAX_CONSTELLATIONS, RAX_FIELDS, SAT_CONSTELLATIONS, SAT_FIELDS
+
+
+def product_fields(product):
+    """Return [(field name, number of satellites)] of the 'rax' or 'sat' product."""
+    if product == 'rax':
+        fields = []
+        for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS:
+            fields.append(('VS%s' % const, numSats))
+            for band in ('1', '2'):
+                fields += [('%s_%s%s' % (field, const, band), numSats) for field in RAX_FIELDS]
+        return fields
+    return [('%s_%s' % (field, const), numSats) for const, gnssId, numSats in SAT_CONSTELLATIONS for field in SAT_FIELDS]
+
+
+def run_lists(fields, rows):
+    """Accumulation as done before: one list per field grown by concatenation."""
+    lists = {name: [] for name, numSats in fields}
+    for t in range(len(rows)):
+        for name, numSats in fields:
+            lists[name] = lists[name] + np.ndarray.tolist(rows[t][name])
+    return lists
+
+
+def run_accumulator(fields, rows):
+    """Accumulation with preallocated (T, numSats) arrays."""
+    acc = EpochAccumulator(len(rows))
+    for name, numSats in fields:
+        acc.add_field(name, numSats)
+    for t in range(len(rows)):
+        for name, numSats in fields:
+            acc.set_row(name, t, rows[t][name])
+    return {name: acc.tolist(name) for name, numSats in fields}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, default=3600, help='epochs of the simulated hour (1 Hz -> 3600)')
+    parser.add_argument('--products', nargs='+', choices=['rax', 'sat'], default=['rax', 'sat'])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for product in args.products:
+        fields = product_fields(product)
+        # rows as returned by read_single_rax / read_single_sat: (1, numSats) arrays
+        rows = [{name: rng.random((1, numSats)) for name, numSats in fields} for _ in range(args.epochs)]
+
+        t0 = time.perf_counter()
+        before = run_lists(fields, rows)
+        t_before = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        after = run_accumulator(fields, rows)
+        t_after = time.perf_counter() - t0
+        assert before == after, 'accumulated values differ'
+
+        print('%s: %d fields x %d epochs | list concatenation %.2f s | EpochAccumulator %.2f s | speedup x%.1f'
+              % (product, len(fields), args.epochs, t_before, t_after, t_before / max(t_after, 1e-9)))
+
+
+if __name__ == '__main__':
+    main()
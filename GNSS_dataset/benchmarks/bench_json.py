@@ -0,0 +1,54 @@
+"""
+Benchmark of the JSON parsing backends (json_backend.py) on a synthetic hour of RXM-RAWX files.
+
+Every installed backend parses the same files (read from disk once, so that only
+the parsing is timed) and must return the same content as the standard library.
+
+Run from "./GNSS dataset/":
+    python benchmarks/bench_json.py --epochs 3600
+"""
+
+import argparse, os, shutil, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+from synthetic_data import raw_dir, write_hour
+import json_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, default=3600, help='RXM-RAWX files of the simulated hour')
+    parser.add_argument('--repeat', type=int, default=3, help='best of N passes')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='gnss-bench-')
+    try:
+        write_hour(root, 12, 14, args.epochs, ['RXM-RAWX'])
+        folder = raw_dir(root, 12, 14, 'RXM-RAWX')
+        blobs = []
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name), 'rb') as f:
+                blobs.append(f.read())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    megabytes = sum(len(blob) for blob in blobs) / 1e6
+
+    reference = None
+    print('%-10s %10s %10s %8s' % ('backend', 'files/s', 'MB/s', 'speedup'))
+    for name in ['json'] + [b for b in json_backend.available_backends() if b != 'json']:
+        json_backend.set_backend(name)
+        best = float('inf')
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            contents = [json_backend.loads(blob) for blob in blobs]
+            best = min(best, time.perf_counter() - t0)
+        if reference is None:
+            reference, t_json = contents, best
+        assert contents == reference, '%s returns different content' % name
+        print('%-10s %10.0f %10.1f %7.1fx' % (name, len(blobs) / best, megabytes / best, t_json / best))
+
+
+if __name__ == '__main__':
+    main()
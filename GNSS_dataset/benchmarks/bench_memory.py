@@ -0,0 +1,74 @@
+"""
+Benchmark of the peak memory of extract_process_data.py for short and long hours.
+
+Synthetic RXM-RAWX / NAV-SAT hours of increasing length are extracted in a fresh
+child process, once holding the whole hour in memory and once in streaming mode
+(chunk_size epochs at a time). The peak RSS of the child should grow with the
+number of epochs in the first case and stay flat in the second one.
+
+Run from "./GNSS dataset/":
+    python benchmarks/bench_memory.py --epochs 600 3600 --chunk-size 256
+    python benchmarks/bench_memory.py --epochs 3600 86400 --products rax
+"""
+
+import argparse, os, resource, shutil, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from synthetic_data import write_hour
+
+SRC_DIR = os.path.dirname(HERE)
+MSGS = {'rax': 'RXM-RAWX', 'sat': 'NAV-SAT'}
+
+
+def child(product, chunk_size, formats):
+    """Extract day 12 hour 14 from the current folder and print wall time and peak RSS (MB)."""
+    sys.path.insert(0, SRC_DIR)
+    from extract_process_data import PRODUCTS
+    t0 = time.perf_counter()
+    PRODUCTS[product]([12], [14], verbose=False, formats=formats, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KB on Linux
+    print('%.3f %.1f' % (elapsed, peak))
+
+
+def run_child(cwd, product, chunk_size, formats):
+    """Run child() in a fresh interpreter, return (wall time s, peak RSS MB)."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', product, '--chunk-size', str(chunk_size or 0),
+           '--formats'] + list(formats)
+    out = subprocess.run(cmd, cwd=cwd, check=True, capture_output=True, text=True).stdout
+    elapsed, peak = out.split()[-2:]
+    return float(elapsed), float(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, nargs='+', default=[600, 3600],
+                        help='epochs of the simulated hours (86400 simulates one day of 1 Hz data)')
+    parser.add_argument('--products', nargs='+', choices=sorted(MSGS), default=['rax', 'sat'])
+    parser.add_argument('--chunk-size', type=int, default=256, help='epochs per chunk of the streaming mode')
+    parser.add_argument('--formats', nargs='+', default=['json'])
+    parser.add_argument('--child', choices=sorted(MSGS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.chunk_size or None, tuple(args.formats))
+        return
+
+    print('%-4s %8s %12s %10s %10s' % ('', 'epochs', 'mode', 'time (s)', 'peak (MB)'))
+    for epochs in args.epochs:
+        root = tempfile.mkdtemp(prefix='gnss-bench-')
+        try:
+            cwd = os.path.join(root, 'GNSS_dataset')
+            os.makedirs(cwd)
+            write_hour(root, 12, 14, epochs, [MSGS[product] for product in args.products])
+            for product in args.products:
+                for chunk_size in (None, args.chunk_size):
+                    elapsed, peak = run_child(cwd, product, chunk_size, args.formats)
+                    mode = 'chunk %d' % chunk_size if chunk_size else 'whole hour'
+                    print('%-4s %8d %12s %10.2f %10.1f' % (product, epochs, mode, elapsed, peak))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark of the whole pipeline on a synthetic hour: extraction of the three products
+(main_code_rax, main_code_sat, main_code_pvt), the same three products extracted from
+a binary UBX log of the hour (ubx_binary.py, stage 'ubx') and the graphics.py plotters.
+
+Every stage runs in a fresh child process on the same synthetic hour (all the raw
+messages of synthetic_data.py), and reports its wall time, the files it reads per
+second, the epochs per second and the peak RSS of the child. Results can be saved
+as JSON and compared with an earlier run to track regressions and speedups.
+
+Run from "./GNSS dataset/":
+    python benchmarks/bench_suite.py --epochs 3600
+    python benchmarks/bench_suite.py --epochs 3600 --formats npz --save before.json
+    python benchmarks/bench_suite.py --epochs 3600 --formats npz --baseline before.json
+"""
+
+import argparse, json, os, platform, resource, shutil, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from synthetic_data import ALL_MSGS, write_hour
+
+SRC_DIR = os.path.dirname(HERE)
+DAY, HOUR = 12, 14
+EXTRACT_STAGES = ['rax', 'sat', 'pvt']
+UBX_STAGE = 'ubx'
+UBX_LOG = os.path.join('..', 'synthetic.ubx')  # next to GNSS_dataset/ in the benchmark folder
+PLOT_STAGES = ['skyplot', 'cno', 'doppler', 'pvt_plots']
+STAGES = EXTRACT_STAGES + [UBX_STAGE] + PLOT_STAGES
+
+
+def child(stage, formats, chunk_size):
+    """Run one stage on day 12 hour 14 of the current folder, print files read, wall time and peak RSS (MB)."""
+    sys.path.insert(0, SRC_DIR)
+    if stage in EXTRACT_STAGES:
+        from extract_process_data import PRODUCT_MESSAGES, PRODUCTS
+        from raw_source import open_source
+        source = open_source()
+        files = sum(len(source.names(DAY, HOUR, msg)) for msg in PRODUCT_MESSAGES[stage])
+        t0 = time.perf_counter()
+        PRODUCTS[stage]([DAY], [HOUR], verbose=False, formats=formats, chunk_size=chunk_size)
+    elif stage == UBX_STAGE:
+        from ubx_binary import extract_ubx
+        files = 1
+        t0 = time.perf_counter()
+        extract_ubx(UBX_LOG, EXTRACT_STAGES, formats, verbose=False)
+    else:
+        import matplotlib
+        matplotlib.use('Agg')
+        import graphics
+        from processed_io import PROCESSED_DIR, find_product, load_product
+        base = os.path.join(PROCESSED_DIR, str(DAY))
+        needed = {'skyplot': ['satelliteInfomation'], 'cno': ['observation', 'satelliteInfomation'],
+                  'doppler': ['observation', 'satelliteInfomation'], 'pvt_plots': ['pvtSolution']}[stage]
+        paths = [find_product(base, item, HOUR) for item in needed]
+        files = len(paths)
+        out = lambda name: os.path.join(base, '%s_%02d.png' % (name, HOUR))
+        t0 = time.perf_counter()
+        data = dict(zip(needed, [load_product(path) for path in paths]))
+        if stage == 'skyplot':
+            graphics.plot_skyplot(data['satelliteInfomation'], HOUR, out_png=out('skyplot'))
+        elif stage == 'cno':
+            graphics.plot_cno_time(data['observation'], data['satelliteInfomation'], HOUR, out_png=out('cno'))
+        elif stage == 'doppler':
+            graphics.plot_doppler_time(data['observation'], data['satelliteInfomation'], HOUR, out_png=out('doppler'))
+        else:
+            graphics.plot_pvt_and_accuracy(data['pvtSolution'], HOUR, out_png_traj=out('trajectory'),
+                                           out_png_acc=out('accuracy'))
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KB on Linux
+    print('%d %.4f %.1f' % (files, elapsed, peak))
+
+
+def run_child(cwd, stage, formats, chunk_size):
+    """Run child() in a fresh interpreter, return (files read, wall time s, peak RSS MB)."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', stage, '--chunk-size', str(chunk_size or 0),
+           '--formats'] + list(formats)
+    out = subprocess.run(cmd, cwd=cwd, check=True, capture_output=True, text=True).stdout
+    files, elapsed, peak = out.split()[-3:]
+    return int(files), float(elapsed), float(peak)
+
+
+def run_suite(epochs, stages, formats, chunk_size, repeat):
+    """
+    Generate a synthetic hour and time the stages on it.
+
+    :return: {stage: {'epochs', 'files', 'time', 'files_per_s', 'epochs_per_s', 'peak_mb'}},
+             best wall time of `repeat` runs, the largest peak RSS
+    """
+    results = {}
+    root = tempfile.mkdtemp(prefix='gnss-bench-')
+    try:
+        cwd = os.path.join(root, 'GNSS_dataset')
+        os.makedirs(cwd)
+        write_hour(root, DAY, HOUR, epochs, ALL_MSGS,
+                   ubx=os.path.join(cwd, UBX_LOG) if UBX_STAGE in stages else None)
+        # the plotters read the processed files: extract them first even when their stage is not timed
+        if set(stages) & set(PLOT_STAGES):
+            for stage in EXTRACT_STAGES:
+                if stage not in stages:
+                    run_child(cwd, stage, formats, chunk_size)
+        for stage in sorted(stages, key=STAGES.index):
+            runs = [run_child(cwd, stage, formats, chunk_size) for _ in range(repeat)]
+            files = runs[0][0]
+            elapsed = min(run[1] for run in runs)
+            results[stage] = {'epochs': epochs, 'files': files, 'time': elapsed,
+                              'files_per_s': files / elapsed, 'epochs_per_s': epochs / elapsed,
+                              'peak_mb': max(run[2] for run in runs)}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, default=3600, help='epochs of the simulated hour')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--formats', nargs='+', default=['json'], help='formats written by the extraction')
+    parser.add_argument('--chunk-size', type=int, default=0, help='streaming mode of rax/sat, 0: whole hour')
+    parser.add_argument('--repeat', type=int, default=1, help='best of N runs of every stage')
+    parser.add_argument('--save', default=None, help='write the results to a JSON file')
+    parser.add_argument('--baseline', default=None, help='JSON file of an earlier run to compare with')
+    parser.add_argument('--child', choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, tuple(args.formats), args.chunk_size or None)
+        return
+
+    results = run_suite(args.epochs, args.stages, tuple(args.formats), args.chunk_size or None, args.repeat)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    print('%-10s %8s %7s %10s %10s %10s %10s %8s' % ('stage', 'epochs', 'files', 'time (s)', 'files/s', 'epochs/s',
+                                                     'peak (MB)', 'speedup'))
+    for stage, r in results.items():
+        speedup = '%7.2fx' % (baseline[stage]['time'] / r['time']) if stage in baseline else ''
+        print('%-10s %8d %7d %10.2f %10.0f %10.0f %10.1f %8s' % (stage, r['epochs'], r['files'], r['time'],
+                                                                 r['files_per_s'], r['epochs_per_s'], r['peak_mb'],
+                                                                 speedup))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'formats': list(args.formats), 'chunk_size': args.chunk_size, 'results': results}, f, indent=2)
+        print('[OK] %s' % args.save)
+
+
+if __name__ == '__main__':
+    main()
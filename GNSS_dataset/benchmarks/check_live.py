@@ -0,0 +1,108 @@
+"""
+Regression check of live_ingest.py on a synthetic hour replayed at full speed.
+
+  clean      the hour replayed through the live mode gives files identical to
+             extract_process_data.py
+  malformed  one RXM-RAWX, NAV-SAT and MON-SPAN file each lack a key, and one NAV-CLOCK file
+             lacks clkB: those files are skipped, and every product keeps recordTime aligned
+             with its rows. The observation, satellite and spectrum epochs equal the clean
+             ones without the skipped epochs. The PVT epoch of the NAV-CLOCK file stays,
+             with NaN in the NAV-CLOCK fields.
+
+Run from "./GNSS dataset/":
+    python benchmarks/check_live.py
+"""
+
+import argparse, filecmp, json, os, shutil, subprocess, sys, tempfile
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, SRC_DIR)
+from synthetic_data import ALL_MSGS, write_hour
+from processed_io import load_product
+
+DAY, HOUR = 12, 14
+PRODUCTS = ['rax', 'sat', 'pvt', 'span']
+ITEMS = {'RXM-RAWX': 'observation', 'NAV-SAT': 'satelliteInfomation', 'MON-SPAN': 'spectrum'}
+# file index and key removed from it in the malformed hour
+MALFORMED = {'RXM-RAWX': (50, 'cno_04'), 'NAV-SAT': (60, 'elev_04'), 'MON-SPAN': (70, 'pga_02'),
+             'NAV-CLOCK': (80, 'clkB')}
+
+
+def run(root, name, script, raw, extra=()):
+    """Run a script of the repository in its own folder on a raw folder, return its 'processed data/<day>'."""
+    cwd = os.path.join(root, 'run_' + name)
+    os.makedirs(cwd)
+    cmd = [sys.executable, os.path.join(SRC_DIR, script), '--products'] + PRODUCTS + \
+          ['--formats', 'json', 'npz', '--raw', raw] + list(extra)
+    subprocess.run(cmd, cwd=cwd, check=True, capture_output=True, text=True)
+    return os.path.join(cwd, 'processed data', str(DAY))
+
+
+def malform(raw):
+    """Remove the MALFORMED keys from their files, return {msg: index of the file}."""
+    for msg, (index, key) in MALFORMED.items():
+        folder = os.path.join(raw, str(DAY), str(HOUR), msg)
+        path = os.path.join(folder, sorted(os.listdir(folder))[index])
+        with open(path, 'r', encoding='utf-8') as f:
+            content = json.load(f)
+        del content[key]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+    return {msg: index for msg, (index, key) in MALFORMED.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, default=120, help='epochs of the synthetic hour')
+    args = parser.parse_args()
+
+    failures = []
+    root = tempfile.mkdtemp(prefix='gnss-live-')
+    try:
+        raw = os.path.join(root, 'GNSS_Dataset', 'Raw_data')
+        write_hour(root, DAY, HOUR, args.epochs, ALL_MSGS)
+        replay = ['--replay', str(DAY), str(HOUR), '--speed', '0', '--quiet']
+        batch = run(root, 'batch', 'extract_process_data.py', raw, ['--days', str(DAY), '--hours', str(HOUR)])
+        live = run(root, 'live', 'live_ingest.py', raw, replay)
+        match, mismatch, errors = filecmp.cmpfiles(batch, live, sorted(os.listdir(batch)), shallow=False)
+        if mismatch or errors:
+            failures.append('clean: files differing from extract_process_data.py: %s' % ', '.join(mismatch + errors))
+
+        bad_raw = os.path.join(root, 'malformed', 'Raw_data')
+        shutil.copytree(raw, bad_raw)
+        skipped = malform(bad_raw)
+        bad = run(root, 'malformed', 'live_ingest.py', bad_raw, replay)
+        for item in ['observation', 'satelliteInfomation', 'pvtSolution', 'spectrum']:
+            path = os.path.join(bad, '%s%s.npz' % (item, HOUR))
+            content = load_product(path)
+            lengths = {key: len(value) for key, value in content.items()}
+            if len(set(lengths.values())) != 1:
+                failures.append('malformed: %s keys of different lengths: %s' % (item, sorted(set(lengths.values()))))
+                continue
+            clean = load_product(os.path.join(batch, '%s%s.npz' % (item, HOUR)))
+            msg = next((msg for msg, name in ITEMS.items() if name == item), None)
+            for key, value in content.items():
+                expected = np.delete(np.asarray(clean[key]), skipped[msg], axis=0) if msg else np.asarray(clean[key])
+                if key in ('clkB', 'clkD', 'tAcc', 'fAcc'):
+                    expected = expected.astype(float)
+                    expected[skipped['NAV-CLOCK']] = np.nan
+                if not np.array_equal(np.asarray(value), expected, equal_nan=value.dtype.kind == 'f'):
+                    failures.append('malformed: %s %s differs from the clean epochs' % (item, key))
+                    break
+    except subprocess.CalledProcessError as e:
+        failures.append('%s: %s' % (' '.join(e.cmd[1:3]), e.stderr))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print('clean     %s' % ('FAILED' if any(f.startswith('clean') for f in failures) else 'ok'))
+    print('malformed %s' % ('FAILED' if any(f.startswith('malformed') for f in failures) else 'ok'))
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Regression check of the raw sources (raw_source.py) on a synthetic hour. The hour is
+extracted by extract_process_data.py from its folder, from raw_pack.py packs, and from
+.zip and .tar.gz archives of it. Every processed file must be identical to the one
+extracted from the folder, and every unit must be recorded in the manifest. Every
+source is also read and released directly, as read_raw_data.RawReader does.
+
+Run from "./GNSS dataset/":
+    python benchmarks/check_sources.py
+    python benchmarks/check_sources.py --epochs 600 --workers 2
+"""
+
+import argparse, filecmp, json, os, shutil, subprocess, sys, tarfile, tempfile, zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, SRC_DIR)
+from synthetic_data import ALL_MSGS, write_hour
+from raw_pack import hour_folders, pack_folder
+from raw_source import open_source
+from read_raw_data import RawReader
+
+DAY, HOUR = 12, 14
+PRODUCTS = ['rax', 'sat', 'pvt', 'span']
+
+
+def make_sources(root, epochs):
+    """Write the synthetic hour in every form read by raw_source.open_source: {name: path}."""
+    raw = os.path.join(root, 'GNSS_Dataset', 'Raw_data')
+    write_hour(root, DAY, HOUR, epochs, ALL_MSGS)
+    packed = os.path.join(root, 'packed', 'Raw_data')
+    shutil.copytree(raw, packed)
+    for msg, folder in hour_folders(packed, DAY, HOUR):
+        pack_folder(folder, remove=True)
+    zip_path = os.path.join(root, 'raw.zip')
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for dirpath, dirnames, filenames in os.walk(raw):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                zf.write(path, os.path.relpath(path, os.path.dirname(raw)))
+    tar_path = os.path.join(root, 'raw.tar.gz')
+    with tarfile.open(tar_path, 'w:gz') as tf:
+        tf.add(raw, arcname='Raw_data')
+    return {'folder': raw, 'pack': packed, 'zip': zip_path, 'tar': tar_path}
+
+
+def extract(root, name, raw, workers):
+    """Run extract_process_data.py on one source in its own folder, return that folder's 'processed data'."""
+    cwd = os.path.join(root, 'run_' + name)
+    os.makedirs(cwd)
+    cmd = [sys.executable, os.path.join(SRC_DIR, 'extract_process_data.py'), '--days', str(DAY), '--hours', str(HOUR),
+           '--products'] + PRODUCTS + ['--formats', 'json', 'npz', '--raw', raw, '--workers', str(workers)]
+    subprocess.run(cmd, cwd=cwd, check=True, capture_output=True, text=True)
+    return os.path.join(cwd, 'processed data')
+
+
+def check_release(raw):
+    """Read one file of every message from a source and release it, directly and through RawReader."""
+    source = open_source(raw)
+    for msg in ALL_MSGS:
+        source.read(DAY, HOUR, msg, source.names(DAY, HOUR, msg)[0])
+        source.release(DAY, HOUR, msg)
+    reader = RawReader(raw)
+    for msg in ALL_MSGS:
+        reader.index(DAY, HOUR, msg)
+    reader.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--epochs', type=int, default=120, help='epochs of the synthetic hour')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes of extract_process_data.py')
+    args = parser.parse_args()
+
+    failures = []
+    root = tempfile.mkdtemp(prefix='gnss-sources-')
+    try:
+        sources = make_sources(root, args.epochs)
+        reference = None
+        for name, raw in sources.items():
+            try:
+                check_release(raw)
+                processed = extract(root, name, raw, args.workers)
+            except Exception as e:
+                failures.append('%s: %s' % (name, getattr(e, 'stderr', None) or repr(e)))
+                continue
+            with open(os.path.join(processed, 'manifest.json'), 'r', encoding='utf-8') as f:
+                units = json.load(f)['units']
+            missing = ['%s/%s/%s' % (product, DAY, HOUR) for product in PRODUCTS
+                       if '%s/%s/%s' % (product, DAY, HOUR) not in units]
+            if missing:
+                failures.append('%s: units missing from the manifest: %s' % (name, ', '.join(missing)))
+            day_dir = os.path.join(processed, str(DAY))
+            if reference is None:
+                reference = day_dir
+                continue
+            files = sorted(os.listdir(reference))
+            match, mismatch, errors = filecmp.cmpfiles(reference, day_dir, files, shallow=False)
+            if mismatch or errors:
+                failures.append('%s: files differing from the folder source: %s' % (name, ', '.join(mismatch + errors)))
+        for name in sources:
+            print('%-6s %s' % (name, 'FAILED' if any(f.startswith(name + ':') for f in failures) else 'ok'))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+"""
+Synthetic raw UBX-JSON hours for the benchmarks, laid out as the real dataset:
+
+    <root>/GNSS_Dataset/Raw_data/<day>/<hour>/<MSG>/<YYYY-MM-DD HH-MM-SS>.json
+
+Only the keys read by the scripts of "./GNSS dataset/" are written, with the units of the
+UBX protocol (lat/lon deg, height/hMSL/hAcc/vAcc mm, velocities mm/s, ecefX/Y/Z cm,
+clkB ns, clkD ns/s, elev/azim deg). The messages of an epoch share one sky: every satellite
+of the hour moves slowly in elevation and azimuth, is used above MIN_USED_ELEV, and its
+C/N0, pseudorange, Doppler and NAV-DOP follow from that geometry.
+
+The values have the resolution of the UBX protocol (e.g. lat/lon 1e-7 deg, prRes 0.1 m,
+doMes float32), so --ubx can also write the same epochs as a binary UBX log, with one NMEA
+sentence between the epochs as in a u-center recording, that ubx_binary.py decodes to the
+same processed files.
+
+Interference and spoofing can be injected as (start second, duration) intervals:
+  - jamming: C/N0 drops by JAM_CNO_DROP dB (signals below MIN_TRACKED_CNO are lost),
+             MON-SPAN shows a CW peak over a raised floor, hAcc/vAcc grow
+  - spoofing: at capture the receiver clock steps by SPOOF_CLOCK_STEP ns and the position
+              jumps by SPOOF_JUMP m, then it is dragged north at SPOOF_DRAG m/s; the
+              pseudoranges follow the false position but the Dopplers do not
+
+Run from "./GNSS dataset/":
+    python benchmarks/synthetic_data.py --root /tmp/synthetic --day 12 --hour 14 --epochs 3600
+    python benchmarks/synthetic_data.py --root /tmp/synthetic --msgs RXM-RAWX NAV-SAT MON-SPAN
+    python benchmarks/synthetic_data.py --root /tmp/synthetic --jamming 600 120 --spoofing 1800 600
+    python benchmarks/synthetic_data.py --root /tmp/synthetic --ubx /tmp/synthetic/rooftop.ubx
+"""
+
+import argparse, json, os, struct
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# (gnssId, number of satellites, sigIds of the two bands), gnssId 1 (SBAS) is not extracted
+CONSTELLATIONS = [(0, 32, (0, 3)), (2, 36, (0, 6)), (3, 63, (0, 2)), (5, 10, (0, 5)), (6, 33, (0, 2)), (1, 3, (0,))]
+SATS_PER_CONSTELLATION = 8
+MIN_USED_ELEV = 10  # deg
+
+# carrier frequency (Hz) of the (gnssId, sigId) signals above, GLONASS at its FDMA channel 0
+CARRIERS = {(0, 0): 1575.42e6, (0, 3): 1227.60e6, (2, 0): 1575.42e6, (2, 6): 1207.14e6,
+            (3, 0): 1561.098e6, (3, 2): 1207.14e6, (5, 0): 1575.42e6, (5, 5): 1227.60e6,
+            (6, 0): 1602.0e6, (6, 2): 1246.0e6, (1, 0): 1575.42e6}
+SPEED_OF_LIGHT = 299792458.0
+EARTH_RADIUS = 6371e3
+ORBIT_HEIGHT = 20200e3
+
+# receiver on the roof of the Yunnan University campus
+STATION_LLA = (25.0553, 102.6993, 1950.0)  # lat deg, lon deg, ellipsoidal height m
+GEOID_SEPARATION = -32.0  # m
+
+# MON-SPAN: (center, span, resolution) in Hz of the two RF blocks of a ZED-F9P
+SPAN_BLOCKS = [(1583.4e6, 128e6, 500e3), (1228.0e6, 128e6, 500e3)]
+SPAN_BINS = 256
+
+JAM_CNO_DROP = 15  # dB-Hz
+MIN_TRACKED_CNO = 20  # dB-Hz
+SPOOF_CLOCK_STEP = 2000.0  # ns
+SPOOF_JUMP = 25.0  # m, north
+SPOOF_DRAG = 1.0  # m/s, north
+
+
+def raw_dir(root, day, hour, msg):
+    """Folder of the raw files of one message, as read by extract_process_data.py."""
+    return os.path.join(root, 'GNSS_Dataset', 'Raw_data', str(day), str(hour), msg)
+
+
+def _blocks(content, rows):
+    """Flatten the repeated blocks [{'svId': 5, ...}, ...] into content as 'svId_01', ..."""
+    for i, row in enumerate(rows, 1):
+        for key, value in row.items():
+            content['%s_%02d' % (key, i)] = value
+
+
+def lla_to_ecef(lat, lon, height):
+    """WGS84 geodetic (deg, deg, m) to ECEF (m)."""
+    a, f = 6378137.0, 1 / 298.257223563
+    e2 = f * (2 - f)
+    lat, lon = np.radians(lat), np.radians(lon)
+    n = a / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    return ((n + height) * np.cos(lat) * np.cos(lon), (n + height) * np.cos(lat) * np.sin(lon),
+            (n * (1 - e2) + height) * np.sin(lat))
+
+
+def slant_range(elev):
+    """Distance (m) from the receiver to a satellite at ORBIT_HEIGHT seen at elevation elev (deg)."""
+    s = np.sin(np.radians(elev))
+    r = EARTH_RADIUS + ORBIT_HEIGHT
+    return np.sqrt((EARTH_RADIUS * s) ** 2 + r ** 2 - EARTH_RADIUS ** 2) - EARTH_RADIUS * s
+
+
+def dop(elev, azim):
+    """(gDOP, pDOP, tDOP, vDOP, hDOP, nDOP, eDOP) of the satellites at elev/azim (deg), NaN below 4."""
+    if len(elev) < 4:
+        return (float('nan'),) * 7
+    e, a = np.radians(elev), np.radians(azim)
+    geometry = np.column_stack([np.cos(e) * np.sin(a), np.cos(e) * np.cos(a), np.sin(e), np.ones(len(e))])
+    q = np.linalg.inv(geometry.T @ geometry)
+    east, north, up, clock = np.diag(q)
+    return tuple(float(np.sqrt(v)) for v in
+                 (east + north + up + clock, east + north + up, clock, up, east + north, north, east))
+
+
+class Sky:
+    """
+    Satellites of a synthetic hour: SATS_PER_CONSTELLATION per constellation, each one
+    starting at a random elevation/azimuth and drifting a few degrees per hour.
+    """
+
+    def __init__(self, rng):
+        self.sats = [(g, int(sv), sigs) for g, numSats, sigs in CONSTELLATIONS
+                     for sv in np.sort(rng.choice(np.arange(1, numSats + 1), min(numSats, SATS_PER_CONSTELLATION),
+                                                  replace=False))]
+        n = len(self.sats)
+        self.elev0 = rng.uniform(0, 85, n)
+        self.azim0 = rng.uniform(0, 360, n)
+        self.elev_rate = rng.uniform(-8, 8, n) / 3600  # deg/s
+        self.azim_rate = rng.uniform(-15, 15, n) / 3600
+        self.cno_offset = rng.normal(0, 2, n)
+
+    def at(self, k):
+        """elev (deg), azim (deg) and range rate (m/s) of every satellite at second k."""
+        elev = np.clip(self.elev0 + self.elev_rate * k, -5, 90)
+        azim = (self.azim0 + self.azim_rate * k) % 360
+        rate = slant_range(np.clip(elev + self.elev_rate, -5, 90)) - slant_range(elev)
+        return elev, azim, rate
+
+
+def _inside(k, interval):
+    return interval is not None and interval[0] <= k < interval[0] + interval[1]
+
+
+def _epoch_state(rng, sky, k, jamming=None, spoofing=None):
+    """Values shared by the messages of epoch k."""
+    elev, azim, rate = sky.at(k)
+    jammed = _inside(k, jamming)
+    cno = np.clip(np.round(28 + 18 * np.sin(np.radians(np.maximum(elev, 0))) + sky.cno_offset
+                           + rng.normal(0, 1, len(elev)) - (JAM_CNO_DROP if jammed else 0)), 0, 60).astype(int)
+    visible = (elev > 0) & (cno >= MIN_TRACKED_CNO)
+    used = visible & (elev >= MIN_USED_ELEV)
+    clkB = 4.0e5 + 12.0 * k  # ns, free-running oscillator drifting 12 ns/s
+    north = 0.0  # m, false position of the spoofer
+    if _inside(k, spoofing):
+        clkB += SPOOF_CLOCK_STEP
+        north = SPOOF_JUMP + SPOOF_DRAG * (k - spoofing[0])
+    return {'elev': elev, 'azim': azim, 'rate': rate, 'visible': visible, 'used': used, 'cno': cno,
+            'clkB': clkB, 'clkD': 12.0, 'dop': dop(elev[used], azim[used]), 'numSV': int(used.sum()),
+            'jammed': jammed, 'north': north}
+
+
+def line_of_sight_north(state, i):
+    """North component of the unit vector towards satellite i."""
+    return np.cos(np.radians(state['elev'][i])) * np.cos(np.radians(state['azim'][i]))
+
+
+def rawx_epoch(rng, start_time, sky, state):
+    """RXM-RAWX content of one epoch."""
+    clock_m = state['clkB'] * 1e-9 * SPEED_OF_LIGHT
+    rows = []
+    for i, (g, sv, sigs) in enumerate(sky.sats):
+        if not state['visible'][i]:
+            continue
+        # a receiver moved north by the spoofer is closer to the satellites in the north
+        pr = slant_range(state['elev'][i]) + clock_m - state['north'] * line_of_sight_north(state, i)
+        rate = state['rate'][i] + state['clkD'] * 1e-9 * SPEED_OF_LIGHT
+        for sig in sigs:
+            wavelength = SPEED_OF_LIGHT / CARRIERS[(g, sig)]
+            rows.append({'gnssId': g, 'svId': sv, 'sigId': sig, 'cno': int(state['cno'][i]) - (3 if sig else 0),
+                         'prMes': pr + rng.normal(0, 0.3), 'cpMes': pr / wavelength + rng.normal(0, 0.01),
+                         'doMes': float(np.float32(-rate / wavelength + rng.normal(0, 0.05))),  # R4 in UBX
+                         'prStd': int(rng.integers(0, 9)), 'cpStd': int(rng.integers(0, 9)),
+                         'doStd': int(rng.integers(0, 9))})
+    content = {'start_time': start_time, 'numMeas': len(rows)}
+    _blocks(content, rows)
+    return content
+
+
+def sat_epoch(rng, start_time, sky, state):
+    """NAV-SAT content of one epoch."""
+    rows = [{'gnssId': g, 'svId': sv, 'svUsed': int(state['used'][i]), 'cno': int(state['cno'][i]),
+             'elev': int(round(state['elev'][i])), 'azim': int(round(state['azim'][i])),
+             'prRes': round(rng.normal(0, 1.5), 1) + 0.0, 'qualityInd': 7 if state['used'][i] else 4, 'health': 1}
+            for i, (g, sv, sigs) in enumerate(sky.sats) if state['visible'][i]]
+    content = {'start_time': start_time, 'numSvs': len(rows)}
+    _blocks(content, rows)
+    return content
+
+
+def pvt_epoch(rng, start_time, sky, state):
+    """NAV-PVT content of one epoch."""
+    lat, lon, height = STATION_LLA
+    hAcc = 1500 * state['dop'][4] if state['numSV'] >= 4 else 50000.0
+    if state['jammed']:
+        hAcc *= 4
+    lat += np.degrees(state['north'] / 6378137.0)
+    return {'start_time': start_time, 'numSV': state['numSV'], 'nano': int(rng.integers(-500000, 500000)),
+            'lat': round(lat + rng.normal(0, 1e-6), 7), 'lon': round(lon + rng.normal(0, 1e-6), 7),
+            'height': round(height * 1000 + rng.normal(0, 500)), 'hMSL': round((height - GEOID_SEPARATION) * 1000),
+            'velN': round(rng.normal(0, 20)), 'velE': round(rng.normal(0, 20)), 'velD': round(rng.normal(0, 30)),
+            'gSpeed': round(abs(rng.normal(0, 20))), 'headMot': 0.0, 'headAcc': 180.0,
+            'hAcc': round(hAcc), 'vAcc': round(1.6 * hAcc), 'sAcc': round(abs(rng.normal(80, 10)))}
+
+
+def posecef_epoch(rng, start_time, sky, state):
+    """NAV-POSECEF content of one epoch."""
+    lat, lon, height = STATION_LLA
+    x, y, z = lla_to_ecef(lat + np.degrees(state['north'] / 6378137.0), lon, height)
+    return {'start_time': start_time, 'ecefX': round(x * 100 + rng.normal(0, 50)),
+            'ecefY': round(y * 100 + rng.normal(0, 50)), 'ecefZ': round(z * 100 + rng.normal(0, 50))}
+
+
+def clock_epoch(rng, start_time, sky, state):
+    """NAV-CLOCK content of one epoch."""
+    return {'start_time': start_time, 'clkB': round(state['clkB']), 'clkD': round(state['clkD'] + rng.normal(0, 0.5)),
+            'tAcc': int(rng.integers(15, 30)), 'fAcc': int(rng.integers(200, 400))}
+
+
+def dop_epoch(rng, start_time, sky, state):
+    """NAV-DOP content of one epoch (DOPs of the used satellites, 0.01 resolution as in UBX)."""
+    names = ('gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP')
+    content = {'start_time': start_time}
+    content.update({name: round(value, 2) if value == value else 99.99 for name, value in zip(names, state['dop'])})
+    return content
+
+
+def span_epoch(rng, start_time, sky, state):
+    """MON-SPAN content of one epoch: a band-pass noise floor (dB) on every RF block, a CW jammer on the first one."""
+    x = np.linspace(-1, 1, SPAN_BINS)
+    rows = []
+    for b, (center, span, res) in enumerate(SPAN_BLOCKS):
+        spectrum = 70 + 40 * np.exp(-(x / 0.45) ** 4) + rng.normal(0, 1.0, SPAN_BINS)
+        if state['jammed'] and b == 0:
+            spectrum += 8 + 35 * np.exp(-((np.arange(SPAN_BINS) - 100) / 2.0) ** 2)
+        rows.append({'spectrum': np.clip(np.round(spectrum), 0, 255).astype(int).tolist(),
+                     'span': int(span), 'res': int(res), 'center': int(center), 'pga': int(rng.integers(52, 56))})
+    content = {'start_time': start_time, 'version': 0, 'numRfBlocks': len(rows)}
+    _blocks(content, rows)
+    return content
+
+
+GPS_EPOCH = datetime(1980, 1, 6)
+LEAP_SECONDS = 18
+NMEA = b'$GNGGA,%02d%02d%02d.00,2503.31800,N,10241.95800,E,1,12,0.80,1982.0,M,-32.0,M,,*%02X\r\n'
+
+
+def _ubx_frame(cls, msg_id, payload):
+    """UBX frame: sync, class, id, length, payload and 8-bit Fletcher checksum."""
+    body = struct.pack('<BBH', cls, msg_id, len(payload)) + payload
+    running = np.cumsum(np.frombuffer(body, dtype=np.uint8), dtype=np.int64)
+    return b'\xb5\x62' + body + bytes((int(running[-1]) % 256, int(running.sum()) % 256))
+
+
+def _gps_time(t):
+    """(GPS week, time of week in s) of a UTC datetime."""
+    seconds = (t - GPS_EPOCH).total_seconds() + LEAP_SECONDS
+    week = int(seconds // 604800)
+    return week, seconds - week * 604800
+
+
+def _rows(content, count_key, columns):
+    """Repeated blocks of a content as rows of the given columns."""
+    return [[content['%s_%02d' % (column, i)] for column in columns] for i in range(1, content[count_key] + 1)]
+
+
+def rawx_ubx(content, t):
+    week, tow = _gps_time(t)
+    columns = ['prMes', 'cpMes', 'doMes', 'gnssId', 'svId', 'sigId', 'cno', 'prStd', 'cpStd', 'doStd']
+    payload = struct.pack('<dHbBBBH', tow, week, LEAP_SECONDS, content['numMeas'], 0x01, 1, 0)
+    for pr, cp, do, g, sv, sig, cno, prStd, cpStd, doStd in _rows(content, 'numMeas', columns):
+        payload += struct.pack('<ddfBBBBHBBBBBB', pr, cp, do, g, sv, sig, 0, 64500, cno, prStd, cpStd, doStd, 0x07, 0)
+    return payload
+
+
+def sat_ubx(content, t):
+    iTOW = round(_gps_time(t)[1] * 1000)
+    columns = ['gnssId', 'svId', 'cno', 'elev', 'azim', 'prRes', 'qualityInd', 'svUsed', 'health']
+    payload = struct.pack('<IBBH', iTOW, 1, content['numSvs'], 0)
+    for g, sv, cno, elev, azim, prRes, quality, used, health in _rows(content, 'numSvs', columns):
+        payload += struct.pack('<BBBbhhI', g, sv, cno, elev, azim, round(prRes * 10), quality | used << 3 | health << 4)
+    return payload
+
+
+def pvt_ubx(content, t):
+    c = content
+    return struct.pack('<IHBBBBBBIiBBBBiiiiIIiiiiiIIHHIihH', round(_gps_time(t)[1] * 1000), t.year, t.month, t.day,
+                       t.hour, t.minute, t.second, 0x07, 20, c['nano'], 3, 0x01, 0, c['numSV'],
+                       round(c['lon'] * 1e7), round(c['lat'] * 1e7), c['height'], c['hMSL'], c['hAcc'], c['vAcc'],
+                       c['velN'], c['velE'], c['velD'], c['gSpeed'], round(c['headMot'] * 1e5), c['sAcc'],
+                       round(c['headAcc'] * 1e5), 0, 0, 0, 0, 0, 0)
+
+
+def posecef_ubx(content, t):
+    return struct.pack('<IiiiI', round(_gps_time(t)[1] * 1000), content['ecefX'], content['ecefY'], content['ecefZ'], 100)
+
+
+def clock_ubx(content, t):
+    return struct.pack('<IiiII', round(_gps_time(t)[1] * 1000), content['clkB'], content['clkD'], content['tAcc'],
+                       content['fAcc'])
+
+
+def dop_ubx(content, t):
+    names = ('gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP')
+    return struct.pack('<I7H', round(_gps_time(t)[1] * 1000), *(round(content[name] * 100) for name in names))
+
+
+def span_ubx(content, t):
+    payload = struct.pack('<BBH', content['version'], content['numRfBlocks'], 0)
+    for spectrum, span, res, center, pga in _rows(content, 'numRfBlocks', ['spectrum', 'span', 'res', 'center', 'pga']):
+        payload += struct.pack('<256BIIIB3x', *spectrum, span, res, center, pga)
+    return payload
+
+
+# binary UBX encoders of the generated contents: (class, id, payload encoder)
+UBX_ENCODERS = {
+    'RXM-RAWX': (0x02, 0x15, rawx_ubx),
+    'NAV-SAT': (0x01, 0x35, sat_ubx),
+    'NAV-PVT': (0x01, 0x07, pvt_ubx),
+    'NAV-POSECEF': (0x01, 0x01, posecef_ubx),
+    'NAV-CLOCK': (0x01, 0x22, clock_ubx),
+    'NAV-DOP': (0x01, 0x04, dop_ubx),
+    'MON-SPAN': (0x0A, 0x31, span_ubx),
+}
+
+
+def nmea_sentence(t):
+    """A GGA sentence of epoch t, as interleaved by u-center between the UBX frames."""
+    body = NMEA % (t.hour, t.minute, t.second, 0)
+    checksum = 0
+    for byte in body[1:body.index(b'*')]:
+        checksum ^= byte
+    return NMEA % (t.hour, t.minute, t.second, checksum)
+
+
+GENERATORS = {
+    'RXM-RAWX': rawx_epoch,
+    'NAV-SAT': sat_epoch,
+    'NAV-PVT': pvt_epoch,
+    'NAV-POSECEF': posecef_epoch,
+    'NAV-CLOCK': clock_epoch,
+    'NAV-DOP': dop_epoch,
+    'MON-SPAN': span_epoch,
+}
+ALL_MSGS = list(GENERATORS)
+
+
+def write_hour(root, day, hour, epochs, msgs=('RXM-RAWX', 'NAV-SAT'), seed=0, jamming=None, spoofing=None,
+               ubx=None, json_files=True):
+    """
+    Write `epochs` 1 Hz epochs of the given messages. More than 3600 epochs simply
+    continue past the hour, which lets a single hour folder stand for a whole day.
+
+    :param jamming: (start second, duration) of a jamming interval, None for no jamming
+    :param spoofing: (start second, duration) of a spoofing interval, None for no spoofing
+    :param ubx: path of a binary UBX log receiving the same epochs, None for no log
+    :param json_files: write the raw JSON files
+
+    :return: number of files written
+    """
+    rng = np.random.default_rng(seed)
+    sky = Sky(rng)
+    t0 = datetime(2023, 9, int(day), int(hour))
+    msgs = [msg for msg in ALL_MSGS if msg in msgs]  # output order of the receiver, MON-SPAN last
+    if json_files:
+        for msg in msgs:
+            os.makedirs(raw_dir(root, day, hour, msg), exist_ok=True)
+    log = open(ubx, 'wb') if ubx else None
+    for k in range(epochs):
+        t = t0 + timedelta(seconds=k)
+        state = _epoch_state(rng, sky, k, jamming, spoofing)
+        for msg in msgs:
+            content = GENERATORS[msg](rng, t.strftime('%Y-%m-%d %H:%M:%S'), sky, state)
+            if json_files:
+                with open(os.path.join(raw_dir(root, day, hour, msg), t.strftime('%Y-%m-%d %H-%M-%S') + '.json'),
+                          'w') as f:
+                    json.dump(content, f)
+            if log:
+                cls, msg_id, encode = UBX_ENCODERS[msg]
+                log.write(_ubx_frame(cls, msg_id, encode(content, t)))
+        if log:
+            log.write(nmea_sentence(t))
+    if log:
+        log.close()
+    return epochs * len(msgs) if json_files else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic raw UBX-JSON hours.')
+    parser.add_argument('--root', required=True, help='folder receiving GNSS_Dataset/Raw_data')
+    parser.add_argument('--day', type=int, default=12)
+    parser.add_argument('--hour', type=int, default=14)
+    parser.add_argument('--epochs', type=int, default=3600)
+    parser.add_argument('--msgs', nargs='+', choices=ALL_MSGS, default=ALL_MSGS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jamming', type=int, nargs=2, default=None, metavar=('START', 'DURATION'),
+                        help='jamming interval, in seconds from the start of the hour')
+    parser.add_argument('--spoofing', type=int, nargs=2, default=None, metavar=('START', 'DURATION'),
+                        help='spoofing interval, in seconds from the start of the hour')
+    parser.add_argument('--ubx', default=None, help='also write the epochs as a binary UBX log to this file')
+    parser.add_argument('--no-json', action='store_true', help='do not write the raw JSON files (with --ubx)')
+    args = parser.parse_args()
+    print('%d files written' % write_hour(args.root, args.day, args.hour, args.epochs, args.msgs, args.seed,
+                                          args.jamming, args.spoofing, args.ubx, not args.no_json))
+    if args.ubx:
+        print('%s: %d bytes' % (args.ubx, os.path.getsize(args.ubx)))
+
+
+if __name__ == '__main__':
+    main()
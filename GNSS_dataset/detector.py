@@ -0,0 +1,438 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Streaming detection of interference (jamming) and spoofing intervals in the processed
+observationHH and pvtSolutionHH files.
+
+The files are read hour by hour and reduced, with vectorized operations, to a few
+features per epoch. The epochs are then fed in time order to four detectors, each one
+keeping sliding-window statistics that are updated in O(1) per epoch (running sums over
+a ring buffer), so a whole day runs thousands of times faster than real time:
+
+    cn0_drop               mean C/N0 of the band-1 signals falls DROP dB below its baseline
+                           (the last BASELINE seconds before the drop), or half of the
+                           signals are lost
+    doppler_inconsistency  pseudorange rate and Doppler range rate disagree differently from
+                           one signal to another (a common clock jump or drift cancels out);
+                           GLONASS is left out, its FDMA channel is not stored
+    clock_jump             clkB jumps by more than clkD predicts, or clkD jumps, well outside
+                           the spread of the last WINDOW seconds
+    position_jump          the ECEF position moves, in one epoch or over WINDOW seconds, by
+                           more than the velocity explains, compared with hAcc
+
+Each detector emits events {'detector', 'start', 'end', 'duration', 'peak'}: alarms
+separated by less than merge_gap seconds belong to the same event.
+
+USAGE:
+    python detector.py --days 12 --hours $(seq 0 23)
+    python detector.py --days $(seq 12 30) --csv events.csv
+
+"""
+
+import argparse, csv, os, time
+
+import numpy as np
+
+from processed_io import PROCESSED_DIR, find_product, load_product
+from record_time import parse_times
+from ubx_decode import RAX_CONSTELLATIONS
+
+# carrier frequency (Hz) of the two bands of observationHH (sigIds of ubx_decode.RAX_CONSTELLATIONS)
+BAND_CARRIERS = {'G1': 1575.42e6, 'G2': 1227.60e6, 'E1': 1575.42e6, 'E2': 1207.14e6, 'B1': 1561.098e6,
+                 'B2': 1207.14e6, 'Q1': 1575.42e6, 'Q2': 1227.60e6}
+SPEED_OF_LIGHT = 299792458.0
+CN0_BANDS = [const + '1' for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS]
+DOPPLER_BANDS = [(const + band, numSats) for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS
+                 for band in '12' if const + band in BAND_CARRIERS]
+MAX_STEP_MS = 1500  # consecutive epochs further apart than this are not differenced
+
+
+class RollingStats:
+    """
+    Mean and standard deviation of the last `window` values of a scalar, NaN values being
+    skipped. push() is O(1) in the window length: the running sums are updated with the
+    value entering and the value leaving the ring buffer, and are recomputed exactly once
+    per turn of the buffer so that rounding errors do not build up.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = [0.0] * window
+        self.valid = [False] * window
+        self.sum = self.sumsq = 0.0
+        self.count = 0
+        self.pos = 0
+
+    def push(self, x):
+        x = float(x)
+        ok = x == x and abs(x) != float('inf')
+        if not ok:
+            x = 0.0
+        old = self.values[self.pos]
+        self.sum += x - old
+        self.sumsq += x * x - old * old
+        self.count += ok - self.valid[self.pos]
+        self.values[self.pos] = x
+        self.valid[self.pos] = ok
+        self.pos = (self.pos + 1) % self.window
+        if self.pos == 0:
+            self.sum = sum(self.values)
+            self.sumsq = sum(v * v for v in self.values)
+
+    def mean(self):
+        return self.sum / self.count if self.count else float('nan')
+
+    def std(self):
+        if not self.count:
+            return float('nan')
+        mean = self.sum / self.count
+        return max(self.sumsq / self.count - mean * mean, 0.0) ** 0.5
+
+
+class RollingVectorStats:
+    """RollingStats of every element of a vector of `width` values, with NumPy arrays."""
+
+    def __init__(self, window, width):
+        self.window = window
+        self.values = np.zeros((window, width))
+        self.valid = np.zeros((window, width), dtype=bool)
+        self.sum = np.zeros(width)
+        self.count = np.zeros(width, dtype=int)
+        self.pos = 0
+
+    def push(self, x):
+        x = np.asarray(x, dtype=float)
+        ok = np.isfinite(x)
+        x = np.where(ok, x, 0.0)
+        self.sum += x - self.values[self.pos]
+        self.count += ok.astype(int) - self.valid[self.pos]
+        self.values[self.pos] = x
+        self.valid[self.pos] = ok
+        self.pos = (self.pos + 1) % self.window
+        if self.pos == 0:
+            self.sum = self.values.sum(axis=0)
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.sum / np.maximum(self.count, 1), np.nan)
+
+
+class EventTracker:
+    """Turns per-epoch alarms into [start, end] events with the peak value of the alarm."""
+
+    def __init__(self, name, min_duration=0.0, merge_gap=5.0):
+        self.name = name
+        self.min_duration = min_duration
+        self.merge_gap_ms = merge_gap * 1000
+        self.events = []
+        self.start = self.last = self.peak = None
+
+    def update(self, t, active, value=np.nan):
+        """t: epoch time (int ms); active: alarm raised at this epoch; value: its strength."""
+        if active:
+            if self.start is None:
+                self.start, self.peak = t, value
+            elif value > self.peak:
+                self.peak = value
+            self.last = t
+        elif self.start is not None and t - self.last > self.merge_gap_ms:
+            self.close()
+
+    def close(self):
+        """End the open event, if any (at the end of the data)."""
+        if self.start is not None and (self.last - self.start) / 1000.0 >= self.min_duration:
+            self.events.append({'detector': self.name, 'start': np.datetime64(int(self.start), 'ms'),
+                                'end': np.datetime64(int(self.last), 'ms'),
+                                'duration': (self.last - self.start) / 1000.0, 'peak': float(self.peak)})
+        self.start = self.last = self.peak = None
+
+
+class CnoDropDetector:
+    """C/N0 drop of all the satellites together, against a baseline frozen during the alarm."""
+
+    def __init__(self, baseline=600, short=10, drop=6.0, lost=0.5, min_duration=10.0):
+        self.baseline, self.short = RollingStats(baseline), RollingStats(short)
+        self.count_baseline = RollingStats(baseline)
+        self.drop, self.lost = drop, lost
+        self.tracker = EventTracker('cn0_drop', min_duration)
+
+    def update(self, t, epoch):
+        cn0, count = epoch['cn0'], epoch['cn0_count']
+        self.short.push(cn0)
+        ready = self.baseline.count >= self.baseline.window // 2 and self.short.count > 0
+        drop = self.baseline.mean() - self.short.mean() if ready else np.nan
+        lost = ready and count < self.lost * self.count_baseline.mean()
+        active = bool(ready and (drop > self.drop or lost))
+        if not active:  # the baseline only learns the epochs without alarm
+            self.baseline.push(cn0)
+            self.count_baseline.push(count if np.isfinite(cn0) else np.nan)
+        self.tracker.update(t, active, drop)
+
+
+def _median(values):
+    """np.median of a small 1-D array without its per-call overhead."""
+    values = np.sort(values)
+    n = len(values)
+    return float(values[(n - 1) // 2] + values[n // 2]) / 2
+
+
+class DopplerConsistencyDetector:
+    """
+    Spread between signals of the window-averaged difference between pseudorange rate and
+    Doppler range rate (m/s). The median of the signals is removed first, which cancels the
+    receiver clock; what is left moves only when the pseudoranges of some satellites are
+    pulled away from their Dopplers, as by a spoofer dragging the position.
+    """
+
+    def __init__(self, width, window=30, threshold=0.15, min_signals=6, min_duration=10.0):
+        self.residual = RollingVectorStats(window, width)
+        self.threshold, self.min_signals = threshold, min_signals
+        self.tracker = EventTracker('doppler_inconsistency', min_duration)
+
+    def update(self, t, epoch):
+        self.residual.push(epoch['rate_residual'])
+        ready = self.residual.count >= self.residual.window // 2
+        stat = np.nan
+        if ready.sum() >= self.min_signals:
+            mean = self.residual.mean()[ready]
+            stat = _median(np.abs(mean - _median(mean)))
+        self.tracker.update(t, stat > self.threshold, stat)
+
+
+class ClockJumpDetector:
+    """Jumps of clkB not predicted by clkD, and jumps of clkD, against their recent spread."""
+
+    def __init__(self, window=300, k=8.0, min_bias_jump=100.0, min_drift_jump=5.0):
+        self.bias, self.drift = RollingStats(window), RollingStats(window)
+        self.k, self.floors = k, (min_bias_jump, min_drift_jump)
+        self.tracker = EventTracker('clock_jump', merge_gap=2.0)
+
+    def update(self, t, epoch):
+        active, peak = False, np.nan
+        for stats, value, floor in ((self.bias, epoch['clkB_jump'], self.floors[0]),
+                                    (self.drift, epoch['clkD_jump'], self.floors[1])):
+            if not np.isfinite(value):
+                continue
+            ready = stats.count >= stats.window // 10
+            deviation = abs(value - stats.mean()) if ready else 0.0
+            if ready and deviation > max(self.k * stats.std(), floor):
+                active, peak = True, deviation if not peak >= deviation else peak
+            else:
+                stats.push(value)
+        self.tracker.update(t, active, peak)
+
+
+class PositionJumpDetector:
+    """Displacement not explained by the velocity, in one epoch and over a window, in units of hAcc."""
+
+    def __init__(self, window=60, k=5.0, min_duration=0.0):
+        self.window = window
+        self.k = k
+        self.steps = RollingVectorStats(window, 3)  # displacement of every epoch not explained by the velocity
+        self.tracker = EventTracker('position_jump', min_duration)
+
+    def update(self, t, epoch):
+        step, hAcc = epoch['pos_step'], epoch['hAcc']
+        self.steps.push(step)
+        ratio = np.nan
+        if hAcc > 0:
+            instant = float(np.sqrt(step @ step))
+            drift = float(np.sqrt(self.steps.sum @ self.steps.sum)) if self.steps.count[0] >= self.window // 2 else np.nan
+            ratio = np.fmax(instant, drift) / hAcc
+        self.tracker.update(t, ratio > self.k, ratio)
+
+
+def _bands(content, field, bands):
+    """[T, S] array of a field over several constellation/bands, NaN where a signal is absent (0)."""
+    T = len(content.get('recordTime', []))
+    blocks = []
+    for band, numSats in bands:
+        arr = np.full((T, numSats), np.nan)
+        value = content.get('%s_%s' % (field, band))
+        if value is not None and len(value):
+            value = np.asarray(value, dtype=float).reshape(len(value), -1)[:T, :numSats]
+            arr[:len(value), :value.shape[1]] = value
+        blocks.append(arr)
+    arr = np.hstack(blocks)
+    arr[arr == 0] = np.nan
+    return arr
+
+
+def _column(content, key, T):
+    value = content.get(key)
+    if value is None or len(value) != T:
+        return np.full(T, np.nan)
+    return np.asarray(value, dtype=float)
+
+
+def _step(values, times, previous):
+    """Difference of every row with the row before (previous: last row of the hour before), NaN across gaps."""
+    prev_values = np.concatenate([previous[0][None], values[:-1]]) if previous is not None \
+        else np.concatenate([np.full((1,) + values.shape[1:], np.nan), values[:-1]])
+    prev_times = np.concatenate([[previous[1] if previous is not None else -10 ** 15], times[:-1]])
+    dt = (times - prev_times) / 1000.0
+    ok = (dt > 0) & (dt * 1000 <= MAX_STEP_MS)
+    with np.errstate(invalid='ignore'):
+        step = values - prev_values
+        step[~ok] = np.nan
+    return step, np.where(ok, dt, np.nan)
+
+
+def hour_features(obs, pvt, carry=None):
+    """
+    Per-epoch features of one hour, the observation and PVT epochs joined on their recordTime.
+
+    :param obs: content of an observationHH file, or None
+    :param pvt: content of the pvtSolutionHH file of the same hour, or None
+    :param carry: second return value of the previous hour, for the differences across hours
+    :return: (times, features, carry): int64 ms [T]; {name: [T] or [T, S]}; state for the next hour
+    """
+    carry = carry or {}
+    sources = {}
+    for name, content in (('obs', obs), ('pvt', pvt)):
+        if content:
+            t, ok = parse_times(content.get('recordTime', []))
+            sources[name] = (t.astype('int64'), ok, content)
+    times = np.unique(np.concatenate([t[ok] for t, ok, content in sources.values()])) if sources \
+        else np.zeros(0, dtype=np.int64)
+    T = len(times)
+    width = sum(numSats for band, numSats in DOPPLER_BANDS)
+    features = {'cn0': np.full(T, np.nan), 'cn0_count': np.zeros(T), 'rate_residual': np.full((T, width), np.nan),
+                'clkB_jump': np.full(T, np.nan), 'clkD_jump': np.full(T, np.nan),
+                'pos_step': np.full((T, 3), np.nan), 'hAcc': np.full(T, np.nan)}
+
+    if 'obs' in sources:
+        t, ok, content = sources['obs']
+        t = t[ok]
+        rows = np.searchsorted(times, t)
+        cn0 = _bands(content, 'cn0', [(band, n) for band, n in zip(CN0_BANDS, [c[2] for c in RAX_CONSTELLATIONS])])[ok]
+        count = np.isfinite(cn0).sum(axis=1)
+        with np.errstate(invalid='ignore'):
+            features['cn0'][rows] = np.where(count > 0, np.nansum(cn0, axis=1) / np.maximum(count, 1), np.nan)
+        features['cn0_count'][rows] = count
+
+        pr = _bands(content, 'prMes', DOPPLER_BANDS)[ok]
+        doppler = _bands(content, 'doMes', DOPPLER_BANDS)[ok]
+        wavelength = np.concatenate([np.full(n, SPEED_OF_LIGHT / BAND_CARRIERS[band]) for band, n in DOPPLER_BANDS])
+        step, dt = _step(pr, t, carry.get('pr'))
+        prev_doppler = np.concatenate([carry['doppler'][0][None] if 'doppler' in carry
+                                       else np.full((1, width), np.nan), doppler[:-1]])
+        # range rate from the Doppler (m/s) = -wavelength * Doppler (Hz), averaged over the step
+        features['rate_residual'][rows] = step / dt[:, None] + wavelength * (doppler + prev_doppler) / 2
+        if len(t):
+            carry['pr'], carry['doppler'] = (pr[-1], t[-1]), (doppler[-1], t[-1])
+
+    if 'pvt' in sources:
+        t, ok, content = sources['pvt']
+        t = t[ok]
+        rows = np.searchsorted(times, t)
+        T_pvt = len(ok)
+        clkB, clkD = _column(content, 'clkB', T_pvt)[ok], _column(content, 'clkD', T_pvt)[ok]
+        step, dt = _step(np.column_stack([clkB, clkD]), t, carry.get('clock'))
+        prev_clkD = clkD - step[:, 1]
+        features['clkB_jump'][rows] = step[:, 0] - (clkD + prev_clkD) / 2 * dt
+        features['clkD_jump'][rows] = step[:, 1]
+
+        ecef = np.column_stack([_column(content, key, T_pvt)[ok] for key in ('ecefX', 'ecefY', 'ecefZ')]) / 100.0
+        vel = np.column_stack([_column(content, key, T_pvt)[ok] for key in ('velN', 'velE', 'velD')]) / 1000.0
+        lat = np.radians(_column(content, 'lat', T_pvt)[ok])
+        lon = np.radians(_column(content, 'lon', T_pvt)[ok])
+        # NED velocity to ECEF
+        sl, cl, so, co = np.sin(lat), np.cos(lat), np.sin(lon), np.cos(lon)
+        vel_ecef = np.column_stack([-sl * co * vel[:, 0] - so * vel[:, 1] - cl * co * vel[:, 2],
+                                    -sl * so * vel[:, 0] + co * vel[:, 1] - cl * so * vel[:, 2],
+                                    cl * vel[:, 0] - sl * vel[:, 2]])
+        step, dt = _step(ecef, t, carry.get('ecef'))
+        features['pos_step'][rows] = step - vel_ecef * dt[:, None]
+        features['hAcc'][rows] = _column(content, 'hAcc', T_pvt)[ok] / 1000.0
+        if len(t):
+            carry['clock'] = (np.array([clkB[-1], clkD[-1]]), t[-1])
+            carry['ecef'] = (ecef[-1], t[-1])
+    return times, features, carry
+
+
+class StreamingDetector:
+    """The four detectors fed with the same epochs, in time order."""
+
+    def __init__(self, **options):
+        width = sum(numSats for band, numSats in DOPPLER_BANDS)
+        self.detectors = [CnoDropDetector(**options.get('cn0_drop', {})),
+                          DopplerConsistencyDetector(width, **options.get('doppler_inconsistency', {})),
+                          ClockJumpDetector(**options.get('clock_jump', {})),
+                          PositionJumpDetector(**options.get('position_jump', {}))]
+        self.epochs = 0
+        self.last_time = None
+
+    def update_hour(self, times, features):
+        """Feed the epochs of hour_features() one by one."""
+        names = list(features)
+        for i, t in enumerate(times.tolist()):
+            if self.last_time is not None and t <= self.last_time:
+                continue  # epochs are consumed once, in time order
+            epoch = {name: features[name][i] for name in names}
+            for detector in self.detectors:
+                detector.update(t, epoch)
+            self.last_time = t
+            self.epochs += 1
+
+    def finish(self):
+        """Close the open events and return all of them, sorted by start time."""
+        for detector in self.detectors:
+            detector.tracker.close()
+        return sorted((event for detector in self.detectors for event in detector.tracker.events),
+                      key=lambda event: (event['start'], event['detector']))
+
+
+def detect(days, hours=None, root=PROCESSED_DIR, **options):
+    """
+    Run the detectors over the given days and hours, in time order.
+
+    :param days: days of the processed data folder, e.g. [12, 13]
+    :param hours: hours of every day, None for all the hours present
+    :param root: processed data folder, one sub-folder per day
+    :param options: keyword arguments of every detector, e.g. cn0_drop={'drop': 8.0}
+    :return: (events, number of epochs)
+    """
+    stream, carry = StreamingDetector(**options), None
+    for day in days:
+        base = os.path.join(root, str(day))
+        for hour in (range(24) if hours is None else hours):
+            paths = [find_product(base, item, hour) for item in ('observation', 'pvtSolution')]
+            if not any(paths):
+                continue
+            obs, pvt = [load_product(path) if path else None for path in paths]
+            times, features, carry = hour_features(obs, pvt, carry)
+            stream.update_hour(times, features)
+    return stream.finish(), stream.epochs
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Jamming and spoofing intervals of the processed data.')
+    parser.add_argument('--root', default=PROCESSED_DIR, help='processed data folder, one sub-folder per day')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=None, help='hours of every day (default: all)')
+    parser.add_argument('--cn0-drop', type=float, default=6.0, help='C/N0 drop of an alarm (dB)')
+    parser.add_argument('--doppler-threshold', type=float, default=0.15,
+                        help='spread of the pseudorange/Doppler rate differences of an alarm (m/s)')
+    parser.add_argument('--csv', default=None, help='write the events to a CSV file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    t0 = time.perf_counter()
+    events, epochs = detect(args.days, args.hours, args.root, cn0_drop={'drop': args.cn0_drop},
+                            doppler_inconsistency={'threshold': args.doppler_threshold})
+    elapsed = time.perf_counter() - t0
+    print('%-22s %-23s %-23s %9s %10s' % ('detector', 'start', 'end', 'duration', 'peak'))
+    for event in events:
+        print('%-22s %-23s %-23s %9.0f %10.2f' % (event['detector'], event['start'], event['end'],
+                                                  event['duration'], event['peak']))
+    print('%d events, %d epochs in %.1f s (%.0fx real time)'
+          % (len(events), epochs, elapsed, epochs / max(elapsed, 1e-9)))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['detector', 'start', 'end', 'duration', 'peak'])
+            writer.writeheader()
+            writer.writerows(events)
+        print('[OK] %s' % args.csv)
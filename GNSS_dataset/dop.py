@@ -0,0 +1,220 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+DOP recomputed from the satellite geometry of satelliteInfomationHH (elev_*, azim_*,
+svUsed_*) and compared with the receiver's NAV-DOP stored in pvtSolutionHH (gDOP ... eDOP).
+
+Besides the satellites used by the receiver, any constellation subset can be evaluated
+("what-if" DOP), e.g. 'G' (GPS only) or 'GE' (GPS + Galileo). Every epoch of an hour and
+every subset are computed at once: the line-of-sight rows of all the satellites are stacked
+into a (subsets, epochs, satellites, unknowns) geometry, the normal matrices are summed over
+the masked satellites with one batched matmul and inverted with one batched inv. The
+unknowns are east, north, up and one receiver clock per constellation (the inter-system
+biases), or a single clock with --single-clock; tDOP is the clock of the first
+constellation of the subset with satellites in the epoch. Epochs with fewer satellites
+than unknowns are NaN.
+
+USAGE:
+    python dop.py --days 12 --hours 14
+    python dop.py --days 12 13 --hours $(seq 0 23) --subsets GERBQ G GE --csv dop.csv
+
+"""
+
+import argparse, csv, os
+
+import numpy as np
+
+from processed_io import PROCESSED_DIR, find_product, load_product
+from record_time import parse_times
+from ubx_decode import SAT_CONSTELLATIONS
+
+DOP_NAMES = ('gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP')
+CONSTELLATIONS = ''.join(const for const, gnssId, numSats in SAT_CONSTELLATIONS)  # 'GEBQR'
+USED = 'used'  # subset of the satellites used by the receiver, whatever their constellation
+
+
+def _matrix(sat_info, key, numSats):
+    """[T, numSats] float array of a key, zero-padded or cut to the width of its constellation."""
+    T = len(sat_info.get('recordTime', []))
+    arr = np.zeros((T, numSats))
+    value = sat_info.get(key)
+    if value is not None and len(value):
+        value = np.asarray(value, dtype=float).reshape(len(value), -1)[:T, :numSats]
+        arr[:len(value), :value.shape[1]] = value
+    return arr
+
+
+def sky_arrays(sat_info):
+    """
+    Geometry of every satellite column of an hour, all constellations side by side.
+
+    :param sat_info: content of a satelliteInfomationHH file
+    :return: (elev, azim, used, const): elevation and azimuth (deg) [T, S], used in the
+             navigation solution [T, S] (bool), index of the constellation in CONSTELLATIONS [S]
+    """
+    elev, azim, used, const = [], [], [], []
+    for c, (letter, gnssId, numSats) in enumerate(SAT_CONSTELLATIONS):
+        svId = _matrix(sat_info, f'svId_{letter}', numSats)
+        elev.append(_matrix(sat_info, f'elev_{letter}', numSats))
+        azim.append(_matrix(sat_info, f'azim_{letter}', numSats))
+        used.append((svId > 0) & (_matrix(sat_info, f'svUsed_{letter}', numSats) == 1))
+        const.append(np.full(numSats, c))
+    return np.hstack(elev), np.hstack(azim), np.hstack(used), np.concatenate(const)
+
+
+def line_of_sight(elev, azim):
+    """East, north, up unit vectors [..., 3] towards satellites at elev/azim (deg)."""
+    e, a = np.radians(elev), np.radians(azim)
+    return np.stack([np.cos(e) * np.sin(a), np.cos(e) * np.cos(a), np.sin(e)], axis=-1)
+
+
+def dop_batch(elev, azim, weights, const, num_clocks):
+    """
+    DOPs of stacked satellite selections.
+
+    :param elev: elevation (deg) [T, S]
+    :param azim: azimuth (deg) [T, S]
+    :param weights: selection of the satellites [K, T, S] (bool or 0/1), K selections at once
+    :param const: clock column of every satellite [S], in range(num_clocks)
+    :param num_clocks: number of receiver clock unknowns
+    :return: {name: [K, T]} for DOP_NAMES, NaN where the selection cannot be solved
+    """
+    weights = np.asarray(weights, dtype=float)
+    keep = weights.any(axis=(0, 1))  # satellite columns never selected do not enter the sums
+    elev, azim, weights, const = elev[:, keep], azim[:, keep], weights[:, :, keep], const[keep]
+
+    clocks = np.zeros((len(const), num_clocks))
+    clocks[np.arange(len(const)), const] = 1.0
+    los = line_of_sight(elev, azim)
+    geometry = np.concatenate([los, np.broadcast_to(clocks, los.shape[:2] + clocks.shape[1:])], axis=-1)  # [T, S, U]
+    # sum over the selected satellites of g g^T: one batched matmul, [K, T, U, S] @ [T, S, U] -> [K, T, U, U]
+    normal = np.matmul((weights[..., None] * geometry).swapaxes(-1, -2), geometry)
+
+    # clocks of the constellations without satellites in the epoch are not unknowns
+    present = np.einsum('kts,sc->ktc', weights, clocks) > 0  # [K, T, C]
+    unknowns = 3 + present.sum(axis=-1)
+    ok = (weights.sum(axis=-1) >= unknowns) & present.any(axis=-1)
+    diag = np.arange(3, 3 + num_clocks)
+    normal[..., diag, diag] += ~present
+    normal[~ok] = np.eye(3 + num_clocks)
+    ok &= np.linalg.det(normal) > 1e-9  # degenerate geometry, e.g. all the satellites in one plane
+    normal[~ok] = np.eye(3 + num_clocks)
+
+    q = np.diagonal(np.linalg.inv(normal), axis1=-2, axis2=-1)  # [K, T, U]
+    east, north, up = q[..., 0], q[..., 1], q[..., 2]
+    clock = np.take_along_axis(q[..., 3:], present.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    values = (east + north + up + clock, east + north + up, clock, up, east + north, north, east)
+    return {name: np.where(ok, np.sqrt(value), np.nan) for name, value in zip(DOP_NAMES, values)}
+
+
+def recompute_dop(sat_info, subsets=(USED,), single_clock=False, min_elev=None):
+    """
+    DOPs of an hour for several satellite subsets, in one call.
+
+    :param sat_info: content of a satelliteInfomationHH file
+    :param subsets: USED for the satellites used by the receiver, or strings of constellation
+                    letters, e.g. 'G', 'GE', 'GEBQR': the used satellites of these constellations
+    :param single_clock: one receiver clock for all the constellations instead of one per constellation
+    :param min_elev: also drop the satellites below this elevation (deg)
+    :return: {subset: {name: [T]}} for DOP_NAMES
+    """
+    elev, azim, used, const = sky_arrays(sat_info)
+    if min_elev is not None:
+        used = used & (elev >= min_elev)
+    masks = []
+    for subset in subsets:
+        letters = CONSTELLATIONS if subset == USED else subset
+        unknown = set(letters) - set(CONSTELLATIONS)
+        if unknown:
+            raise ValueError('unknown constellations %s in subset %r' % (sorted(unknown), subset))
+        masks.append(used & np.isin(const, [CONSTELLATIONS.index(letter) for letter in letters]))
+    if single_clock:
+        const, num_clocks = np.zeros_like(const), 1
+    else:
+        num_clocks = len(CONSTELLATIONS)
+    dops = dop_batch(elev, azim, np.array(masks), const, num_clocks)
+    return {subset: {name: values[k] for name, values in dops.items()} for k, subset in enumerate(subsets)}
+
+
+def compare_nav_dop(dops, sat_info, pvt):
+    """
+    Differences between recomputed DOPs and the NAV-DOP of pvtSolutionHH, on the epochs of both files.
+
+    :param dops: {name: [T]} of one subset of recompute_dop(), T epochs of sat_info
+    :param sat_info: the satelliteInfomationHH content dops was computed from
+    :param pvt: content of the pvtSolutionHH file of the same hour
+    :return: {name: {'epochs', 'bias', 'median', 'p95', 'max'}}: epochs compared, mean of
+             recomputed - NAV-DOP, median, 95th percentile and maximum of the absolute difference
+    """
+    t_sat, ok_sat = parse_times(sat_info.get('recordTime', []))
+    t_pvt, ok_pvt = parse_times(pvt.get('recordTime', []))
+    common, i_sat, i_pvt = np.intersect1d(t_sat[ok_sat], t_pvt[ok_pvt], return_indices=True)
+    i_sat = np.flatnonzero(ok_sat)[i_sat]
+    i_pvt = np.flatnonzero(ok_pvt)[i_pvt]
+    result = {}
+    for name in DOP_NAMES:
+        if name not in pvt:
+            continue
+        diff = np.asarray(dops[name])[i_sat] - np.asarray(pvt[name], dtype=float)[i_pvt]
+        diff = diff[np.isfinite(diff)]
+        a = np.abs(diff)
+        result[name] = {'epochs': len(diff), 'bias': float(diff.mean()) if len(diff) else np.nan,
+                        'median': float(np.median(a)) if len(a) else np.nan,
+                        'p95': float(np.percentile(a, 95)) if len(a) else np.nan,
+                        'max': float(a.max()) if len(a) else np.nan}
+    return result
+
+
+def load_hour(base, hour):
+    """(sat_info, pvt) of a processed hour, None for a missing file."""
+    paths = [find_product(base, item, hour) for item in ('satelliteInfomation', 'pvtSolution')]
+    return tuple(load_product(path) if path else None for path in paths)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='DOP recomputed from the satellite geometry, compared with NAV-DOP.')
+    parser.add_argument('--root', default=PROCESSED_DIR, help='processed data folder, one sub-folder per day')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=list(range(24)))
+    parser.add_argument('--subsets', nargs='+', default=[USED, 'G', 'GE'],
+                        help="'used' and/or constellation letters, e.g. G GE GEBQR")
+    parser.add_argument('--single-clock', action='store_true', help='one receiver clock for all the constellations')
+    parser.add_argument('--min-elev', type=float, default=None, help='elevation mask (deg)')
+    parser.add_argument('--csv', default=None, help='write one row per hour and subset to a CSV file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    rows = []
+    for day in args.days:
+        base = os.path.join(args.root, str(day))
+        for hour in args.hours:
+            sat_info, pvt = load_hour(base, hour)
+            if sat_info is None:
+                continue
+            dops = recompute_dop(sat_info, args.subsets, args.single_clock, args.min_elev)
+            for subset, values in dops.items():
+                row = {'day': day, 'hour': hour, 'subset': subset,
+                       'epochs': len(values['pDOP']), 'solved': int(np.isfinite(values['pDOP']).sum())}
+                row.update({'%s_median' % name: float(np.nanmedian(v)) if np.isfinite(v).any() else np.nan
+                            for name, v in values.items()})
+                if subset == USED and pvt is not None:
+                    for name, stats in compare_nav_dop(values, sat_info, pvt).items():
+                        row['%s_bias' % name] = stats['bias']
+                        row['%s_p95' % name] = stats['p95']
+                rows.append(row)
+                print('day=%s hour=%02d %-6s %4d/%4d epochs  median gDOP %5.2f pDOP %5.2f hDOP %5.2f vDOP %5.2f'
+                      % (day, hour, subset, row['solved'], row['epochs'], row['gDOP_median'], row['pDOP_median'],
+                         row['hDOP_median'], row['vDOP_median'])
+                      + ('  vs NAV-DOP: pDOP bias %+.3f p95 %.3f' % (row['pDOP_bias'], row['pDOP_p95'])
+                         if 'pDOP_bias' in row else ''))
+    if args.csv and rows:
+        fields = []
+        for row in rows:
+            fields += [key for key in row if key not in fields]
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        print('[OK] %s: %d rows' % (args.csv, len(rows)))
@@ -15,6 +15,9 @@ USAGE (Windows example):
 USAGE (Linux/macOS example):
     python gnss_mini_workflow.py --base "GNSS_dataset/Processed data/12" --hour 14
 
+USAGE (batch, every day and hour under "processed data/", no window):
+    python graphics.py --batch --root "processed data" --workers 4
+
 Dependencies:
     pip install numpy matplotlib
 
@@ -24,47 +27,44 @@ Notes:
  - Each chart is built in its own figure (no subplots), and no specific colors are set.
 """
 
-import os, json, math, argparse, glob
+import os, math, argparse, glob, time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
 import numpy as np
 import matplotlib.pyplot as plt
 
+from json_backend import load_file
+from processed_io import PROCESSED_DIR, find_product, load_product
+from record_time import parse_times, record_times
+from sat_stats import top_used
+
 
 # ----------------------------- IO utilities -----------------------------
 
 def load_json(path: str) -> Dict:
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return load_file(path)
 
 def find_hour_from_filename(fname: str) -> Optional[int]:
     """
-    Extract the <hour> from filenames like 'observation14.json', 'pvtSolution07.json', etc.
+    Extract the <hour> from filenames like 'observation14.json', 'pvtSolution07.npz', etc.
     Returns None if pattern not found.
     """
-    base = os.path.basename(fname)
-    for i in range(0, 24):
-        token = f"{i:02d}" if f"{i:02d}" in base else str(i)
-        # We need to ensure the token is the trailing numeric in the stem
-        # Simplify: try both
-        if base.endswith(f"{i}.json") or base.endswith(f"{i:02d}.json"):
-            return i
-    # Fallback: parse any trailing digits before '.json'
-    stem = os.path.splitext(base)[0]
-    digits = ''.join([c for c in stem if c.isdigit()])
-    if digits.isdigit():
-        try:
-            val = int(digits[-2:]) if len(digits) >= 2 else int(digits)
-            if 0 <= val <= 23:
-                return val
-        except:
-            pass
+    stem = os.path.splitext(os.path.basename(fname))[0]
+    # trailing digits of the stem
+    digits = stem[len(stem.rstrip('0123456789')):]
+    if digits:
+        val = int(digits)
+        if 0 <= val <= 23:
+            return val
     return None
 
 def list_available_hours(base_dir: str) -> List[int]:
     hours = set()
-    for patt in ["observation*.json", "pvtSolution*.json", "satelliteInfomation*.json"]:
+    for patt in ["observation*.json", "pvtSolution*.json", "satelliteInfomation*.json",
+                 "observation*.npz", "pvtSolution*.npz", "satelliteInfomation*.npz",
+                 "observation*.spz", "pvtSolution*.spz", "satelliteInfomation*.spz"]:
         for f in glob.glob(os.path.join(base_dir, patt)):
             h = find_hour_from_filename(f)
             if h is not None:
@@ -85,36 +85,39 @@ CONST_KEYS = {
 def safe_get(d: Dict, key: str, default=None):
     return d[key] if key in d else default
 
-def to_datetime_list(timestr_list: List[str]) -> List[datetime]:
-    out = []
-    for s in timestr_list:
-        # Expected like "2023-09-12 14-00-00" (sometimes with colons). Be flexible.
-        if isinstance(s, (int, float)):
-            # If timestamp as seconds
-            out.append(datetime.fromtimestamp(s))
-            continue
-        s2 = s.replace('-',':',2) if (' ' in s and '-' in s) else s  # keep date dashes; only first two '-' after space maybe colons
-        s2 = s2.replace('T',' ').replace('/', '-')
-        # Try multiple formats
-        for fmt in ("%Y-%m-%d %H-%M-%S", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%Y-%m-%d %H-%M-%S.%f", "%Y-%m-%d %H:%M:%S.%f"):
-            try:
-                out.append(datetime.strptime(s2, fmt))
-                break
-            except Exception:
-                pass
-        else:
-            # last resort: return as-is with now()
-            out.append(datetime.now())
-    return out
+def is_seq(x) -> bool:
+    """True for the lists of JSON files and the arrays of npz files."""
+    return isinstance(x, (list, np.ndarray))
+
+def to_datetime_list(timestr_list: List[str]) -> List[Optional[datetime]]:
+    """
+    recordTime column -> list of datetime. The format is detected once and the column is
+    converted in one vectorized pass (see record_time.py); unparseable entries give None.
+    """
+    times, valid = parse_times(timestr_list)
+    return times.astype('datetime64[us]').astype(datetime).tolist()
+
+def plot_times(content: Dict, tag: str = "") -> np.ndarray:
+    """
+    recordTime of a loaded hour as a datetime64[ms] array for the time axis, parsed once per
+    hour loaded by load_product. Unparseable entries are NaT (left out of the plot) and reported.
+    """
+    times, valid = record_times(content)
+    if not valid.all():
+        print(f"{tag} {np.count_nonzero(~valid)} of {len(valid)} recordTime entries could not be parsed; not plotted.")
+    return times
 
 def ensure_TxN(list_of_rows: List[List[float]]) -> np.ndarray:
     """Convert list-of-rows to numpy array [T, N] (or [T] if scalars)."""
-    if not isinstance(list_of_rows, list):
+    if not is_seq(list_of_rows):
         return np.array([])
     if len(list_of_rows) == 0:
         return np.zeros((0,0))
+    if isinstance(list_of_rows, np.ndarray):
+        arr = list_of_rows.astype(float)
+        return arr if arr.ndim == 2 else arr.reshape(len(arr), -1)
     # Some JSONs may store 1xN rows; some may store scalars.
-    if isinstance(list_of_rows[0], list):
+    if is_seq(list_of_rows[0]):
         return np.array([np.array(r, dtype=float) for r in list_of_rows], dtype=float)
     else:
         # 1D time series → shape [T, 1]
@@ -140,50 +143,130 @@ def get_used_svids_per_const(sat_info: Dict, t_idx: int) -> Dict[str, List[int]]
         used_key = f"svUsed_{c}"
         svIds_row = safe_get(sat_info, svId_key, [])
         used_row  = safe_get(sat_info, used_key, [])
-        if isinstance(svIds_row, list) and len(svIds_row) > t_idx:
+        if is_seq(svIds_row) and len(svIds_row) > t_idx:
             svIds_t = svIds_row[t_idx]
-            used_t  = used_row[t_idx] if (isinstance(used_row, list) and len(used_row) > t_idx) else []
-            if isinstance(svIds_t, list) and isinstance(used_t, list):
+            used_t  = used_row[t_idx] if (is_seq(used_row) and len(used_row) > t_idx) else []
+            if is_seq(svIds_t) and is_seq(used_t):
                 used_list = [int(sv) for sv, u in zip(svIds_t, used_t) if (u == 1 or u == True)]
                 if used_list:
                     used[c] = used_list
     return used
 
-def guess_vs_map(obs: Dict, const_char: str, t_idx: int, fallback_sv_list: List[int]) -> List[int]:
+def guess_vs_map(obs: Dict, sat_info: Dict, const_char: str) -> Optional[np.ndarray]:
     """
-    Try to recover the mapping SVID -> column index for observation arrays.
+    Recover the mapping column index -> SVID of the observation arrays of a constellation.
     Priority:
       1) VS list inside observation JSON (e.g., 'VSG','VSE','VSB','VSQ','VSR')
-      2) svId_* list from satelliteInfomation (fallback_sv_list)
-    Returns a list of SVIDs in the same order as columns (length = N columns for *_G1 arrays at t_idx).
+      2) svId_* list from satelliteInfomation
+    Returns a [T, N] array of SVIDs in the same order as the columns (a single list is
+    used for every time step), or None when neither is present.
     """
     # Try variants: 'VS' + c, 'VS_'+c
     for key in (f"VS{const_char}", f"VS_{const_char}"):
         vs = safe_get(obs, key, None)
-        if isinstance(vs, list):
-            # If list is [T] of [list of svIds], pick time t_idx if nested
-            if len(vs) > 0 and isinstance(vs[0], list):
-                if t_idx < len(vs):
-                    return [int(x) for x in vs[t_idx]]
-            else:
-                # single list
-                return [int(x) for x in vs]
+        if is_seq(vs) and len(vs) > 0:
+            return ensure_TxN(vs) if is_seq(vs[0]) else np.array(vs, dtype=float).reshape(1, -1)
     # Fallback: use list from sat info (already per time)
-    return list(fallback_sv_list)
+    svIds = safe_get(sat_info, f"svId_{const_char}", None)
+    if is_seq(svIds) and len(svIds) > 0 and is_seq(svIds[0]):
+        return ensure_TxN(svIds)
+    return None
+
+def svid_columns(sv_map: np.ndarray, T: int) -> Dict[int, np.ndarray]:
+    """
+    (SVID -> column) index of a [T, N] mapping from guess_vs_map: for every SVID, the
+    column holding it at each time step (first match), -1 where it is not listed.
+    A single-row mapping applies to every time step.
+    """
+    if sv_map.shape[0] == 1:
+        sv_map = np.broadcast_to(sv_map, (T, sv_map.shape[1]))
+    ids = np.nan_to_num(sv_map).astype(int)
+    index = {}
+    for svid in np.unique(ids[ids > 0]).tolist():
+        match = ids == svid
+        index[svid] = np.where(match.any(axis=1), match.argmax(axis=1), -1)
+    return index
+
+
+class HourSeries:
+    """
+    Per-hour (constellation, svid) -> column index of the observation and satellite
+    information arrays, shared by plot_cno_time and plot_doppler_time: the series of a
+    satellite is one NumPy gather instead of a per-epoch search.
+    """
+
+    def __init__(self, obs: Dict, sat_info: Dict):
+        self.obs = obs
+        self.sat_info = sat_info
+        self.T = len(safe_get(sat_info, 'recordTime', []))
+        self._columns = {}  # (source, const) -> (N, {svid: column per time step})
+        self._arrays = {}   # (source, key, sanitized) -> [T, N] array
+        self._top = {}      # k -> pick_top_k_used(sat_info, k)
+        self._times = None  # recordTime as datetime64
+
+    def columns(self, source: str, const_char: str):
+        """(number of columns, {svid: column per time step}) of 'obs' (VS lists) or 'sat' (svId_*)."""
+        if (source, const_char) not in self._columns:
+            if source == 'obs':
+                sv_map = guess_vs_map(self.obs, self.sat_info, const_char)
+            else:
+                svIds = safe_get(self.sat_info, f"svId_{const_char}", None)
+                sv_map = ensure_TxN(svIds) if is_seq(svIds) and len(svIds) > 0 and is_seq(svIds[0]) else None
+            if sv_map is None:
+                self._columns[(source, const_char)] = (0, {})
+            else:
+                rows = sv_map[:self.T]
+                self._columns[(source, const_char)] = (sv_map.shape[1], svid_columns(rows, self.T))
+        return self._columns[(source, const_char)]
+
+    def array(self, source: str, key: str, sanitized: bool = True) -> np.ndarray:
+        if (source, key, sanitized) not in self._arrays:
+            arr = ensure_TxN(safe_get(self.obs if source == 'obs' else self.sat_info, key, []))
+            self._arrays[(source, key, sanitized)] = sanitize(arr) if sanitized else arr
+        return self._arrays[(source, key, sanitized)]
+
+    def series(self, const_char: str, svid: int, key: str, source: str = 'obs', sanitized: bool = True) -> np.ndarray:
+        """
+        [T] series of one satellite from a [T, N] key, NaN where it is not listed.
+        Arrays whose width does not match the mapping of their constellation give all NaN.
+        """
+        out = np.full((self.T,), np.nan)
+        arr = self.array(source, key, sanitized)
+        width, index = self.columns(source, const_char)
+        cols = index.get(int(svid))
+        if cols is None or arr.ndim != 2 or arr.shape[1] != width:
+            return out
+        rows = np.arange(min(self.T, arr.shape[0], len(cols)))
+        cols = cols[rows]
+        listed = cols >= 0
+        out[rows[listed]] = arr[rows[listed], cols[listed]]
+        return out
+
+    def times(self) -> np.ndarray:
+        if self._times is None:
+            self._times = plot_times(self.sat_info, "[C/N0, Doppler]")
+        return self._times
+
+    def top_used(self, k: int = 4) -> List[Tuple[str, int]]:
+        if k not in self._top:
+            self._top[k] = pick_top_k_used(self.sat_info, k=k)
+        return self._top[k]
+
+
+_HOUR_SERIES: List[HourSeries] = []  # index of the last loaded hour
+
+def hour_series(obs: Dict, sat_info: Dict) -> HourSeries:
+    """HourSeries of the loaded hour, built once for the pair of dictionaries and reused by every plot."""
+    if not (_HOUR_SERIES and _HOUR_SERIES[0].obs is obs and _HOUR_SERIES[0].sat_info is sat_info):
+        _HOUR_SERIES[:] = [HourSeries(obs, sat_info)]
+    return _HOUR_SERIES[0]
 
 def pick_top_k_used(sat_info: Dict, k: int = 4) -> List[Tuple[str, int]]:
     """
-    Select top-k (constellation, svid) pairs most frequently 'used' across time.
+    Select top-k (constellation, svid) pairs most frequently 'used' across time
+    (vectorized over the svUsed_* matrices, see sat_stats.py).
     """
-    counts = {}
-    T = len(safe_get(sat_info, 'recordTime', []))
-    for t in range(T):
-        used = get_used_svids_per_const(sat_info, t)
-        for c, svids in used.items():
-            for s in svids:
-                counts[(c, s)] = counts.get((c, s), 0) + 1
-    ranked = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
-    return [pair for pair, _ in ranked[:k]]
+    return top_used(sat_info, k)
 
 def first_available_key(d: Dict, keys: List[str]):
     for k in keys:
@@ -194,13 +277,33 @@ def first_available_key(d: Dict, keys: List[str]):
 
 # ----------------------------- Plotters -----------------------------
 
-def plot_skyplot(sat_info: Dict, hour: int, out_png: Optional[str] = None):
+def new_figure(fig=None):
+    """
+    Figure to draw on: a new one, or `fig` cleared and made current so that batch
+    rendering reuses the same figures hour after hour.
+    """
+    if fig is None:
+        return plt.figure()
+    fig.clf()
+    plt.figure(fig.number)
+    return fig
+
+def finish_figure(fig, out_png: Optional[str], reused: bool):
+    """Save the figure if requested; figures created by the plotter are shown and closed."""
+    if out_png:
+        fig.savefig(out_png, bbox_inches="tight")
+    if not reused:
+        plt.show()
+        plt.close(fig)
+
+
+def plot_skyplot(sat_info: Dict, hour: int, out_png: Optional[str] = None, fig=None):
     """
     Build a skyplot for the *last epoch* of the specified hour.
     Uses 'azim_*' and 'elev_*' arrays.
     """
     times = safe_get(sat_info, 'recordTime', [])
-    if not isinstance(times, list) or len(times) == 0:
+    if not is_seq(times) or len(times) == 0:
         print("[skyplot] No recordTime found; skipping.")
         return
     T = len(times)
@@ -213,9 +316,9 @@ def plot_skyplot(sat_info: Dict, hour: int, out_png: Optional[str] = None):
         el_key = f"elev_{c}"
         az = safe_get(sat_info, az_key, [])
         el = safe_get(sat_info, el_key, [])
-        if isinstance(az, list) and len(az) > t_idx and isinstance(az[t_idx], list):
+        if is_seq(az) and len(az) > t_idx and is_seq(az[t_idx]):
             az_row = np.array(az[t_idx], dtype=float)
-            el_row = np.array(el[t_idx], dtype=float) if (isinstance(el, list) and len(el) > t_idx and isinstance(el[t_idx], list)) else np.array([])
+            el_row = np.array(el[t_idx], dtype=float) if (is_seq(el) and len(el) > t_idx and is_seq(el[t_idx])) else np.array([])
             if el_row.size == az_row.size and el_row.size > 0:
                 az_all.append(az_row)
                 el_all.append(el_row)
@@ -229,34 +332,34 @@ def plot_skyplot(sat_info: Dict, hour: int, out_png: Optional[str] = None):
     theta = np.deg2rad(az_arr)
     r = 90.0 - el_arr
 
-    fig = plt.figure()
+    reused = fig is not None
+    fig = new_figure(fig)
     ax = plt.subplot(111, projection='polar')
     ax.set_theta_zero_location('N')  # 0 deg at North
     ax.set_theta_direction(-1)       # clockwise
     ax.set_rlim(0, 90)
     ax.set_title(f"Skyplot (hour={hour:02d})")
     ax.scatter(theta, r, s=20)  # default colors/markers
-    if out_png:
-        fig.savefig(out_png, bbox_inches="tight")
-    plt.show()
-    plt.close(fig)
+    finish_figure(fig, out_png, reused)
 
 
-def plot_cno_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] = None):
+def plot_cno_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] = None, fig=None):
     """
     Plot C/N0 over time for the top-k 'used' satellites.
     Prefer CN0 from observation (per band G1/E1 as default). If mapping is
     ambiguous, fallback to CN0 series from satelliteInfomation.
     """
     times = safe_get(sat_info, 'recordTime', [])
-    if not isinstance(times, list) or len(times) == 0:
+    if not is_seq(times) or len(times) == 0:
         print("[C/N0] No recordTime found; skipping.")
         return
-    t_dt = to_datetime_list(times)
+    # (constellation, svid) -> column index of the hour, shared with plot_doppler_time
+    index = hour_series(obs, sat_info)
+    t_dt = index.times()
     T = len(t_dt)
 
     # Top-k used across time
-    top = pick_top_k_used(sat_info, k=4)
+    top = index.top_used(k=4)
     if not top:
         print("[C/N0] No 'used' satellites found; skipping.")
         return
@@ -279,7 +382,8 @@ def plot_cno_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] =
         'R': 'cno_R',
     }
 
-    fig = plt.figure()
+    reused = fig is not None
+    fig = new_figure(fig)
     plt.title(f"C/N0 vs time (hour={hour:02d}) - used SVs")
     for c, svid in top:
         # 1) Try observation mapping
@@ -287,56 +391,36 @@ def plot_cno_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] =
         preferred = cn0_keys_by_const.get(c, [])
         obs_key = first_available_key(obs, preferred) if preferred else None
         if obs_key is not None:
-            arr = ensure_TxN(safe_get(obs, obs_key, []))
-            arr = sanitize(arr)
-            # Build mapping per time step
-            for t in range(T):
-                # Candidate mapping list (VS) or fallback to sat-info SVID ordering
-                svIds_row = safe_get(sat_info, f"svId_{c}", [])
-                svIds_list = svIds_row[t] if (isinstance(svIds_row, list) and len(svIds_row) > t) else []
-                map_list = guess_vs_map(obs, c, t, svIds_list)
-                if arr.shape[0] > t and len(map_list) == arr.shape[1]:
-                    if svid in map_list:
-                        j = map_list.index(svid)
-                        series[t] = arr[t, j]
+            # Column of the satellite per time step: VS list, or sat-info SVID ordering
+            series = index.series(c, svid, obs_key)
         # 2) Fallback to sat-info CN0 if still all-NaN
         if np.all(np.isnan(series)):
             key = cn0_satinfo_keys.get(c, None)
             vals = safe_get(sat_info, key, [])
-            if isinstance(vals, list) and len(vals) == T:
-                for t in range(T):
-                    svIds_list = safe_get(sat_info, f"svId_{c}", [])
-                    svIds_t = svIds_list[t] if (isinstance(svIds_list, list) and len(svIds_list) > t) else []
-                    cno_t = vals[t] if (isinstance(vals[t], list)) else []
-                    if isinstance(cno_t, list) and len(cno_t) == len(svIds_t):
-                        for sv, cn in zip(svIds_t, cno_t):
-                            if int(sv) == int(svid):
-                                series[t] = float(cn)
-                                break
+            if is_seq(vals) and len(vals) == T:
+                series = index.series(c, svid, key, source='sat', sanitized=False)
         # Plot if anything valid
         if not np.all(np.isnan(series)):
             plt.plot(t_dt, series, label=f"{c}{svid}")
     plt.xlabel("Time")
     plt.ylabel("C/N0 (dB-Hz)")
     plt.legend()
-    if out_png:
-        fig.savefig(out_png, bbox_inches="tight")
-    plt.show()
-    plt.close(fig)
+    finish_figure(fig, out_png, reused)
 
 
-def plot_doppler_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] = None):
+def plot_doppler_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[str] = None, fig=None):
     """
     Plot Doppler over time for the same top-k 'used' satellites, using observation doMes_*.
     """
     times = safe_get(sat_info, 'recordTime', [])
-    if not isinstance(times, list) or len(times) == 0:
+    if not is_seq(times) or len(times) == 0:
         print("[Doppler] No recordTime found; skipping.")
         return
-    t_dt = to_datetime_list(times)
+    index = hour_series(obs, sat_info)
+    t_dt = index.times()
     T = len(t_dt)
 
-    top = pick_top_k_used(sat_info, k=4)
+    top = index.top_used(k=4)
     if not top:
         print("[Doppler] No 'used' satellites found; skipping.")
         return
@@ -349,43 +433,34 @@ def plot_doppler_time(obs: Dict, sat_info: Dict, hour: int, out_png: Optional[st
         'R': ['doMes_R1', 'doMes_R2'],
     }
 
-    fig = plt.figure()
+    reused = fig is not None
+    fig = new_figure(fig)
     plt.title(f"Doppler vs time (hour={hour:02d}) - used SVs")
     for c, svid in top:
         series = np.full((T,), np.nan)
         preferred = do_keys_by_const.get(c, [])
         obs_key = first_available_key(obs, preferred) if preferred else None
         if obs_key is not None:
-            arr = ensure_TxN(safe_get(obs, obs_key, []))
-            arr = sanitize(arr)
-            for t in range(T):
-                svIds_row = safe_get(sat_info, f"svId_{c}", [])
-                svIds_list = svIds_row[t] if (isinstance(svIds_row, list) and len(svIds_row) > t) else []
-                map_list = guess_vs_map(obs, c, t, svIds_list)
-                if arr.shape[0] > t and len(map_list) == arr.shape[1]:
-                    if svid in map_list:
-                        j = map_list.index(svid)
-                        series[t] = arr[t, j]
+            series = index.series(c, svid, obs_key)
         if not np.all(np.isnan(series)):
             plt.plot(t_dt, series, label=f"{c}{svid}")
     plt.xlabel("Time")
     plt.ylabel("Doppler (Hz)")
     plt.legend()
-    if out_png:
-        fig.savefig(out_png, bbox_inches="tight")
-    plt.show()
-    plt.close(fig)
+    finish_figure(fig, out_png, reused)
 
 
-def plot_pvt_and_accuracy(pvt: Dict, hour: int, out_png_traj: Optional[str] = None, out_png_acc: Optional[str] = None):
+def plot_pvt_and_accuracy(pvt: Dict, hour: int, out_png_traj: Optional[str] = None, out_png_acc: Optional[str] = None,
+                          fig_traj=None, fig_acc=None, trajectory: bool = True, accuracy: bool = True):
     """
     Plot (1) trajectory in lon-lat and (2) horizontal/vertical accuracy vs time.
+    `trajectory`/`accuracy` = False leaves that plot out.
     """
     times = safe_get(pvt, 'recordTime', [])
-    if not isinstance(times, list) or len(times) == 0:
+    if not is_seq(times) or len(times) == 0:
         print("[PVT] No recordTime found; skipping.")
         return
-    t_dt = to_datetime_list(times)
+    t_dt = plot_times(pvt, "[PVT]")
 
     lon = np.array(safe_get(pvt, 'lon', []), dtype=float)
     lat = np.array(safe_get(pvt, 'lat', []), dtype=float)
@@ -393,22 +468,24 @@ def plot_pvt_and_accuracy(pvt: Dict, hour: int, out_png_traj: Optional[str] = No
     vAcc = np.array(safe_get(pvt, 'vAcc', []), dtype=float)
 
     # (1) Trajectory
-    fig1 = plt.figure()
-    plt.title(f"PVT trajectory (hour={hour:02d})")
-    if lon.size and lat.size:
-        plt.plot(lon, lat, marker='.', linestyle='-')
-        plt.xlabel("Longitude (deg)")
-        plt.ylabel("Latitude (deg)")
-        plt.axis('equal')
-    else:
-        plt.text(0.5, 0.5, "No lon/lat data", ha='center', va='center')
-    if out_png_traj:
-        fig1.savefig(out_png_traj, bbox_inches="tight")
-    plt.show()
-    plt.close(fig1)
+    if trajectory:
+        reused = fig_traj is not None
+        fig1 = new_figure(fig_traj)
+        plt.title(f"PVT trajectory (hour={hour:02d})")
+        if lon.size and lat.size:
+            plt.plot(lon, lat, marker='.', linestyle='-')
+            plt.xlabel("Longitude (deg)")
+            plt.ylabel("Latitude (deg)")
+            plt.axis('equal')
+        else:
+            plt.text(0.5, 0.5, "No lon/lat data", ha='center', va='center')
+        finish_figure(fig1, out_png_traj, reused)
 
     # (2) Accuracy bars vs time
-    fig2 = plt.figure()
+    if not accuracy:
+        return
+    reused = fig_acc is not None
+    fig2 = new_figure(fig_acc)
     plt.title(f"Accuracy vs time (hour={hour:02d})")
     if hAcc.size:
         plt.plot(t_dt, hAcc, label='hAcc (m)')
@@ -417,22 +494,154 @@ def plot_pvt_and_accuracy(pvt: Dict, hour: int, out_png_traj: Optional[str] = No
     plt.xlabel("Time")
     plt.ylabel("Accuracy (m)")
     plt.legend()
-    if out_png_acc:
-        fig2.savefig(out_png_acc, bbox_inches="tight")
-    plt.show()
-    plt.close(fig2)
+    finish_figure(fig2, out_png_acc, reused)
+
+
+# ----------------------------- Batch -----------------------------
+
+# PNG name -> processed products it is drawn from
+BATCH_PLOTS = {
+    "skyplot": ("satelliteInfomation",),
+    "cno": ("observation", "satelliteInfomation"),
+    "doppler": ("observation", "satelliteInfomation"),
+    "trajectory": ("pvtSolution",),
+    "accuracy": ("pvtSolution",),
+}
+
+_BATCH_FIGURES: Dict[str, object] = {}  # one figure per PNG name, reused for every hour of a process
+
+def batch_figure(name: str):
+    if name not in _BATCH_FIGURES:
+        _BATCH_FIGURES[name] = plt.figure()
+    return _BATCH_FIGURES[name]
+
+def png_mtime(path: str) -> Optional[int]:
+    """Modification time of a PNG in ns, None when it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def is_up_to_date(out_png: str, inputs: List[str]) -> bool:
+    """True when the PNG exists and is newer than all the processed files it is drawn from."""
+    if not os.path.isfile(out_png):
+        return False
+    return os.path.getmtime(out_png) >= max(os.path.getmtime(path) for path in inputs)
+
+def render_hour(base: str, hour: int, out_dir: Optional[str] = None, force: bool = False) -> List[str]:
+    """
+    Render the PNGs of one hour that are missing or older than their processed files,
+    on the reused batch figures (no window is opened).
+
+    :param base: folder of the processed files of a day, e.g. 'processed data/12'
+    :param hour: hour (0-23)
+    :param out_dir: folder of the PNGs, default: base
+    :param force: render even the PNGs that are up to date
+    :return: names of the PNGs written, e.g. ['skyplot', 'cno']; a plot skipped for lack of
+             data is reported and left out
+    """
+    out_dir = out_dir or base
+    os.makedirs(out_dir, exist_ok=True)
+    inputs = {name: find_product(base, name, hour) for name in ("observation", "satelliteInfomation", "pvtSolution")}
+    pngs = {name: os.path.join(out_dir, f"{name}_{hour:02d}.png") for name in BATCH_PLOTS}
+    todo = [name for name, products in BATCH_PLOTS.items()
+            if all(inputs[p] for p in products)
+            and (force or not is_up_to_date(pngs[name], [inputs[p] for p in products]))]
+    if not todo:
+        return []
+    data = {p: load_product(inputs[p]) for p in sorted({p for name in todo for p in BATCH_PLOTS[name]})}
+    before = {name: png_mtime(pngs[name]) for name in todo}
+
+    if "skyplot" in todo:
+        plot_skyplot(data["satelliteInfomation"], hour, out_png=pngs["skyplot"], fig=batch_figure("skyplot"))
+    if "cno" in todo:
+        plot_cno_time(data["observation"], data["satelliteInfomation"], hour, out_png=pngs["cno"],
+                      fig=batch_figure("cno"))
+    if "doppler" in todo:
+        plot_doppler_time(data["observation"], data["satelliteInfomation"], hour, out_png=pngs["doppler"],
+                          fig=batch_figure("doppler"))
+    if "trajectory" in todo or "accuracy" in todo:
+        plot_pvt_and_accuracy(data["pvtSolution"], hour,
+                              out_png_traj=pngs["trajectory"] if "trajectory" in todo else None,
+                              out_png_acc=pngs["accuracy"] if "accuracy" in todo else None,
+                              fig_traj=batch_figure("trajectory"), fig_acc=batch_figure("accuracy"),
+                              trajectory="trajectory" in todo, accuracy="accuracy" in todo)
+    written = [name for name in todo if png_mtime(pngs[name]) not in (None, before[name])]
+    for name in todo:
+        if name not in written:
+            print(f"[WARN] {base} hour {hour:02d}: {name} not written")
+    return written
+
+def _render_unit(unit):
+    base, hour, out_dir, force = unit
+    return render_hour(base, hour, out_dir, force)
+
+def _init_batch_worker():
+    plt.switch_backend("Agg")
+
+def batch_units(root: str, days: Optional[List[int]] = None, hours: Optional[List[int]] = None,
+                out_root: Optional[str] = None, force: bool = False) -> List[Tuple]:
+    """(base, hour, out_dir, force) of every processed day/hour under root."""
+    if days is None:
+        days = sorted(int(d) for d in os.listdir(root) if d.isdigit() and os.path.isdir(os.path.join(root, d)))
+    units = []
+    for day in days:
+        base = os.path.join(root, str(day))
+        if not os.path.isdir(base):
+            print(f"[WARN] Missing day folder: {base}")
+            continue
+        out_dir = os.path.join(out_root, str(day)) if out_root else base
+        units += [(base, hour, out_dir, force) for hour in list_available_hours(base)
+                  if hours is None or hour in hours]
+    return units
+
+def render_batch(root: str = PROCESSED_DIR, days: Optional[List[int]] = None, hours: Optional[List[int]] = None,
+                 out_root: Optional[str] = None, workers: Optional[int] = None, force: bool = False) -> int:
+    """
+    Render the PNGs of every day and hour under root with the Agg backend, in a pool
+    of processes (workers=1 renders in this process). Returns the number of PNGs written.
+    """
+    plt.switch_backend("Agg")
+    units = batch_units(root, days, hours, out_root, force)
+    t0 = time.perf_counter()
+    written = 0
+    if workers == 1:
+        results = map(_render_unit, units)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker)
+        results = pool.map(_render_unit, units)
+    for (base, hour, out_dir, _), names in zip(units, results):
+        written += len(names)
+        print(f"[OK] {base} hour {hour:02d}: " + (", ".join(names) if names else "up to date"))
+    if workers != 1:
+        pool.shutdown()
+    print(f"[DONE] {written} PNGs for {len(units)} hours in {time.perf_counter() - t0:.1f} s")
+    return written
 
 
 # ----------------------------- Main -----------------------------
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--base", required=True, help="Base directory containing processed JSONs, e.g., 'GNSS_dataset\\Processed data\\12'")
+    parser.add_argument("--base", default=None, help="Base directory containing processed JSONs, e.g., 'GNSS_dataset\\Processed data\\12'")
     parser.add_argument("--hour", type=int, default=None, help="Hour to process (0-23). If omitted, the script will try to pick one automatically.")
     parser.add_argument("--save", action="store_true", help="If set, saves PNGs in the base directory.")
+    parser.add_argument("--batch", action="store_true", help="Render the PNGs of every day/hour under --root without opening windows.")
+    parser.add_argument("--root", default=PROCESSED_DIR, help="Batch: processed data folder, one sub-folder per day.")
+    parser.add_argument("--days", type=int, nargs="+", default=None, help="Batch: days to render (default: all).")
+    parser.add_argument("--hours", type=int, nargs="+", default=None, help="Batch: hours to render (default: all).")
+    parser.add_argument("--out", default=None, help="Batch: folder of the PNGs (default: next to the processed files).")
+    parser.add_argument("--workers", type=int, default=None, help="Batch: rendering processes (default: CPU count, 1 = no pool).")
+    parser.add_argument("--force", action="store_true", help="Batch: render PNGs even when newer than their inputs.")
     args = parser.parse_args()
 
+    if args.batch:
+        render_batch(args.root, args.days, args.hours, args.out, args.workers, args.force)
+        return
+
     base = args.base
+    if base is None:
+        parser.error("--base is required unless --batch is given")
     if not os.path.isdir(base):
         raise SystemExit(f"[ERR] Base directory not found: {base}")
 
@@ -446,20 +655,20 @@ def main():
         print(f"[INFO] No --hour given. Using detected hour: {hour:02d}")
 
     def path_of(name: str) -> str:
-        return os.path.join(base, f"{name}{hour}.json")
+        # <name><hour>.npz (or .spz) when present, otherwise <name><hour>.json
+        path = find_product(base, name, hour)
+        if path is None:
+            raise SystemExit(f"[ERR] Missing file: {os.path.join(base, f'{name}{hour}.json')}")
+        return path
 
     obs_path = path_of("observation")
     pvt_path = path_of("pvtSolution")
     sat_path = path_of("satelliteInfomation")
 
-    for p in (obs_path, pvt_path, sat_path):
-        if not os.path.isfile(p):
-            raise SystemExit(f"[ERR] Missing file: {p}")
-
     print(f"[INFO] Loading:\n  - {obs_path}\n  - {sat_path}\n  - {pvt_path}")
-    obs = load_json(obs_path)
-    sat = load_json(sat_path)
-    pvt = load_json(pvt_path)
+    obs = load_product(obs_path)
+    sat = load_product(sat_path)
+    pvt = load_product(pvt_path)
 
     # Produce plots
     out_dir = base if args.save else None
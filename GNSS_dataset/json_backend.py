@@ -0,0 +1,85 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+JSON parsing backend shared by the readers of the raw and processed files.
+
+The fastest installed parser is used:
+  - 'orjson'   (pip install orjson)
+  - 'simdjson' (pip install pysimdjson)
+  - 'json'     the standard library, always available
+
+Set the environment variable GNSS_JSON_BACKEND (e.g. GNSS_JSON_BACKEND=json) or call
+set_backend() to choose one. Documents that an accelerated parser rejects (e.g. the NaN
+written in the gaps of pvtSolutionHH.json) are parsed again with the standard library,
+so every backend returns the same values.
+
+"""
+
+import json, os
+
+BACKENDS = {'json': json.loads}
+
+try:
+    import orjson
+    BACKENDS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import simdjson
+
+    def _simdjson_loads(data, _parser=simdjson.Parser()):
+        value = _parser.parse(data)
+        return value.as_dict() if isinstance(value, simdjson.Object) else \
+            value.as_list() if isinstance(value, simdjson.Array) else value
+
+    BACKENDS['simdjson'] = _simdjson_loads
+except ImportError:
+    pass
+
+PREFERRED = ('orjson', 'simdjson', 'json')
+
+
+def available_backends():
+    """Names of the installed backends, fastest first."""
+    return [name for name in PREFERRED if name in BACKENDS]
+
+
+def set_backend(name=None):
+    """
+    Select the parser used by loads() and load_file().
+
+    :param name: 'orjson', 'simdjson' or 'json'; None selects the fastest installed one
+    :return: name of the selected backend
+    """
+    global _backend, _loads
+    if name is None:
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError('JSON backend %r is not installed, available: %s' % (name, available_backends()))
+    _backend, _loads = name, BACKENDS[name]
+    return name
+
+
+def get_backend():
+    """Name of the selected backend."""
+    return _backend
+
+
+def loads(data):
+    """Parse a JSON document given as bytes or str."""
+    try:
+        return _loads(data)
+    except ValueError:  # orjson.JSONDecodeError and simdjson errors are ValueError subclasses
+        if _loads is json.loads:
+            raise
+        return json.loads(data)
+
+
+def load_file(path):
+    """Read and parse a JSON file, equivalent to json.load(open(path, encoding='utf-8'))."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+set_backend(os.environ.get('GNSS_JSON_BACKEND') or None)
@@ -0,0 +1,665 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Live ingestion of the raw JSON files while the logger writes them: every new epoch is
+decoded as soon as its files land and appended to the processed products of its hour,
+instead of waiting for the Raw_data/<day>/<hour>/ folder to be complete.
+
+Two asyncio producers feed one queue of raw files:
+
+  watch   polls the Raw_data tree every POLL seconds. The newest hour folder at start and
+          every hour folder created afterwards are followed (the older hours are left to
+          extract_process_data.py). A file that does not parse yet, because it is still
+          being written, is read again at the next poll.
+  replay  plays a recorded hour (a Raw_data folder or an archive of it, see raw_source.py)
+          with the timing of its files, accelerated `speed` times. The files are either put
+          straight on the queue, or written into another Raw_data tree (--into) that is
+          watched, which tests the whole chain.
+
+The consumer (LiveIngest) decodes every file as main_code_rax/sat/span do and appends its
+epoch to the hour (LiveHour): observationHH, satelliteInfomationHH and spectrumHH are spooled
+by a StreamingHourWriter every `chunk_size` epochs. The four PVT messages are joined on their
+time (EpochJoin): an epoch is released as soon as its four files have arrived, or once a file
+LAG seconds later has arrived, with NaN in the gaps as join_on_time does. An hour is closed,
+its files assembled and recorded in the manifest, once a newer hour receives files and it
+has been idle for IDLE seconds, or at the end of the run. A run stopped by Ctrl-C or by a
+failing producer still writes its hours, without recording them. With --snapshot, the files
+of the hour in progress are also written every few seconds. When the files arrive in time
+order, a closed hour is byte-identical to the output of extract_process_data.py.
+
+The rolling summary (RollingSummary) is updated at every epoch: satellites used, mean C/N0
+of the used signals, hAcc and pDOP averaged over the last SUMMARY_WINDOW epochs, gaps, and
+the latency from the arrival of the last file of an epoch to its summary. It is printed
+every `every` seconds and, with --summary, written to a JSON file that other tools can poll.
+
+USAGE:
+    python live_ingest.py --formats npz --summary live_summary.json
+    python live_ingest.py --replay 12 14 --speed 60
+    python live_ingest.py --replay 12 14 --speed 0 --raw ../GNSS_Dataset_part1.zip --into ../live_test/Raw_data
+
+"""
+
+import argparse, asyncio, json, os, time
+
+from accumulator import EpochAccumulator
+from detector import RollingStats
+from extract_process_data import OBSERVATION_KEYS, PRODUCT_ITEMS, PRODUCT_MESSAGES, PVT_MESSAGES, SATELLITE_KEYS
+from json_backend import loads
+from manifest import Manifest
+from processed_io import FORMATS, StreamingHourWriter
+from raw_source import RAW_DIR, FolderSource, open_source
+from time_join import file_start_time, time_keys
+from ubx_decode import (RAX_COLUMNS, RAX_FIELDS, RAX_WIDTH, VS_WIDTH, rax_layout, scatter_rax,
+                        SAT_COLUMNS, SAT_FIELDS, SAT_FILL, SAT_WIDTH, sat_layout, scatter_sat,
+                        decode_columns, span_arrays, span_keys, scatter_span)
+
+POLL = 0.2  # s between two scans of the watched tree
+LAG = 2.0  # s of record time after which an incomplete epoch is released with gaps
+IDLE = 10.0  # s without files after which an hour older than the newest one is closed
+CHUNK_SIZE = 60  # epochs spooled at once by the writers
+RETRIES = 50  # polls during which a file that does not parse is read again
+ACTIVE_HOURS = 2  # hour folders followed by the watcher: the newest and the one before
+SUMMARY_WINDOW = 60  # epochs of the rolling summary
+
+PVT_MSGS = [msg for msg, fields in PVT_MESSAGES]
+SUMMARY_FIELDS = ['numSV', 'svUsed', 'numMeas', 'cn0', 'hAcc', 'pDOP', 'latency']
+_SAT_USED, _SAT_CNO = SAT_COLUMNS.index('svUsed'), SAT_COLUMNS.index('cno')
+
+
+def _number(name):
+    """Day or hour of a folder name, as an int when it is one (the keys of extract_process_data.py)."""
+    return int(name) if name.isdigit() else name
+
+
+def epoch_key(content, name):
+    """Epoch of a raw file in ms, from its 'start_time' or its name (see time_join.file_start_time)."""
+    key = time_keys([file_start_time(content, name)])[0]
+    if isinstance(key, str):
+        raise ValueError('start_time %r cannot be parsed' % key)
+    return int(key)
+
+
+def epoch_values(msg, content, cols=None):
+    """
+    Values of one raw file shown by the rolling summary.
+
+    :param msg: message of the file, e.g. 'NAV-PVT'
+    :param content: json file content opened by python
+    :param cols: decode_columns() of a NAV-SAT file, when already decoded
+    :return: {summary field: value}, empty for the messages that are not summarized
+    """
+    if msg == 'RXM-RAWX':
+        return {'numMeas': content['numMeas']}
+    if msg == 'NAV-SAT':
+        if cols is None:
+            cols = decode_columns(content, 'numSvs', SAT_COLUMNS)
+        used = cols[_SAT_USED] > 0
+        return {'svUsed': int(used.sum()), 'cn0': float(cols[_SAT_CNO, used].mean()) if used.any() else float('nan')}
+    if msg == 'NAV-PVT':
+        return {'numSV': content['numSV'], 'hAcc': content['hAcc'] / 1000.0}
+    if msg == 'NAV-DOP':
+        return {'pDOP': content['pDOP']}
+    return {}
+
+
+class EpochJoin:
+    """
+    Join of the files of several messages on their epoch, released in time order: an epoch
+    as soon as all the messages have arrived, an incomplete one once an epoch lag_ms later
+    has arrived. A file of an epoch already released is late and rejected.
+    """
+
+    def __init__(self, messages, lag_ms):
+        self.messages = set(messages)
+        self.lag_ms = lag_ms
+        self.pending = {}  # epoch -> {msg: value}
+        self.latest = None  # newest epoch received
+        self.released = None  # newest epoch released
+
+    def add(self, key, msg, value):
+        """Add the value of one file, return False when its epoch has already been released."""
+        if self.released is not None and key <= self.released:
+            return False
+        self.pending.setdefault(key, {})[msg] = value  # a duplicated file replaces the first one
+        if self.latest is None or key > self.latest:
+            self.latest = key
+        return True
+
+    def ready(self, flush=False):
+        """
+        Release the epochs that are complete or stale, oldest first.
+
+        :param flush: release all the pending epochs, at the end of an hour
+        :return: [(epoch, {msg: value})]
+        """
+        released = []
+        while self.pending:
+            key = min(self.pending)
+            values = self.pending[key]
+            if not (flush or self.messages <= values.keys() or self.latest - key >= self.lag_ms):
+                break
+            released.append((key, self.pending.pop(key)))
+            self.released = key
+        return released
+
+
+class LiveHour:
+    """
+    Processed products of one hour, appended epoch by epoch.
+
+    :param day: day of the hour, the folder of its processed files
+    :param hour: hour, from 0 to 23
+    :param products: any of 'rax', 'sat', 'pvt' and 'span'
+    :param formats: output formats, any of 'json', 'npz' and 'spz'
+    :param chunk_size: epochs kept in memory before they are spooled to the writers
+    :param lag_ms: delay in ms of record time of the incomplete PVT epochs (EpochJoin)
+    """
+
+    def __init__(self, day, hour, products, formats=('json',), chunk_size=CHUNK_SIZE, lag_ms=LAG * 1000):
+        self.day, self.hour, self.products, self.formats = day, hour, products, formats
+        self.chunk_size = chunk_size
+        self.writers = {product: StreamingHourWriter(day, hour, PRODUCT_ITEMS[product], formats)
+                        for product in products}
+        self.files = self.dropped = 0  # files read; files missing from the products (late or unreadable)
+        self.last_arrival = time.perf_counter()
+        self.rax = EpochAccumulator(chunk_size)
+        self.rax.add_block('vs', rax_layout(), 1, VS_WIDTH)
+        self.rax.add_block('obs', rax_layout(), len(RAX_FIELDS), RAX_WIDTH)
+        self.sat = EpochAccumulator(chunk_size)
+        self.sat.add_block('sat', sat_layout(), len(SAT_FIELDS), SAT_WIDTH,
+                           fill=[SAT_FILL.get(field, 0.0) for field in SAT_FIELDS])
+        self.span, self.span_count = span_arrays(chunk_size), 0
+        self.pvt = EpochJoin(PVT_MSGS, lag_ms)
+        self.pvt_keys = ['recordTime'] + [field for msg, fields in PVT_MESSAGES for field in fields]
+        self.times = {product: [] for product in products}  # recordTime of the epochs not spooled yet
+        self.numSvs = []
+        self.pvt_rows = [[] for key in self.pvt_keys[1:]]
+
+    def add(self, msg, content, name, key):
+        """
+        Append the epoch of one raw file.
+
+        :param msg: message of the file, e.g. 'RXM-RAWX'
+        :param content: json file content opened by python
+        :param name: file name, for the time of the files without 'start_time'
+        :param key: epoch of the file in ms (epoch_key)
+        :return: epoch_values() of the file
+        """
+        self.files += 1
+        self.last_arrival = time.perf_counter()
+        cols = None
+        # everything that can fail on a malformed file is read before the epoch is appended,
+        # so that a skipped file leaves recordTime and the rows of the product aligned
+        if msg == 'RXM-RAWX':
+            start_time, measurements = content['start_time'], decode_columns(content, 'numMeas', RAX_COLUMNS)
+            if self.rax.count == self.rax.numEpochs:
+                self._spool('rax')
+            t = self.rax.count
+            scatter_rax(measurements, self.rax.block_row('obs', t), self.rax.block_row('vs', t)[0])
+            self.times['rax'].append(start_time)
+        elif msg == 'NAV-SAT':
+            start_time, numSvs = content['start_time'], content['numSvs']
+            cols = decode_columns(content, 'numSvs', SAT_COLUMNS)
+            if self.sat.count == self.sat.numEpochs:
+                self._spool('sat')
+            scatter_sat(cols, self.sat.block_row('sat', self.sat.count))
+            self.times['sat'].append(start_time)
+            self.numSvs.append(numSvs)
+        elif msg == 'MON-SPAN':
+            start_time = content['start_time']
+            if self.span_count == self.chunk_size:
+                self._spool('span')
+            try:
+                scatter_span(content, self.span, self.span_count)
+            except (KeyError, TypeError, ValueError):
+                for array in self.span.values():  # blocks copied before the error
+                    array[self.span_count] = 0
+                raise
+            self.times['span'].append(start_time)
+            self.span_count += 1
+        elif msg in PVT_MSGS:
+            fields = PVT_MESSAGES[PVT_MSGS.index(msg)][1]
+            if not self.pvt.add(key, msg, (file_start_time(content, name), [content[field] for field in fields])):
+                self.dropped += 1
+                print('late file dropped from pvtSolution%s: %s/%s %s' % (self.hour, self.day, msg, name))
+            self._release_pvt()
+        return epoch_values(msg, content, cols)
+
+    def _release_pvt(self, flush=False):
+        for key, values in self.pvt.ready(flush):
+            # recordTime of the first message present, as join_on_time takes it
+            self.times['pvt'].append(next(values[msg][0] for msg in PVT_MSGS if msg in values))
+            column = iter(self.pvt_rows)
+            for msg, fields in PVT_MESSAGES:
+                row = values[msg][1] if msg in values else [float('nan')] * len(fields)
+                for value in row:
+                    next(column).append(value)
+        if len(self.times['pvt']) >= self.chunk_size:
+            self._spool('pvt')
+
+    def _spool(self, product):
+        """Append the epochs kept in memory to the writer of a product, then clear them."""
+        times = self.times[product]
+        if product == 'rax':
+            chunk = [times] + [self.rax.get(key) for key in OBSERVATION_KEYS[1:]]
+            keys = OBSERVATION_KEYS
+        elif product == 'sat':
+            chunk = [times, self.numSvs] + [self.sat.get(key) for key in SATELLITE_KEYS[2:]]
+            keys = SATELLITE_KEYS
+        elif product == 'span':
+            chunk = [times] + [self.span[key][:self.span_count] for key in span_keys()]
+            keys = ['recordTime'] + span_keys()
+        else:
+            chunk, keys = [times] + self.pvt_rows, self.pvt_keys
+        # get() returns views of the accumulators: they are cleared once the rows are written
+        self.writers[product].append(dict(zip(keys, chunk)))
+        self.times[product] = []
+        if product == 'rax':
+            self.rax.clear()
+        elif product == 'sat':
+            self.sat.clear()
+            self.numSvs = []
+        elif product == 'span':
+            self.span, self.span_count = span_arrays(self.chunk_size), 0
+        else:
+            self.pvt_rows = [[] for key in self.pvt_keys[1:]]
+
+    def snapshot(self):
+        """Write the files of the hour with the epochs received so far, return the written paths."""
+        paths = []
+        for product in self.products:
+            if self.times[product]:
+                self._spool(product)
+            paths += self.writers[product].write()
+        return paths
+
+    def close(self):
+        """Release the pending PVT epochs and write the files of the hour: {product: {format: path}}."""
+        if 'pvt' in self.products:
+            self._release_pvt(flush=True)
+        outputs = {}
+        for product in self.products:
+            self._spool(product)  # also registers the keys of a product without epochs
+            outputs[product] = dict(zip(self.formats, self.writers[product].close()))
+        return outputs
+
+
+class RollingSummary:
+    """
+    Per-epoch summary of the files of all the messages, joined on their epoch (EpochJoin),
+    with the mean of every SUMMARY_FIELDS value over the last `window` epochs (RollingStats).
+
+    :param messages: messages of the ingested files
+    :param window: epochs of the rolling means
+    :param lag_ms: delay in ms of record time of the incomplete epochs
+    """
+
+    def __init__(self, messages, window=SUMMARY_WINDOW, lag_ms=LAG * 1000):
+        self.join = EpochJoin(messages, lag_ms)
+        self.window = window
+        self.stats = {field: RollingStats(window) for field in SUMMARY_FIELDS}
+        self.epochs = self.gaps = self.files = self.errors = self.late = 0
+        self.latency_max = 0.0
+        self.last = None  # (day, hour, recordTime) of the last epoch
+
+    def add(self, day, hour, start_time, key, msg, values, arrived):
+        """Add the epoch_values() of one file, arrived at time.perf_counter() `arrived`."""
+        self.files += 1
+        if not self.join.add(key, msg, ((day, hour, start_time), values, arrived)):
+            self.late += 1
+
+    def update(self, flush=False):
+        """Fold the released epochs into the rolling means, return the number of epochs released."""
+        released = self.join.ready(flush)
+        now = time.perf_counter()
+        for key, files in released:
+            merged, last_arrival = {}, 0.0
+            for where, values, arrived in files.values():
+                merged.update(values)
+                last_arrival = max(last_arrival, arrived)
+            latency = (now - last_arrival) * 1000.0
+            merged['latency'] = latency
+            for field in SUMMARY_FIELDS:
+                self.stats[field].push(merged.get(field, float('nan')))
+            self.latency_max = max(self.latency_max, latency)
+            self.epochs += 1
+            self.gaps += not self.join.messages <= files.keys()
+            self.last = min(where for where, values, arrived in files.values())
+        return len(released)
+
+    def as_dict(self):
+        """The summary as published in the --summary file."""
+        day, hour, start_time = self.last or (None, None, None)
+        content = {'day': day, 'hour': hour, 'recordTime': start_time, 'epochs': self.epochs, 'gaps': self.gaps,
+                   'files': self.files, 'late': self.late, 'errors': self.errors, 'window': self.window}
+        for field in SUMMARY_FIELDS:
+            mean = self.stats[field].mean()
+            content[field] = None if mean != mean else round(mean, 3)
+        content['latency_max'] = round(self.latency_max, 3)
+        return content
+
+    def format(self):
+        """One line summary, e.g. '12/14 2023-09-12 14:23:05  1385 epochs (0 gaps)  24 SV  C/N0 41.2 dB-Hz ...'."""
+        s = self.as_dict()
+
+        def value(field, fmt):
+            return '-' if s[field] is None else fmt % s[field]
+
+        return '%s/%s %s  %d epochs (%d gaps)  %s SV  C/N0 %s dB-Hz  hAcc %s m  pDOP %s  latency %s ms (max %.1f)' % (
+            s['day'], s['hour'], s['recordTime'], s['epochs'], s['gaps'], value('svUsed', '%.0f'),
+            value('cn0', '%.1f'), value('hAcc', '%.2f'), value('pDOP', '%.2f'), value('latency', '%.1f'),
+            s['latency_max'])
+
+
+class LiveIngest:
+    """
+    Consumer of the raw files put on a queue by watch_tree() or replay_hour().
+
+    :param products: any of 'rax', 'sat', 'pvt' and 'span'
+    :param formats: output formats, any of 'json', 'npz' and 'spz'
+    :param chunk_size: epochs kept in memory before they are spooled to the writers
+    :param lag: s of record time after which an incomplete epoch is released
+    :param idle: s without files after which an hour older than the newest one is closed
+    :param snapshot: s between two snapshots of the files of the newest hour, 0 for none
+    :param every: s between two summary lines (and writes of summary_path)
+    :param summary_path: JSON file where the summary is published, None for none
+    :param source: raw source of the files (see raw_source.py), to record the closed hours
+                   in the manifest; None leaves the manifest untouched
+    :param verbose: print the summary lines
+    """
+
+    def __init__(self, products=('rax', 'sat', 'pvt'), formats=('json',), chunk_size=CHUNK_SIZE, lag=LAG, idle=IDLE,
+                 snapshot=0.0, every=1.0, summary_path=None, source=None, verbose=True):
+        self.products, self.formats, self.chunk_size = list(products), list(formats), chunk_size
+        self.lag_ms, self.idle, self.snapshot, self.every = lag * 1000, idle, snapshot, every
+        self.summary_path, self.source, self.verbose = summary_path, source, verbose
+        self.messages = [msg for product in self.products for msg in PRODUCT_MESSAGES[product]]
+        self.hours = {}  # (day, hour) -> LiveHour
+        self.newest = None
+        self.summary = RollingSummary(self.messages, lag_ms=self.lag_ms)
+        self.written = {}  # (day, hour) -> {product: {format: path}}
+        now = time.perf_counter()
+        self.next_summary, self.next_snapshot = now + every, now + snapshot
+
+    def add(self, day, hour, msg, name, content, arrived):
+        """Process one raw file of the queue, content None for a file that could not be read."""
+        if (day, hour) not in self.hours:
+            self.hours[(day, hour)] = LiveHour(day, hour, self.products, self.formats, self.chunk_size, self.lag_ms)
+            self.newest = (day, hour)
+        try:
+            if content is None:
+                raise ValueError('the file cannot be read')
+            key = epoch_key(content, name)
+            values = self.hours[(day, hour)].add(msg, content, name, key)
+        except (KeyError, TypeError, ValueError) as e:
+            self.summary.errors += 1
+            self.hours[(day, hour)].dropped += 1
+            print('skipped %s/%s/%s/%s: %r' % (day, hour, msg, name, e))
+            return
+        self.summary.add(day, hour, file_start_time(content, name), key, msg, values, arrived)
+
+    def close_hour(self, day, hour):
+        """Write the files of an hour and record them in the manifest, unless files were dropped."""
+        live = self.hours.pop((day, hour))
+        outputs = self.written[(day, hour)] = live.close()
+        print('closed day=%s hour=%s: %d files, %s' % (day, hour, live.files, ', '.join(
+            path for paths in outputs.values() for path in paths.values())))
+        if self.source is not None and not live.dropped:
+            manifest = Manifest()
+            for product, paths in outputs.items():
+                manifest.record(product, day, hour, Manifest.inputs(self.source, day, hour, PRODUCT_MESSAGES[product]),
+                                paths)
+            manifest.save()
+
+    def publish(self):
+        """Print the summary and write it to summary_path."""
+        if self.verbose:
+            print(self.summary.format())
+        if self.summary_path:
+            tmp = self.summary_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.summary.as_dict(), f, indent=1)
+            os.replace(tmp, self.summary_path)
+
+    def tick(self):
+        """Update the summary, then publish it, snapshot the newest hour and close the idle hours when they are due."""
+        self.summary.update()
+        now = time.perf_counter()
+        if now >= self.next_summary and self.summary.epochs:
+            self.publish()
+            self.next_summary = now + self.every
+        if self.snapshot and now >= self.next_snapshot and self.newest in self.hours:
+            self.hours[self.newest].snapshot()
+            self.next_snapshot = now + self.snapshot
+        for day, hour in [k for k, live in self.hours.items()
+                          if k != self.newest and now - live.last_arrival >= self.idle]:
+            self.close_hour(day, hour)
+
+    async def run(self, queue):
+        """
+        Process the queue until None is received, then close all the hours.
+
+        :param queue: asyncio.Queue of (day, hour, msg, name, content, arrived) tuples
+        :return: {(day, hour): {product: {format: path}}} of the closed hours
+        """
+        timeout = min(self.every, POLL)
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self.add(*item)
+            self.tick()
+        return self.finish()
+
+    def finish(self):
+        """Release the pending epochs and close all the hours, at the end of the run or when it is interrupted."""
+        self.summary.update(flush=True)
+        for day, hour in list(self.hours):
+            self.close_hour(day, hour)
+        self.publish()
+        return self.written
+
+
+def _hour_folders(root):
+    """(day, hour) names of the hour folders of a Raw_data tree."""
+    folders = []
+    for day in os.listdir(root):
+        if os.path.isdir(os.path.join(root, day)):
+            folders += [(day, hour) for hour in os.listdir(os.path.join(root, day))
+                        if os.path.isdir(os.path.join(root, day, hour))]
+    return folders
+
+
+async def watch_tree(queue, root=RAW_DIR, messages=('RXM-RAWX',), poll=POLL, stop=None, new_only=False):
+    """
+    Put the raw files written into a Raw_data tree on a queue, in time order.
+
+    :param queue: asyncio.Queue read by LiveIngest.run
+    :param root: Raw_data folder, <root>/<day>/<hour>/<msg>/<YYYY-MM-DD HH-MM-SS>.json
+    :param messages: messages to follow
+    :param poll: s between two scans
+    :param stop: asyncio.Event; once set, the tree is scanned a last time and None is put on the queue
+    :param new_only: only follow the hour folders created after the start, not the newest existing one
+    """
+    known = set(_hour_folders(root)) if os.path.isdir(root) else set()
+    active = [] if new_only or not known else [max(known, key=lambda k: os.path.getmtime(os.path.join(root, *k)))]
+    seen, tries = {}, {}  # names read per folder; polls of the files that do not parse yet
+    while True:
+        final = stop is not None and stop.is_set()
+        if os.path.isdir(root):
+            for folder in sorted(set(_hour_folders(root)) - known):
+                known.add(folder)
+                active.append(folder)
+            del active[:-ACTIVE_HOURS]
+        found = []
+        for day, hour in active:
+            for order, msg in enumerate(messages):
+                try:
+                    names = os.listdir(os.path.join(root, day, hour, msg))
+                except FileNotFoundError:
+                    continue
+                done = seen.setdefault((day, hour, msg), set())
+                found += [(name, order, day, hour, msg) for name in names if name.endswith('.json') and name not in done]
+        # the file names are their times: epoch by epoch, in the order of the messages
+        for name, order, day, hour, msg in sorted(found):
+            path = os.path.join(root, day, hour, msg, name)
+            try:
+                with open(path, 'rb') as f:
+                    content = loads(f.read())
+            except (OSError, ValueError):
+                tries[path] = tries.get(path, 0) + 1
+                if tries[path] < RETRIES and not final:
+                    continue
+                content = None  # given up: the hour is not recorded in the manifest
+            await queue.put((_number(day), _number(hour), msg, name, content, time.perf_counter()))
+            tries.pop(path, None)
+            seen[(day, hour, msg)].add(name)
+        if final:
+            await queue.put(None)
+            return
+        await asyncio.sleep(poll)
+
+
+async def replay_hour(queue, raw, day, hour, messages=('RXM-RAWX',), speed=60.0, into=None):
+    """
+    Play a recorded hour with the timing of its files, for testing the live mode.
+
+    :param queue: asyncio.Queue read by LiveIngest.run, unused with into
+    :param raw: Raw_data folder of the recording, or an archive of it (.zip, .tar.*, .7z)
+    :param day: day of the recorded hour
+    :param hour: hour of the recorded hour
+    :param messages: messages to play
+    :param speed: acceleration: 60 plays an hour in one minute, 0 as fast as possible
+    :param into: Raw_data folder where the files are written (atomically) instead of being
+                 put on the queue, to be read back by watch_tree()
+    :return: number of files played
+    """
+    source = open_source(raw)
+    source.want([(day, hour, msg) for msg in messages])
+    events = []
+    for order, msg in enumerate(messages):
+        try:
+            names = source.names(day, hour, msg)
+        except FileNotFoundError:
+            continue
+        # the time in the names: the files are not read before they are played
+        keys = time_keys(source.times(day, hour, msg) or [file_start_time({}, name) for name in names])
+        events += [(int(key), order, msg, name) for key, name in zip(keys, names)]
+    events.sort()
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for key, order, msg, name in events:
+        delay = start + (key - events[0][0]) / 1000.0 / speed - loop.time() if speed else 0
+        await asyncio.sleep(max(delay, 0))
+        data = source.read(day, hour, msg, name)
+        if into is None:
+            await queue.put((day, hour, msg, name, loads(data), time.perf_counter()))
+            continue
+        folder = os.path.join(into, str(day), str(hour), msg)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, name + '.part'), 'wb') as f:
+            f.write(data)
+        os.replace(os.path.join(folder, name + '.part'), os.path.join(folder, name))
+    for msg in messages:
+        source.release(day, hour, msg)
+    return len(events)
+
+
+async def main_code_live(products=('rax', 'sat', 'pvt'), formats=('json',), root=RAW_DIR, poll=POLL, replay=None,
+                         raw=RAW_DIR, speed=60.0, into=None, **options):
+    """
+    Run the live mode: watch a Raw_data tree, or replay a recorded hour.
+
+    :param products: any of 'rax', 'sat', 'pvt' and 'span'
+    :param formats: output formats, any of 'json', 'npz' and 'spz'
+    :param root: Raw_data folder watched (without replay)
+    :param poll: s between two scans of the watched folder
+    :param replay: (day, hour) of the recorded hour to play, None to watch root
+    :param raw: Raw_data folder or archive of the replayed hour
+    :param speed: acceleration of the replay, 0 as fast as possible
+    :param into: with replay, Raw_data folder where the files are written and watched
+    :param options: other LiveIngest parameters (chunk_size, lag, idle, snapshot, every, summary_path, verbose)
+    :return: {(day, hour): {product: {format: path}}} of the closed hours
+    """
+    queue = asyncio.Queue()
+    if replay is None:
+        ingest = LiveIngest(products, formats, source=FolderSource(root), **options)
+        tasks = [watch_tree(queue, root, ingest.messages, poll)]
+    elif into is None:
+        ingest = LiveIngest(products, formats, source=open_source(raw), **options)
+
+        async def play():
+            await replay_hour(queue, raw, replay[0], replay[1], ingest.messages, speed)
+            await queue.put(None)
+        tasks = [play()]
+    else:
+        ingest = LiveIngest(products, formats, source=FolderSource(into), **options)
+        stop = asyncio.Event()
+
+        async def play():
+            await replay_hour(queue, raw, replay[0], replay[1], ingest.messages, speed, into)
+            stop.set()
+        tasks = [play(), watch_tree(queue, into, ingest.messages, poll, stop)]
+    consumer = asyncio.ensure_future(ingest.run(queue))
+    producers = [asyncio.ensure_future(task) for task in tasks]
+    try:
+        # returns once all the tasks are done, or as soon as one of them fails
+        await asyncio.wait([consumer] + producers, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # a failed or interrupted (Ctrl-C) producer never puts None: stop the others, then let
+        # the consumer process the files already queued and write the hours, which are then
+        # left out of the manifest as they may miss files of their raw folders
+        if not all(task.done() and not task.cancelled() and task.exception() is None for task in producers):
+            ingest.source = None
+        for task in producers:
+            task.cancel()
+        queue.put_nowait(None)
+        results = await asyncio.gather(*producers, return_exceptions=True)
+        written = await consumer
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Process the raw files as they are written, or replay a recorded hour.')
+    parser.add_argument('--products', nargs='+', choices=sorted(PRODUCT_ITEMS), default=['rax', 'sat', 'pvt'])
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['json'], help='output format(s) of the processed files')
+    parser.add_argument('--root', default=RAW_DIR, help='Raw_data folder to watch')
+    parser.add_argument('--poll', type=float, default=POLL, help='s between two scans of the watched folder')
+    parser.add_argument('--replay', type=int, nargs=2, metavar=('DAY', 'HOUR'), default=None,
+                        help='replay a recorded hour instead of watching --root')
+    parser.add_argument('--raw', default=RAW_DIR, help='Raw_data folder or archive of the replayed hour')
+    parser.add_argument('--speed', type=float, default=60.0, help='acceleration of the replay, 0 as fast as possible')
+    parser.add_argument('--into', default=None, help='write the replayed files into this Raw_data folder and watch it')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='epochs kept in memory before spooling them')
+    parser.add_argument('--lag', type=float, default=LAG, help='s of record time before an incomplete epoch is released')
+    parser.add_argument('--idle', type=float, default=IDLE, help='s without files before a past hour is closed')
+    parser.add_argument('--snapshot', type=float, default=0.0,
+                        help='s between two writes of the hour in progress, 0 writes an hour once it is closed')
+    parser.add_argument('--every', type=float, default=1.0, help='s between two summary lines')
+    parser.add_argument('--summary', default=None, help='JSON file where the rolling summary is published')
+    parser.add_argument('--quiet', action='store_true', help='do not print the summary lines')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    # Following the logger: python live_ingest.py --formats npz --summary live_summary.json
+    # Testing with a recorded hour played 60 times faster than real time:
+    #   python live_ingest.py --replay 12 14 --speed 60
+    args = parse_args()
+    start = time.time()
+    try:
+        asyncio.run(main_code_live(args.products, args.formats, args.root, args.poll, args.replay, args.raw, args.speed,
+                                   args.into, chunk_size=args.chunk_size, lag=args.lag, idle=args.idle,
+                                   snapshot=args.snapshot, every=args.every, summary_path=args.summary,
+                                   verbose=not args.quiet))
+    except KeyboardInterrupt:
+        print('interrupted: the hours in progress have been written up to the last epoch received')
+    print('%.1f s' % (time.time() - start))
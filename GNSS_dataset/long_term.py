@@ -0,0 +1,300 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Long-term (multi-day) plots of the processed data, the Python counterpart of the
+longTerm_*.png figures of Scripts/Matlab/func_readPlotAllObservations.m:
+
+    longTerm_<GNSS>_cn0.png    C/N0 of every satellite, 1st band solid, 2nd band dash-dot
+    longTerm_DOP.png           gDOP, pDOP, tDOP, vDOP, hDOP, nDOP, eDOP
+    longTerm_PVT(P).png        lon, lat, height, ecefX, ecefY, ecefZ
+    longTerm_PVT(V).png        velE, velD, velN
+    longTerm_PVT(T).png        clkB, clkD, tAcc, fAcc
+
+20 days at 1 Hz are ~1.7M epochs per satellite. The hours are read one at a time and
+every series is reduced on the fly to the minimum and maximum of each time bucket,
+about one bucket per pixel of the plot width, so memory and drawing time do not depend
+on the number of days. Drawing min and max at every bucket gives the same envelope as
+drawing all the points; empty buckets leave gaps.
+
+USAGE:
+    python long_term.py --days $(seq 12 30)
+    python long_term.py --days 12 13 --hours $(seq 0 23) --plots cn0 dop --gnss G E --out plots
+
+"""
+
+import argparse, os, time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from graphics import CONST_KEYS, ensure_TxN, finish_figure, list_available_hours, new_figure, sanitize
+from processed_io import PROCESSED_DIR, find_product, load_product
+from record_time import parse_times
+
+BUCKETS = 2000  # buckets kept per series, about the width of the plots in pixels
+
+GNSS_NAMES = {'G': 'GPS', 'E': 'Galileo', 'B': 'BDS', 'Q': 'QZSS', 'R': 'GLONASS'}
+DOP_KEYS = ['gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP']
+PVT_PANELS = {
+    'PVT(P)': [('lon', 'Longitude (deg)'), ('lat', 'Latitude (deg)'), ('height', 'Height (mm)'),
+               ('ecefX', 'ECEFX (cm)'), ('ecefY', 'ECEFY (cm)'), ('ecefZ', 'ECEFZ (cm)')],
+    'PVT(V)': [('velE', 'East velocity (mm/s)'), ('velD', 'Down velocity (mm/s)'), ('velN', 'North velocity (mm/s)')],
+    'PVT(T)': [('clkB', 'Clock bias (ns)'), ('clkD', 'Clock drift (ns/s)'), ('tAcc', 'tAcc (ns)'), ('fAcc', 'fAcc (ps/s)')],
+}
+PLOTS = ('cn0', 'dop', 'pvt')
+
+
+class MinMaxSeries:
+    """
+    Streaming min/max-per-bucket decimation of N series sharing a time axis.
+
+    The buckets are `width` ms wide and aligned on multiples of the width. When the data
+    spans more than `buckets` buckets, the width is doubled and neighbouring buckets are
+    merged, so memory stays bounded whatever the number of samples.
+
+    Example:
+        series = MinMaxSeries(width_ms=1000)
+        for hour in hours:
+            series.add(times_ms, values)    # int64 ms [T], values [T] or [T, N]
+        t, v = series.envelope()            # datetime64[ms] [2B], [2B, N]
+    """
+
+    def __init__(self, buckets=BUCKETS, width_ms=1000):
+        self.buckets = buckets
+        self.width = int(width_ms)
+        self.t0 = None  # start time of bucket 0, ms
+        self.lo = None  # (buckets, N) minimum of every bucket, NaN when empty
+        self.hi = None  # (buckets, N) maximum of every bucket
+        self.samples = 0
+
+    def _rebin(self, t0, width):
+        """Move the buckets to a new start time and a width multiple of the current one."""
+        index = (self.t0 + np.arange(self.buckets, dtype=np.int64) * self.width - t0) // width
+        lo, hi = np.full_like(self.lo, np.nan), np.full_like(self.hi, np.nan)
+        filled = ~np.all(np.isnan(self.lo), axis=1)
+        np.fmin.at(lo, index[filled], self.lo[filled])
+        np.fmax.at(hi, index[filled], self.hi[filled])
+        self.t0, self.width, self.lo, self.hi = t0, width, lo, hi
+
+    def _fit(self, tmin, tmax):
+        """Make the buckets cover [tmin, tmax], coarsening them when needed."""
+        filled = np.flatnonzero(~np.all(np.isnan(self.lo), axis=1))
+        if len(filled):
+            tmin, tmax = min(tmin, self.t0 + int(filled[0]) * self.width), max(tmax, self.t0 + int(filled[-1]) * self.width)
+        t0 = min(self.t0, tmin // self.width * self.width)
+        width = self.width
+        while (tmax - t0) // width >= self.buckets:
+            width *= 2
+            t0 = t0 // width * width
+        if (t0, width) != (self.t0, self.width):
+            self._rebin(t0, width)
+
+    def add(self, times_ms, values):
+        """
+        :param times_ms: int64 epoch times in ms, [T]
+        :param values: [T] or [T, N] values, NaN where missing
+        """
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        values = np.asarray(values, dtype=float).reshape(len(times_ms), -1)
+        if len(times_ms) == 0:
+            return
+        if self.lo is None:
+            self.t0 = int(times_ms.min()) // self.width * self.width
+            self.lo = np.full((self.buckets, values.shape[1]), np.nan)
+            self.hi = np.full((self.buckets, values.shape[1]), np.nan)
+        self._fit(int(times_ms.min()), int(times_ms.max()))
+        index = (times_ms - self.t0) // self.width
+        order = np.argsort(index, kind='stable')
+        index, values = index[order], values[order]
+        starts = np.flatnonzero(np.r_[True, np.diff(index) != 0])
+        buckets = index[starts]
+        self.lo[buckets] = np.fmin(self.lo[buckets], np.fmin.reduceat(values, starts, axis=0))
+        self.hi[buckets] = np.fmax(self.hi[buckets], np.fmax.reduceat(values, starts, axis=0))
+        self.samples += len(times_ms)
+
+    def envelope(self):
+        """
+        (times, values) to plot: minimum then maximum at the center of every bucket from the
+        first to the last filled one; datetime64[ms] [2B] and [2B, N].
+        """
+        if self.lo is None:
+            return np.zeros(0, dtype='datetime64[ms]'), np.zeros((0, 0))
+        filled = np.flatnonzero(~np.all(np.isnan(self.lo), axis=1))
+        first, last = (filled[0], filled[-1] + 1) if len(filled) else (0, 0)
+        centers = self.t0 + np.arange(first, last, dtype=np.int64) * self.width + self.width // 2
+        times = np.repeat(centers, 2).astype('datetime64[ms]')
+        values = np.stack([self.lo[first:last], self.hi[first:last]], axis=1).reshape(-1, self.lo.shape[1])
+        return times, values
+
+
+def time_ms(content):
+    """recordTime of a processed hour as int64 ms, -1 for the epochs whose time cannot be parsed."""
+    times, valid = parse_times(content['recordTime'])
+    return np.where(valid, times.astype(np.int64), -1)
+
+
+class LongTermData:
+    """Decimated series of a campaign, fed one processed hour at a time."""
+
+    def __init__(self, plots=PLOTS, gnss=tuple(CONST_KEYS), buckets=BUCKETS):
+        self.plots, self.gnss, self.buckets = plots, gnss, buckets
+        self.series = {}  # name -> MinMaxSeries, e.g. 'cn0_G1', 'dop', 'lon'
+
+    def _add(self, name, times, values):
+        if name not in self.series:
+            self.series[name] = MinMaxSeries(self.buckets)
+        self.series[name].add(times, values)
+
+    def add_observation(self, obs):
+        times = time_ms(obs)
+        keep = times >= 0
+        for c in self.gnss:
+            for band in '12':
+                key = f'cn0_{c}{band}'
+                if key in obs:
+                    if np.ma.isMaskedArray(obs[key]):
+                        arr = obs[key].astype(float).filled(np.nan)  # satellite not tracked
+                    else:
+                        arr = sanitize(ensure_TxN(obs[key]))
+                        arr[arr == 0] = np.nan
+                    self._add(key, times[keep], arr[keep])
+
+    def add_pvt(self, pvt):
+        times = time_ms(pvt)
+        keep = times >= 0
+        if 'dop' in self.plots and all(key in pvt for key in DOP_KEYS):
+            dops = np.stack([np.asarray(pvt[key], dtype=float) for key in DOP_KEYS], axis=1)
+            self._add('dop', times[keep], dops[keep])
+        if 'pvt' in self.plots:
+            for panels in PVT_PANELS.values():
+                for key, label in panels:
+                    if key in pvt:
+                        self._add(key, times[keep], np.asarray(pvt[key], dtype=float)[keep])
+
+    def add_hour(self, base, hour):
+        """Read and reduce the processed files of one hour; returns the products read."""
+        read = []
+        if 'cn0' in self.plots:
+            path = find_product(base, 'observation', hour)
+            if path is not None:
+                self.add_observation(load_product(path, masked=True))
+                read.append(path)
+        if 'dop' in self.plots or 'pvt' in self.plots:
+            path = find_product(base, 'pvtSolution', hour)
+            if path is not None:
+                self.add_pvt(load_product(path))
+                read.append(path)
+        return read
+
+
+# ----------------------------- Plotters -----------------------------
+
+def plot_cn0(data, c, out_png=None, fig=None):
+    reused = fig is not None
+    fig = new_figure(fig)
+    fig.set_size_inches(17, 4.6)
+    plt.title(f"Long-term C/N0 - {GNSS_NAMES[c]}")
+    for band, style in (('1', '-'), ('2', '-.')):
+        series = data.series.get(f'cn0_{c}{band}')
+        if series is None:
+            continue
+        t, v = series.envelope()
+        for j in np.flatnonzero(~np.all(np.isnan(v), axis=0)):
+            plt.plot(t, v[:, j], style, linewidth=1, label=f"{c}{j + 1} band {band}")
+    plt.xlabel("Time")
+    plt.ylabel("C/N0 (dB-Hz)")
+    if plt.gca().lines:
+        plt.legend(ncol=12, fontsize=6, loc='lower center')
+    finish_figure(fig, out_png, reused)
+
+
+def plot_dop(data, out_png=None, fig=None):
+    reused = fig is not None
+    fig = new_figure(fig)
+    fig.set_size_inches(10, 3)
+    plt.title("Long-term DOP")
+    series = data.series.get('dop')
+    if series is not None:
+        t, v = series.envelope()
+        for j, key in enumerate(DOP_KEYS):
+            plt.plot(t, v[:, j], linewidth=1, label=key)
+        plt.legend(ncol=4)
+    plt.xlabel("Time")
+    finish_figure(fig, out_png, reused)
+
+
+def plot_pvt(data, name, out_png=None, fig=None):
+    """One figure of PVT_PANELS ('PVT(P)', 'PVT(V)' or 'PVT(T)'), one panel per key."""
+    reused = fig is not None
+    fig = new_figure(fig)
+    panels = PVT_PANELS[name]
+    fig.set_size_inches(15, 4 * ((len(panels) + 2) // 3))
+    for i, (key, label) in enumerate(panels):
+        ax = fig.add_subplot((len(panels) + 2) // 3, min(len(panels), 3), i + 1)
+        series = data.series.get(key)
+        if series is not None:
+            t, v = series.envelope()
+            ax.plot(t, v[:, 0], linewidth=1)
+        ax.set_title(label)
+        ax.tick_params(axis='x', labelrotation=30)
+    fig.tight_layout()
+    finish_figure(fig, out_png, reused)
+
+
+def render(data, out_dir, show=False):
+    """Write the longTerm_*.png of the decimated series; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+
+    def png(name):
+        written.append(os.path.join(out_dir, f"longTerm_{name}.png"))
+        return written[-1]
+
+    fig = None if show else plt.figure()
+    if 'cn0' in data.plots:
+        for c in data.gnss:
+            if any(f'cn0_{c}{band}' in data.series for band in '12'):
+                plot_cn0(data, c, png(f"{GNSS_NAMES[c]}_cn0"), fig)
+    if 'dop' in data.plots and 'dop' in data.series:
+        plot_dop(data, png("DOP"), fig)
+    if 'pvt' in data.plots:
+        for name in PVT_PANELS:
+            plot_pvt(data, name, png(name), fig)
+    if fig is not None:
+        plt.close(fig)
+    return written
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Multi-day plots of the processed data with min/max decimation.')
+    parser.add_argument('--root', default=PROCESSED_DIR, help='processed data folder, one sub-folder per day')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=None, help='hours of every day (default: all)')
+    parser.add_argument('--plots', nargs='+', choices=PLOTS, default=list(PLOTS))
+    parser.add_argument('--gnss', nargs='+', choices=list(CONST_KEYS), default=list(CONST_KEYS),
+                        help='constellations of the C/N0 plots')
+    parser.add_argument('--buckets', type=int, default=BUCKETS, help='points kept per series (x2 for min/max)')
+    parser.add_argument('--out', default=None, help='folder of the PNGs (default: --root)')
+    parser.add_argument('--show', action='store_true', help='show the figures instead of only saving them')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if not args.show:
+        plt.switch_backend('Agg')
+    t0 = time.perf_counter()
+    data = LongTermData(args.plots, args.gnss, args.buckets)
+    hours_read = 0
+    for day in args.days:
+        base = os.path.join(args.root, str(day))
+        if not os.path.isdir(base):
+            print('[WARN] Missing day folder: %s' % base)
+            continue
+        for hour in list_available_hours(base):
+            if args.hours is None or hour in args.hours:
+                hours_read += bool(data.add_hour(base, hour))
+    samples = max((s.samples for s in data.series.values()), default=0)
+    print('Read %d hours (%d epochs) in %.1f s' % (hours_read, samples, time.perf_counter() - t0))
+    for path in render(data, args.out or args.root, args.show):
+        print('[OK] %s' % path)
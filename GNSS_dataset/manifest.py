@@ -0,0 +1,141 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Manifest of the extracted (day, hour, product) units, used by extract_process_data.py
+to skip the units that are up to date and to resume an interrupted campaign.
+
+'processed data/manifest.json' records for every unit:
+  - the raw inputs: number of files and a digest of their names, sizes and mtimes
+    (sizes and CRCs for the members of a zip archive, see raw_source.py)
+  - the output files: path, size, mtime and SHA-256 checksum per format
+
+A unit is up to date when its raw inputs still have the same digest and all the
+requested output files are present with the recorded size and checksum. The checksum
+is only computed again when the mtime of a file has changed, so that a re-run does
+not read every processed file. An entry is only written
+once all the outputs of its unit are complete, so a unit interrupted by a crash is
+extracted again on the next run.
+
+"""
+
+import hashlib, json, os, time
+
+from processed_io import PROCESSED_DIR
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def folder_fingerprint(folder):
+    """
+    Fingerprint of a raw input folder from the names, sizes and mtimes of its files,
+    without reading them.
+
+    :param folder: raw folder, e.g. '../GNSS_Dataset/Raw_data/12/14/RXM-RAWX'
+    :return: {'count': number of files, 'digest': hex digest}, None if the folder does not exist
+    """
+    try:
+        entries = sorted((entry.name, entry.stat()) for entry in os.scandir(folder) if entry.is_file())
+    except FileNotFoundError:
+        return None
+    digest = hashlib.sha256()
+    for name, st in entries:
+        digest.update(('%s\0%d\0%d\n' % (name, st.st_size, st.st_mtime_ns)).encode('utf-8'))
+    return {'count': len(entries), 'digest': digest.hexdigest()}
+
+
+def file_checksum(path, block_size=1 << 20):
+    """SHA-256 of a file, read block by block."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def unit_key(product, day, hour):
+    """Manifest key of a unit, e.g. 'rax/12/14'."""
+    return '%s/%s/%s' % (product, day, hour)
+
+
+class Manifest:
+    """
+    Read/update the manifest of a processed data folder.
+
+    Example:
+        manifest = Manifest()
+        inputs = manifest.inputs(open_source(), 12, 14, ['RXM-RAWX'])
+        if not manifest.is_up_to_date('rax', 12, 14, inputs, output_paths):
+            ...extract...
+            manifest.record('rax', 12, 14, inputs, output_paths)
+            manifest.save()
+    """
+
+    def __init__(self, processed_dir=PROCESSED_DIR):
+        self.path = os.path.join(processed_dir, MANIFEST_FILE)
+        self.units = {}
+        if os.path.isfile(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == MANIFEST_VERSION:
+                self.units = content['units']
+
+    @staticmethod
+    def inputs(source, day, hour, msgs):
+        """
+        Fingerprints of the raw inputs of a unit: {location: fingerprint}.
+
+        :param source: raw data source (see raw_source.py), e.g. a FolderSource
+        :param msgs: messages read by the unit, e.g. ['RXM-RAWX']
+        """
+        return {source.label(day, hour, msg): source.fingerprint(day, hour, msg) for msg in msgs}
+
+    def is_up_to_date(self, product, day, hour, inputs, outputs):
+        """
+        :param product: 'rax', 'sat' or 'pvt'
+        :param day: day of the unit
+        :param hour: hour of the unit
+        :param inputs: fingerprints of the raw inputs, as returned by inputs()
+        :param outputs: {format: path} of the requested output files
+        :return: True when the unit does not need to be extracted again
+        """
+        entry = self.units.get(unit_key(product, day, hour))
+        if entry is None or None in inputs.values() or entry['inputs'] != inputs:
+            return False
+        for fmt, path in outputs.items():
+            recorded = entry['outputs'].get(fmt)
+            if recorded is None or recorded['path'] != path or not os.path.isfile(path):
+                return False
+            st = os.stat(path)
+            if st.st_size != recorded['size']:
+                return False
+            # rewritten (or touched) since it was recorded: same size is not enough
+            if st.st_mtime_ns != recorded.get('mtime_ns') and file_checksum(path) != recorded['sha256']:
+                return False
+        return True
+
+    def discard(self, product, day, hour):
+        """Forget a unit, e.g. before extracting it again."""
+        self.units.pop(unit_key(product, day, hour), None)
+
+    def record(self, product, day, hour, inputs, outputs):
+        """
+        Record a unit whose outputs have just been written.
+
+        :param inputs: fingerprints of the raw inputs taken before the extraction
+        :param outputs: {format: path} of the written files
+        """
+        self.units[unit_key(product, day, hour)] = {
+            'inputs': inputs,
+            'outputs': {fmt: {'path': path, 'size': os.path.getsize(path), 'mtime_ns': os.stat(path).st_mtime_ns,
+                              'sha256': file_checksum(path)} for fmt, path in outputs.items()},
+            'extracted': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def save(self):
+        """Write the manifest atomically, so that an interrupted run never leaves it half written."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'units': self.units}, f, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,438 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Writers and readers of the processed data files (observationHH, satelliteInfomationHH, pvtSolutionHH,
+spectrumHH).
+
+Three formats are available:
+  - 'json': the original indented JSON of nested lists, e.g. 'processed data/12/observation14.json'
+  - 'npz':  one compressed NumPy archive per hour, e.g. 'processed data/12/observation14.npz',
+            holding one typed array per key ((epochs, satellites) float arrays, 1-D arrays
+            for the PVT values) and 'recordTime' as a datetime64[ms] column.
+  - 'spz':  the npz archive with the (epochs, satellites) keys stored sparse, e.g.
+            'processed data/12/observation14.spz'. The keys of a constellation (and band)
+            share one CSR index: '@<group>.indptr' (epochs + 1 offsets) and
+            '@<group>.indices' (satellite columns); every key only stores the values of
+            the satellites present ('cn0_B1': (nnz,) array). '@layout' records the keys,
+            their width and the value of the absent satellites (0, or 0.11 for
+            svUsed/qualityInd/health). The MON-SPAN spectra of spectrumHH are dense and stay
+            (epochs, bins) arrays (DENSE_FIELDS).
+
+The loaders detect which format is present and prefer npz, then spz, then json.
+load_product(path, masked=True) returns the (epochs, satellites) keys as masked arrays,
+masked where the satellite is absent, instead of relying on the 0 / 0.11 padding.
+
+An hour is written either at once (HourWriter, the whole hour in memory) or
+chunk by chunk (StreamingHourWriter): the rows of every key are spooled to
+temporary files as they are extracted and the final files are assembled from
+the spools, so that memory is bounded by the chunk size instead of the hour length.
+
+"""
+
+import json, os, shutil, tempfile, zipfile
+
+import numpy as np
+
+from json_backend import load_file
+from record_time import parse_times
+from ubx_decode import SAT_FILL
+
+PROCESSED_DIR = 'processed data'  # folder written by extract_process_data.py, one sub-folder per day
+FORMATS = ('json', 'npz', 'spz')
+SPARSE_VERSION = 1
+ITEMS = ('observation', 'satelliteInfomation', 'pvtSolution')
+DENSE_FIELDS = ('spectrum',)  # (epochs, N) keys that are never sparse: N bins, not N satellites
+
+
+def product_path(base_dir, item, hour, fmt):
+    """
+    Path of one processed file, e.g. product_path('processed data/12', 'observation', 14, 'npz').
+
+    :param base_dir: folder of the day
+    :param item: 'observation', 'satelliteInfomation', 'pvtSolution' or 'spectrum'
+    :param hour: hour, from 0 to 23
+    :param fmt: 'json', 'npz' or 'spz'
+    """
+    return os.path.join(base_dir, '%s%s.%s' % (item, hour, fmt))
+
+
+def find_product(base_dir, item, hour):
+    """Return the path of the processed file of an hour (npz, then spz, then json) or None if missing."""
+    for fmt in ('npz', 'spz', 'json'):
+        path = product_path(base_dir, item, hour, fmt)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def parse_record_time(recordTime):
+    """
+    Convert the 'start_time' strings of the raw files ('2023-09-12 14:00:00') into a
+    datetime64[ms] array. Strings that NumPy cannot parse are kept as a string array.
+    """
+    if isinstance(recordTime, np.ndarray) and np.issubdtype(recordTime.dtype, np.datetime64):
+        return recordTime.astype('datetime64[ms]')
+    try:
+        return np.array([s.replace(' ', 'T', 1) for s in recordTime], dtype='datetime64[ms]')
+    except (ValueError, AttributeError):
+        return np.array(recordTime)
+
+
+def format_record_time(recordTime):
+    """Inverse of parse_record_time: datetime64 array -> list of 'YYYY-MM-DD HH:MM:SS' strings."""
+    if np.issubdtype(recordTime.dtype, np.datetime64):
+        text = np.datetime_as_string(recordTime, unit='s')
+        return [s.replace('T', ' ') for s in text.tolist()]
+    return recordTime.tolist()
+
+
+def save_product(day, hour, item, data, formats=('json',)):
+    """
+    Write one processed hour in the requested formats.
+
+    :param day: day of the processed data folder
+    :param hour: hour, from 0 to 23
+    :param item: 'observation', 'satelliteInfomation', 'pvtSolution' or 'spectrum'
+    :param data: dict key -> list or NumPy array, in the order of the output file
+    :param formats: any of FORMATS
+    :return: list of the written paths
+    """
+    savePath = os.path.join(PROCESSED_DIR, str(day))
+    os.makedirs(savePath, exist_ok=True)  # safe when several workers create the same day folder
+    paths = []
+    for fmt in formats:
+        path = product_path(savePath, item, hour, fmt)
+        if fmt == 'json':
+            content = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in data.items()}
+            with open(path, 'w', encoding='utf8') as f3:
+                json.dump(content, f3, ensure_ascii=False, indent=2)
+        elif fmt == 'npz':
+            arrays = {key: np.asarray(value) for key, value in data.items()}
+            if 'recordTime' in data:
+                arrays['recordTime'] = parse_record_time(data['recordTime'])
+            np.savez_compressed(path, **arrays)
+        elif fmt == 'spz':
+            _save_sparse(path, list(data), lambda key: parse_record_time(data[key]) if key == 'recordTime'
+                         else np.asarray(data[key]))
+        else:
+            raise ValueError('Unknown processed data format: %s' % fmt)
+        paths.append(path)
+    return paths
+
+
+def absent_value(key):
+    """Value written for the absent satellites in a (epochs, satellites) key: 0.11 for svUsed/qualityInd/health, else 0."""
+    return SAT_FILL.get(key.rsplit('_', 1)[0], 0.0)
+
+
+def sparse_group(key):
+    """Keys sharing one sparsity pattern: 'cn0_G1' -> 'G1', 'svId_G' -> 'G', 'VSG' -> 'VSG'; None for DENSE_FIELDS."""
+    if '_' not in key:
+        return key
+    field, group = key.rsplit('_', 1)
+    return None if field in DENSE_FIELDS else group
+
+
+def validity_masks(content):
+    """
+    Presence of the satellites in the (epochs, satellites) keys of a processed hour: a
+    satellite is present at an epoch when any key of its group differs from the absent value.
+
+    :return: dict key -> bool (epochs, satellites) array, shared by the keys of a group
+    """
+    arrays = {key: np.asarray(value) for key, value in content.items() if key != 'recordTime'}
+    groups = {}
+    for key, arr in arrays.items():
+        group = sparse_group(key)
+        if arr.ndim == 2 and group is not None:
+            present = arr != absent_value(key)
+            groups[group] = present if group not in groups else groups[group] | present
+    return {key: groups[sparse_group(key)] for key, arr in arrays.items()
+            if arr.ndim == 2 and sparse_group(key) is not None}
+
+
+def _write_member(zf, name, arr):
+    with zf.open(name + '.npy', 'w', force_zip64=True) as member:
+        np.lib.format.write_array(member, np.asanyarray(arr), allow_pickle=False)
+
+
+def _save_sparse(path, keys, load):
+    """
+    Write an spz file one group at a time.
+
+    :param keys: keys of the hour, in file order
+    :param load: function key -> NumPy array of the key (recordTime as datetime64)
+    """
+    layout, members, group_left = [], {}, {}
+    for key in keys:
+        if key != 'recordTime' and sparse_group(key) is not None and load(key).ndim == 2:
+            members.setdefault(sparse_group(key), []).append(key)
+    masks = {}
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for key in keys:
+            group = sparse_group(key)
+            if key == 'recordTime' or key not in members.get(group, ()):
+                _write_member(zf, key, load(key))
+                layout.append({'key': key})
+                continue
+            if group not in masks:
+                arrays = [load(k) for k in members[group]]
+                mask = np.zeros(arrays[0].shape, dtype=bool)
+                for k, arr in zip(members[group], arrays):
+                    mask |= arr != absent_value(k)
+                masks[group], group_left[group] = mask, len(members[group])
+                counts = mask.sum(axis=1)
+                _write_member(zf, '@%s.indptr' % group, np.concatenate([[0], np.cumsum(counts)]).astype(np.int64))
+                _write_member(zf, '@%s.indices' % group,
+                              np.nonzero(mask)[1].astype(np.uint8 if mask.shape[1] <= 256 else np.int32))
+            arr = load(key)
+            _write_member(zf, key, arr[masks[group]])
+            layout.append({'key': key, 'group': group, 'width': int(arr.shape[1]), 'absent': absent_value(key)})
+            group_left[group] -= 1
+            if group_left[group] == 0:
+                del masks[group]
+        _write_member(zf, '@layout', np.array(json.dumps({'version': SPARSE_VERSION, 'keys': layout})))
+
+
+def _load_sparse(path, masked=False):
+    """Read an spz file into dense arrays (absent satellites set to their absent value), or masked arrays."""
+    content, index = {}, {}
+    with np.load(path, allow_pickle=False) as npz:
+        layout = json.loads(str(npz['@layout']))
+        for entry in layout['keys']:
+            key = entry['key']
+            if 'group' not in entry:
+                content[key] = npz[key]
+                continue
+            group = entry['group']
+            if group not in index:
+                indptr = npz['@%s.indptr' % group]
+                rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+                index[group] = (len(indptr) - 1, rows, npz['@%s.indices' % group].astype(np.intp))
+            epochs, rows, cols = index[group]
+            values = npz[key]
+            dense = np.full((epochs, entry['width']), entry['absent'], dtype=values.dtype)
+            dense[rows, cols] = values
+            if masked:
+                mask = np.ones(dense.shape, dtype=bool)
+                mask[rows, cols] = False
+                dense = np.ma.MaskedArray(dense, mask=mask)
+            content[key] = dense
+    return content
+
+
+class ProcessedHour(dict):
+    """
+    Content of a processed file, as returned by load_product: a dict of its keys that also
+    keeps its recordTime parsed (record_times), so that all the plots of the hour share one
+    conversion. Assigning a new recordTime drops the parsed times.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._times = None
+
+    def __setitem__(self, key, value):
+        if key == 'recordTime':
+            self._times = None
+        super().__setitem__(key, value)
+
+    def record_times(self):
+        """(times, valid) of recordTime, see record_time.parse_times; parsed on the first call."""
+        if self._times is None:
+            self._times = parse_times(self.get('recordTime', []))
+        return self._times
+
+
+def load_product(path, masked=False):
+    """
+    Read one processed file.
+
+    :param path: path of a .json, .npz or .spz processed file
+    :param masked: return the (epochs, satellites) keys as NumPy masked arrays, masked
+                   where the satellite is absent (see validity_masks)
+    :return: ProcessedHour (dict) key -> value; lists for json files, NumPy arrays for npz/spz
+             files ('recordTime' is then a datetime64 array)
+    """
+    if path.endswith('.spz'):
+        return ProcessedHour(_load_sparse(path, masked))
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as npz:
+            content = {key: npz[key] for key in npz.files}
+    else:
+        content = load_file(path)
+    if masked:
+        for key, mask in validity_masks(content).items():
+            content[key] = np.ma.MaskedArray(np.asarray(content[key]), mask=~mask)
+    return ProcessedHour(content)
+
+
+class HourWriter:
+    """Collects the chunks of a processed hour in memory and writes them with save_product on close."""
+
+    def __init__(self, day, hour, item, formats=('json',)):
+        self.day, self.hour, self.item, self.formats = day, hour, item, formats
+        self.data = None
+
+    def append(self, chunk):
+        """
+        Add the next epochs of the hour.
+
+        :param chunk: dict key -> list or NumPy array of the epochs, same keys for every chunk
+        """
+        if self.data is None:
+            self.data = dict(chunk)
+            return
+        for key, value in chunk.items():
+            if isinstance(value, np.ndarray):
+                self.data[key] = np.concatenate([np.asarray(self.data[key]).reshape((-1,) + value.shape[1:]), value])
+            else:
+                self.data[key] = list(self.data[key]) + list(value)
+
+    def close(self):
+        """Write the hour, return the written paths."""
+        return save_product(self.day, self.hour, self.item, self.data or {}, self.formats)
+
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+
+def _json_rows(values):
+    """
+    Text of the elements of a key, as json.dump(..., indent=2) writes them in a processed
+    file: scalars indented by 4 spaces, rows as nested lists indented by 4 and 6 spaces.
+    """
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return ',\n'.join('    ' + _JSON_ENCODER.encode(v).replace('\n', '\n    ') for v in values)
+
+
+class StreamingHourWriter:
+    """
+    Writes a processed hour chunk by chunk with bounded memory.
+
+    The rows of every key are appended to one spool file per key and format (JSON
+    text, or raw binary for npz and spz) in a temporary folder next to the output. On close
+    the JSON file is assembled by copying the spools, byte-identical to
+    save_product, and the npz file is written member by member as .npy arrays.
+    """
+
+    def __init__(self, day, hour, item, formats=('json',)):
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError('Unknown processed data format: %s' % fmt)
+        self.day, self.hour, self.item, self.formats = day, hour, item, formats
+        self.savePath = os.path.join(PROCESSED_DIR, str(day))
+        os.makedirs(self.savePath, exist_ok=True)
+        self.spool_dir = tempfile.mkdtemp(prefix='.%s%s-' % (item, hour), dir=self.savePath)
+        self.keys = []
+        self.count = {}  # epochs written per key
+        self.dtypes = {}  # npz: dtype of every key
+        self.shapes = {}  # npz: shape of one epoch of every key
+
+    def _spool(self, key, fmt):
+        return os.path.join(self.spool_dir, '%d.%s' % (self.keys.index(key), fmt))
+
+    def append(self, chunk):
+        """
+        Add the next epochs of the hour.
+
+        :param chunk: dict key -> list or NumPy array of the epochs, same keys for every chunk
+        """
+        for key, value in chunk.items():
+            if key not in self.count:
+                self.keys.append(key)
+                self.count[key] = 0
+            if len(value) == 0:
+                continue
+            if 'json' in self.formats:
+                with open(self._spool(key, 'json'), 'a', encoding='utf8') as f:
+                    f.write((',\n' if self.count[key] else '') + _json_rows(value))
+            if 'npz' in self.formats or 'spz' in self.formats:
+                self._append_binary(key, value)
+            self.count[key] += len(value)
+
+    def _append_binary(self, key, value):
+        arr = parse_record_time(value) if key == 'recordTime' else np.asarray(value)
+        path = self._spool(key, 'npz')
+        if key not in self.dtypes:
+            self.dtypes[key], self.shapes[key] = arr.dtype, arr.shape[1:]
+        elif not np.can_cast(arr.dtype, self.dtypes[key], 'safe'):
+            # e.g. integers in the first chunk and floats later: promote what is already spooled
+            dtype = np.promote_types(self.dtypes[key], arr.dtype)
+            spooled = np.fromfile(path, dtype=self.dtypes[key]).astype(dtype)
+            spooled.tofile(path)
+            self.dtypes[key] = dtype
+        with open(path, 'ab') as f:
+            f.write(np.ascontiguousarray(arr, dtype=self.dtypes[key]).tobytes())
+
+    def write(self):
+        """
+        Assemble the output files from the epochs appended so far, return the written paths.
+        The spools are kept, so that the hour can be written again after more appends
+        (snapshots of an hour in progress, see live_ingest.py).
+        """
+        paths = []
+        for fmt in self.formats:
+            path = product_path(self.savePath, self.item, self.hour, fmt)
+            if fmt == 'json':
+                self._write_json(path)
+            elif fmt == 'npz':
+                self._write_npz(path)
+            else:
+                _save_sparse(path, self.keys, self._load_spool)
+            paths.append(path)
+        return paths
+
+    def close(self):
+        """Assemble the output files from the spools, return the written paths."""
+        try:
+            return self.write()
+        finally:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _write_json(self, path):
+        with open(path, 'w', encoding='utf8') as f3:
+            f3.write('{')
+            for i, key in enumerate(self.keys):
+                f3.write(('' if i == 0 else ',') + '\n  ' + _JSON_ENCODER.encode(key) + ': [')
+                if self.count[key]:
+                    f3.write('\n')
+                    with open(self._spool(key, 'json'), 'r', encoding='utf8') as spool:
+                        shutil.copyfileobj(spool, f3)
+                    f3.write('\n  ')
+                f3.write(']')
+            f3.write('\n}' if self.keys else '}')
+
+    def _load_spool(self, key):
+        dtype = self.dtypes.get(key, np.dtype(float))
+        if not self.count[key]:
+            return np.zeros((0,) + self.shapes.get(key, ()), dtype=dtype)
+        return np.fromfile(self._spool(key, 'npz'), dtype=dtype).reshape((self.count[key],) + self.shapes[key])
+
+    def _write_npz(self, path):
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for key in self.keys:
+                dtype = self.dtypes.get(key, np.dtype(float))
+                shape = (self.count[key],) + self.shapes.get(key, ())
+                with zf.open(key + '.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array_header_1_0(member, {
+                        'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+                    if self.count[key]:
+                        with open(self._spool(key, 'npz'), 'rb') as spool:
+                            shutil.copyfileobj(spool, member)
+
+
+def hour_writer(day, hour, item, formats=('json',), chunk_size=None):
+    """
+    Writer of one processed hour: in memory (chunk_size None) or streamed chunk by chunk.
+
+    :param day: day of the processed data folder
+    :param hour: hour, from 0 to 23
+    :param item: 'observation', 'satelliteInfomation', 'pvtSolution' or 'spectrum'
+    :param formats: any of FORMATS
+    :param chunk_size: epochs per chunk of the streaming mode, None to write the whole hour at once
+    """
+    if chunk_size is None:
+        return HourWriter(day, hour, item, formats)
+    return StreamingHourWriter(day, hour, item, formats)
@@ -0,0 +1,275 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Consolidated, memory-mapped store of the processed data for campaign-wide queries.
+
+The hourly observationHH / satelliteInfomationHH / pvtSolutionHH files (json or npz,
+see processed_io.py) are appended into one raw float64 file per key and product,
+read back with numpy.memmap, plus a datetime64[ms] time index:
+
+    <store>/index.json                      keys, widths and the (day, hour) chunks of every product
+    <store>/observation/recordTime.dat      int64 milliseconds, one per epoch
+    <store>/observation/cn0_G1.dat          float64 (epochs, 32)
+    <store>/pvtSolution/lon.dat             float64 (epochs,)
+    ...
+
+Inside a chunk the epochs are sorted by time, so a query only reads the rows
+of the chunks that overlap the requested period.
+
+USAGE:
+    python processed_store.py build --store store --days 12 13 14 15 --hours $(seq 0 23)
+    python processed_store.py query --store store --key cn0_G1 --sv 7 --start "2023-09-12 14:00" --end "2023-09-15 03:00"
+
+"""
+
+import argparse, json, os, shutil
+
+import numpy as np
+
+from processed_io import ITEMS, PROCESSED_DIR, find_product, load_product, parse_record_time
+
+INDEX_FILE = 'index.json'
+
+
+def to_datetime64(value):
+    """Accept '2023-09-12 14:00[:00]', datetime or datetime64 and return a datetime64[ms]."""
+    if isinstance(value, str):
+        value = value.replace(' ', 'T', 1)
+    return np.datetime64(value, 'ms')
+
+
+class ProcessedStore:
+    """
+    Memory-mapped access to a store written by build_store().
+
+    Example:
+        store = ProcessedStore('store')
+        t, cn0 = store.series('cn0_G1', '2023-09-12 14:00', '2023-09-15 03:00', svId=7)
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self._memmaps = {}
+
+    def products(self):
+        """Names of the products present in the store."""
+        return list(self.index['products'])
+
+    def keys(self, product):
+        """Keys of a product, in the order of the processed files (without recordTime)."""
+        return list(self.index['products'][product]['keys'])
+
+    def product_of(self, key):
+        """Return the product holding a key, e.g. 'cn0_G1' -> 'observation'."""
+        for product, info in self.index['products'].items():
+            if key in info['keys']:
+                return product
+        raise KeyError('Key not found in the store: %s' % key)
+
+    def _memmap(self, product, key):
+        if (product, key) not in self._memmaps:
+            info = self.index['products'][product]
+            path = os.path.join(self.store_dir, product, key + '.dat')
+            if key == 'recordTime':
+                dtype, shape = 'datetime64[ms]', (info['rows'],)
+            else:
+                width = info['keys'][key]
+                dtype, shape = 'float64', (info['rows'],) if width == 0 else (info['rows'], width)
+            if info['rows'] == 0:
+                return np.zeros(shape, dtype=dtype)
+            self._memmaps[(product, key)] = np.memmap(path, dtype=dtype, mode='r', shape=shape)
+        return self._memmaps[(product, key)]
+
+    def times(self, product):
+        """Whole time index of a product (memory-mapped, sorted inside each chunk)."""
+        return self._memmap(product, 'recordTime')
+
+    def array(self, key, product=None):
+        """Whole (epochs, satellites) or (epochs,) array of a key (memory-mapped)."""
+        return self._memmap(product or self.product_of(key), key)
+
+    def rows(self, product, start=None, end=None):
+        """
+        Row ranges of the epochs in [start, end), in chronological chunk order.
+
+        :param product: 'observation', 'satelliteInfomation' or 'pvtSolution'
+        :param start: first time (inclusive), None for the beginning of the store
+        :param end: last time (exclusive), None for the end of the store
+        :return: list of (first row, last row + 1)
+        """
+        t0 = to_datetime64(start).astype('int64') if start is not None else None
+        t1 = to_datetime64(end).astype('int64') if end is not None else None
+        times = self.times(product)
+        ranges = []
+        for chunk in sorted(self.index['products'][product]['chunks'], key=lambda c: c['t0']):
+            if (t1 is not None and chunk['t0'] >= t1) or (t0 is not None and chunk['t1'] < t0):
+                continue
+            first, last = chunk['start'], chunk['start'] + chunk['count']
+            chunk_times = times[first:last]
+            if t0 is not None:
+                first += int(np.searchsorted(chunk_times, np.datetime64(int(t0), 'ms'), side='left'))
+            if t1 is not None:
+                last = chunk['start'] + int(np.searchsorted(chunk_times, np.datetime64(int(t1), 'ms'), side='left'))
+            if last > first:
+                ranges.append((first, last))
+        return ranges
+
+    def series(self, key, start=None, end=None, svId=None):
+        """
+        Time series of one key over [start, end), only reading the rows in that period.
+
+        :param key: key of a processed file, e.g. 'cn0_G1', 'elev_E', 'hAcc'
+        :param start: first time (inclusive), e.g. '2023-09-12 14:00'
+        :param end: last time (exclusive), e.g. '2023-09-15 03:00'
+        :param svId: satellite identifier (column svId - 1); None returns all the columns
+        :return: (datetime64[ms] times, values)
+        """
+        product = self.product_of(key)
+        values = self.array(key, product)
+        times = self.times(product)
+        ranges = self.rows(product, start, end)
+        if svId is not None and values.ndim == 2:
+            values = values[:, int(svId) - 1]
+        if not ranges:
+            return times[:0].copy(), np.array(values[:0])
+        return (np.concatenate([times[a:b] for a, b in ranges]),
+                np.concatenate([values[a:b] for a, b in ranges]))
+
+
+def _load_index(store_dir):
+    path = os.path.join(store_dir, INDEX_FILE)
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'products': {item: {'keys': {}, 'rows': 0, 'chunks': []} for item in ITEMS}}
+
+
+def _save_index(store_dir, index):
+    tmp = os.path.join(store_dir, INDEX_FILE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, os.path.join(store_dir, INDEX_FILE))
+
+
+def _append(path, arr, rows):
+    """Append rows to a store file, dropping what an interrupted run wrote after the first `rows` rows."""
+    arr = np.ascontiguousarray(arr)
+    row_bytes = arr[:1].nbytes if len(arr) else 0
+    with open(path, 'ab') as f:
+        if row_bytes and f.tell() != rows * row_bytes:
+            f.truncate(rows * row_bytes)
+        f.write(arr.tobytes())
+
+
+def append_hour(store_dir, index, item, day, hour, content):
+    """
+    Append one processed hour to the store files of a product.
+
+    :param store_dir: store folder
+    :param index: store index, updated in place (saved by the caller)
+    :param item: 'observation', 'satelliteInfomation' or 'pvtSolution'
+    :param day: day of the processed file
+    :param hour: hour of the processed file
+    :param content: dict returned by processed_io.load_product
+    :return: number of epochs appended
+    """
+    info = index['products'][item]
+    times = parse_record_time(content['recordTime'])
+    if not np.issubdtype(times.dtype, np.datetime64):
+        raise ValueError('recordTime of %s day=%s hour=%s cannot be parsed' % (item, day, hour))
+    times = times.astype('datetime64[ms]')
+    count = len(times)
+    order = np.argsort(times, kind='stable')
+    folder = os.path.join(store_dir, item)
+    os.makedirs(folder, exist_ok=True)
+
+    arrays = {}
+    for key, value in content.items():
+        if key == 'recordTime':
+            continue
+        arr = np.asarray(value, dtype=float)
+        if arr.shape[0] != count:
+            raise ValueError('%s of %s day=%s hour=%s has %d epochs, recordTime has %d'
+                             % (key, item, day, hour, arr.shape[0], count))
+        width = arr.shape[1] if arr.ndim == 2 else 0
+        if info['rows'] == 0 and key not in info['keys']:
+            info['keys'][key] = width
+        elif info['keys'].get(key) != width:
+            raise ValueError('%s of %s day=%s hour=%s does not match the store' % (key, item, day, hour))
+        arrays[key] = arr
+    missing = set(info['keys']) - set(arrays)
+    if missing:
+        raise ValueError('%s day=%s hour=%s is missing %s' % (item, day, hour, sorted(missing)))
+
+    _append(os.path.join(folder, 'recordTime.dat'), times[order], info['rows'])
+    for key, arr in arrays.items():
+        _append(os.path.join(folder, key + '.dat'), arr[order], info['rows'])
+
+    sorted_ms = times[order].astype('int64')
+    info['chunks'].append({'day': day, 'hour': hour, 'start': info['rows'], 'count': count,
+                           't0': int(sorted_ms[0]) if count else 0, 't1': int(sorted_ms[-1]) if count else 0})
+    info['rows'] += count
+    return count
+
+
+def build_store(store_dir, days, hours, items=ITEMS, processed_dir=PROCESSED_DIR, rebuild=False):
+    """
+    Append the processed (day, hour) files into the store. Hours already in the store are skipped.
+
+    :param store_dir: store folder, created if needed
+    :param days: days of the processed data folder
+    :param hours: hours, from 0 to 23
+    :param items: products to store
+    :param processed_dir: folder of the processed data, one sub-folder per day
+    :param rebuild: remove the existing store first
+    :return: None
+    """
+    if rebuild and os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    index = _load_index(store_dir)
+    for item in items:
+        done = {(c['day'], c['hour']) for c in index['products'][item]['chunks']}
+        for day in days:
+            for hour in hours:
+                if (day, hour) in done:
+                    continue
+                path = find_product(os.path.join(processed_dir, str(day)), item, hour)
+                if path is None:
+                    print('[SKIP] %s day=%s hour=%s: no processed file' % (item, day, hour))
+                    continue
+                count = append_hour(store_dir, index, item, day, hour, load_product(path))
+                _save_index(store_dir, index)  # the index only lists the chunks fully written
+                print('[OK] %s (%d epochs)' % (path, count))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build or query the memory-mapped store of the processed data.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='append processed hours to the store')
+    build.add_argument('--store', required=True, help='store folder')
+    build.add_argument('--days', type=int, nargs='+', required=True)
+    build.add_argument('--hours', type=int, nargs='+', default=list(range(24)))
+    build.add_argument('--items', nargs='+', choices=ITEMS, default=list(ITEMS))
+    build.add_argument('--processed', default=PROCESSED_DIR, help='folder of the processed data')
+    build.add_argument('--rebuild', action='store_true', help='remove the existing store first')
+    query = sub.add_parser('query', help='print a time series of the store')
+    query.add_argument('--store', required=True, help='store folder')
+    query.add_argument('--key', required=True, help="key of a processed file, e.g. 'cn0_G1'")
+    query.add_argument('--sv', type=int, default=None, help='satellite identifier (svId)')
+    query.add_argument('--start', default=None, help="e.g. '2023-09-12 14:00'")
+    query.add_argument('--end', default=None, help="e.g. '2023-09-15 03:00' (exclusive)")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'build':
+        build_store(args.store, args.days, args.hours, args.items, args.processed, args.rebuild)
+    else:
+        t, values = ProcessedStore(args.store).series(args.key, args.start, args.end, args.sv)
+        for ti, vi in zip(t, values):
+            print(np.datetime_as_string(ti, unit='s'), vi)
+        print('%d epochs' % len(t))
@@ -0,0 +1,183 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Per-hour pack of the raw data: the ~3600 JSON files of a '<day>/<hour>/<MSG>/' folder
+are written as one JSON-lines file plus an index, next to the folder:
+
+    Raw_data/12/14/RXM-RAWX.jsonl       one compact JSON document per line, in time order
+    Raw_data/12/14/RXM-RAWX.idx.json    {"names": [...], "times": [...], "offsets": [...], "lengths": [...]}
+
+'names' are the original file names, 'times' their 'start_time', and offsets/lengths
+locate every line (newline included) in the .jsonl file. Reading an hour is then one
+open and sequential reads instead of one open/read/close per second.
+
+The readers (raw_source.FolderSource, hence extract_process_data.py and read_raw_data.py)
+use the pack instead of the folder, unless files were added to or removed from the
+folder after packing it. Packed folders can be removed with --remove.
+
+USAGE:
+    python raw_pack.py pack --days 12 --hours $(seq 0 23)            # keep the folders
+    python raw_pack.py pack --days 12 --hours 14 --remove            # replace the folders
+    python raw_pack.py unpack --days 12 --hours 14                   # back to one file per epoch
+
+"""
+
+import argparse, json, os, shutil, time
+
+from json_backend import loads
+from time_join import file_start_time
+
+PACK_EXT = '.jsonl'
+INDEX_EXT = '.idx.json'
+RAW_DIR = '../GNSS_Dataset/Raw_data'  # unpacked raw data, one sub-folder per day
+
+
+def pack_paths(folder):
+    """Paths of the pack and of its index for a raw folder, e.g. '.../12/14/RXM-RAWX'."""
+    folder = folder.rstrip('/\\')
+    return folder + PACK_EXT, folder + INDEX_EXT
+
+
+def has_pack(folder):
+    return all(os.path.isfile(path) for path in pack_paths(folder))
+
+
+def use_pack(folder):
+    """
+    True when a raw folder should be read from its pack: the pack exists and the folder
+    is either gone or has not changed (no file added or removed) since it was packed.
+    """
+    if not has_pack(folder):
+        return False
+    return not os.path.isdir(folder) or os.path.getmtime(pack_paths(folder)[1]) >= os.path.getmtime(folder)
+
+
+def load_index(folder):
+    """Index of the pack of a raw folder."""
+    with open(pack_paths(folder)[1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pack_fingerprint(folder):
+    """Fingerprint of a pack for the manifest (see manifest.py), None when there is no pack."""
+    if not has_pack(folder):
+        return None
+    pack, index = (os.stat(path) for path in pack_paths(folder))
+    return {'count': len(load_index(folder)['names']),
+            'digest': 'pack:%d:%d:%d' % (pack.st_size, pack.st_mtime_ns, index.st_mtime_ns)}
+
+
+class PackReader:
+    """Sequential/random access to the documents of one pack."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        index = load_index(folder)
+        self.names = index['names']
+        self.times = index['times']
+        self.offsets = index['offsets']
+        self.lengths = index['lengths']
+        self.position = {name: i for i, name in enumerate(self.names)}
+        self.f = open(pack_paths(folder)[0], 'rb')
+
+    def read_at(self, i):
+        """Bytes of the i-th document (one seek only when reading out of order)."""
+        if self.f.tell() != self.offsets[i]:
+            self.f.seek(self.offsets[i])
+        return self.f.read(self.lengths[i])
+
+    def read(self, name):
+        """Bytes of the document of an original file name."""
+        return self.read_at(self.position[name])
+
+    def close(self):
+        self.f.close()
+
+
+def pack_folder(folder, remove=False):
+    """
+    Pack one raw folder. The pack is written to temporary files and renamed, so that an
+    interrupted run never leaves a half-written pack behind.
+
+    :param folder: raw folder, e.g. '../GNSS_Dataset/Raw_data/12/14/RXM-RAWX'
+    :param remove: remove the folder once the pack is written
+    :return: (number of files, bytes read, bytes of the pack)
+    """
+    pack_path, index_path = pack_paths(folder)
+    names = sorted(name for name in os.listdir(folder) if name.endswith('.json'))
+    index = {'version': 1, 'names': names, 'times': [], 'offsets': [], 'lengths': []}
+    size_in = 0
+    with open(pack_path + '.tmp', 'wb') as pack:
+        for name in names:
+            with open(os.path.join(folder, name), 'rb') as f:
+                data = f.read()
+            size_in += len(data)
+            content = loads(data)
+            line = (json.dumps(content, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            index['times'].append(file_start_time(content, name))
+            index['offsets'].append(pack.tell())
+            index['lengths'].append(len(line))
+            pack.write(line)
+        size_out = pack.tell()
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(pack_path + '.tmp', pack_path)
+    os.replace(index_path + '.tmp', index_path)
+    if remove:
+        shutil.rmtree(folder)
+    return len(names), size_in, size_out
+
+
+def unpack_folder(folder):
+    """Write the documents of a pack back as one JSON file per epoch (compact JSON) and remove the pack."""
+    reader = PackReader(folder)
+    os.makedirs(folder, exist_ok=True)
+    for i, name in enumerate(reader.names):
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(reader.read_at(i).rstrip(b'\n'))
+    reader.close()
+    for path in pack_paths(folder):
+        os.remove(path)
+    return len(reader.names)
+
+
+def hour_folders(root, day, hour, msgs=None):
+    """Raw message folders (or packs) of an hour, e.g. [('RXM-RAWX', '.../12/14/RXM-RAWX'), ...]."""
+    hour_dir = os.path.join(root, str(day), str(hour))
+    if not os.path.isdir(hour_dir):
+        return []
+    found = {name for name in os.listdir(hour_dir) if os.path.isdir(os.path.join(hour_dir, name))}
+    found |= {name[:-len(INDEX_EXT)] for name in os.listdir(hour_dir) if name.endswith(INDEX_EXT)}
+    return [(msg, os.path.join(hour_dir, msg)) for msg in sorted(found) if msgs is None or msg in msgs]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pack the raw JSON files of every hour and message into one indexed file.')
+    parser.add_argument('command', choices=['pack', 'unpack'])
+    parser.add_argument('--root', default=RAW_DIR, help='Raw_data folder')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=list(range(24)))
+    parser.add_argument('--msgs', nargs='+', default=None, help='messages to pack, e.g. RXM-RAWX NAV-SAT (default: all)')
+    parser.add_argument('--remove', action='store_true', help='pack: remove the folders once packed')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    t0 = time.perf_counter()
+    total_files = total_in = total_out = 0
+    for day in args.days:
+        for hour in args.hours:
+            for msg, folder in hour_folders(args.root, day, hour, args.msgs):
+                if args.command == 'unpack':
+                    if has_pack(folder):
+                        print('[OK] %s: %d files' % (folder, unpack_folder(folder)))
+                    continue
+                if not os.path.isdir(folder):
+                    continue  # already packed and removed
+                files, size_in, size_out = pack_folder(folder, args.remove)
+                total_files, total_in, total_out = total_files + files, total_in + size_in, total_out + size_out
+                print('[OK] %s: %d files, %.1f MB -> %.1f MB' % (folder, files, size_in / 1e6, size_out / 1e6))
+    if args.command == 'pack':
+        print('Packed %d files, %.1f MB -> %.1f MB in %.1f s'
+              % (total_files, total_in / 1e6, total_out / 1e6, time.perf_counter() - t0))
@@ -0,0 +1,291 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Sources of the raw UBX-JSON files read by extract_process_data.py.
+
+The extractor reads the files of one message of one hour through a source:
+
+    source = open_source('../GNSS_Dataset/Raw_data')         # unpacked folders (default)
+    source = open_source('GNSS_Dataset_part1.zip')           # straight from the archive
+    for name in source.names(12, 14, 'RXM-RAWX'):            # sorted file names (time order)
+        content = source.read(12, 14, 'RXM-RAWX', name)      # bytes of the JSON file
+
+Archives (.zip, .tar, .tar.gz/.tgz/.tar.bz2/.tar.xz, and .7z when py7zr is installed)
+are read in place, without unpacking them to disk. Members are found from the end
+of their path, '<day>/<hour>/<MSG>/<file>.json', whatever folders come before.
+
+  - zip: every member is read and decompressed on its own (random access).
+  - tar: the archive is read as a forward-only stream, so every compressed byte is
+         read once. The groups the stream passes are kept in memory until released;
+         hours must be requested in archive order (the extractor goes day by day,
+         hour by hour) or the stream is restarted.
+  - 7z:  the members of a group are decompressed together with py7zr.
+
+A folder source reads the per-hour packs written by raw_pack.py
+('<day>/<hour>/<MSG>.jsonl' + '.idx.json') instead of the message folders when present.
+
+"""
+
+import hashlib, os, tarfile, zipfile
+from functools import lru_cache
+
+from manifest import folder_fingerprint
+from raw_pack import RAW_DIR, PackReader, pack_fingerprint, pack_paths, use_pack
+
+try:
+    import py7zr  # pip install py7zr
+    HAS_PY7ZR = True
+except ImportError:
+    HAS_PY7ZR = False
+
+TAR_EXTS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def member_key(path):
+    """
+    Group and file name of an archive member, e.g.
+    'Raw_data/12/14/RXM-RAWX/2023-09-12 14-00-00.json' -> (('12', '14', 'RXM-RAWX'), '2023-09-12 14-00-00.json').
+    Returns None for the members that are not raw JSON files.
+    """
+    parts = path.replace('\\', '/').strip('/').split('/')
+    if len(parts) < 4 or not parts[-1].endswith('.json'):
+        return None
+    day, hour, msg, name = parts[-4:]
+    if not (day.isdigit() and hour.isdigit()):
+        return None
+    return (str(int(day)), str(int(hour)), msg), name
+
+
+def _group(day, hour, msg):
+    return str(int(day)), str(int(hour)), msg
+
+
+def _digest(items):
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(('\0'.join(str(v) for v in item) + '\n').encode('utf-8'))
+    return digest.hexdigest()
+
+
+class FolderSource:
+    """Raw files unpacked in '<root>/<day>/<hour>/<MSG>/', or packed by raw_pack.py."""
+
+    def __init__(self, root=RAW_DIR):
+        self.root = root
+        self.packs = {}  # open packs of the groups being read
+
+    def folder(self, day, hour, msg):
+        return '%s/%s/%s/%s' % (self.root, day, hour, msg)
+
+    def _pack(self, day, hour, msg):
+        """PackReader of a group packed by raw_pack.py, None when it is read from its folder."""
+        group = _group(day, hour, msg)
+        if group not in self.packs:
+            folder = self.folder(day, hour, msg)
+            if not use_pack(folder):
+                return None
+            self.packs[group] = PackReader(folder)
+        return self.packs[group]
+
+    def names(self, day, hour, msg):
+        """Sorted file names of a group; raises FileNotFoundError when the folder is missing."""
+        pack = self._pack(day, hour, msg)
+        if pack is not None:
+            return list(pack.names)
+        return sorted(os.listdir(self.folder(day, hour, msg)))
+
+    def times(self, day, hour, msg):
+        """'start_time' of every name of a group when known without reading the files (packs), else None."""
+        pack = self._pack(day, hour, msg)
+        return None if pack is None else list(pack.times)
+
+    def read(self, day, hour, msg, name):
+        pack = self._pack(day, hour, msg)
+        if pack is not None:
+            return pack.read(name)
+        with open(os.path.join(self.folder(day, hour, msg), name), 'rb') as f:
+            return f.read()
+
+    def label(self, day, hour, msg, name=None):
+        """Printable location of a group or of one of its files."""
+        folder = self.folder(day, hour, msg)
+        if use_pack(folder):
+            folder = pack_paths(folder)[0] + ':'
+            return folder if name is None else folder + name
+        return folder if name is None else os.path.join(folder, name)
+
+    def fingerprint(self, day, hour, msg):
+        """Fingerprint of a group for the manifest, None when it does not exist."""
+        folder = self.folder(day, hour, msg)
+        return pack_fingerprint(folder) if use_pack(folder) else folder_fingerprint(folder)
+
+    def want(self, groups):
+        """Hint of the (day, hour, msg) groups that will be read; not needed by folders."""
+
+    def release(self, day, hour, msg):
+        """Tell the source that a group has been read, closing its pack."""
+        pack = self.packs.pop(_group(day, hour, msg), None)
+        if pack is not None:
+            pack.close()
+
+
+class ZipSource(FolderSource):
+    """Raw files read member by member from a .zip archive."""
+
+    def __init__(self, path):
+        self.path = path
+        self.zf = zipfile.ZipFile(path, 'r')
+        self.groups = {}
+        for info in self.zf.infolist():
+            key = member_key(info.filename)
+            if key is not None and not info.is_dir():
+                self.groups.setdefault(key[0], {})[key[1]] = info
+
+    def _members(self, day, hour, msg):
+        try:
+            return self.groups[_group(day, hour, msg)]
+        except KeyError:
+            raise FileNotFoundError('%s not found in %s' % ('/'.join(_group(day, hour, msg)), self.path))
+
+    def names(self, day, hour, msg):
+        return sorted(self._members(day, hour, msg))
+
+    def times(self, day, hour, msg):
+        return None
+
+    def read(self, day, hour, msg, name):
+        return self.zf.read(self._members(day, hour, msg)[name])
+
+    def label(self, day, hour, msg, name=None):
+        group = '%s:%s' % (self.path, '/'.join(_group(day, hour, msg)))
+        return group if name is None else '%s/%s' % (group, name)
+
+    def fingerprint(self, day, hour, msg):
+        members = self.groups.get(_group(day, hour, msg))
+        if members is None:
+            return None
+        return {'count': len(members),
+                'digest': _digest((name, info.file_size, info.CRC) for name, info in sorted(members.items()))}
+
+    def release(self, day, hour, msg):
+        """Members are read one by one from the open archive: nothing to close."""
+
+
+class TarSource(ZipSource):
+    """Raw files read from a (compressed) tar archive as one forward-only stream."""
+
+    def __init__(self, path):
+        self.path = path
+        self.wanted = set()  # groups kept in memory when the stream passes them
+        self._open()
+
+    def _open(self):
+        self.tar = tarfile.open(self.path, 'r|*')
+        self.stream = iter(self.tar)
+        self.groups = {}  # groups read from the stream and not released yet
+        self.seen = set()  # groups the stream has reached
+        self.complete = set()  # groups the stream has moved past
+        self.current = None  # (day, hour) of the last member read
+        self.finished = False
+
+    def want(self, groups):
+        self.wanted |= {_group(*group) for group in groups}
+
+    def release(self, day, hour, msg):
+        group = _group(day, hour, msg)
+        self.groups.pop(group, None)
+        self.wanted.discard(group)
+
+    def _advance(self, target):
+        """Read the stream until the target group is complete (its hour has been passed) or the archive ends."""
+        if target not in self.groups and target in self.seen:
+            # passed without being kept (not wanted, or released): read the archive again from the start
+            self.tar.close()
+            self._open()
+        while not self.finished and target not in self.complete:
+            member = next(self.stream, None)
+            if member is None:
+                self.finished = True
+                break
+            key = member_key(member.name) if member.isfile() else None
+            if key is None:
+                continue
+            group, name = key
+            if group[:2] != self.current:
+                self.complete |= {g for g in self.seen if g[:2] == self.current}
+                self.current = group[:2]
+            self.seen.add(group)
+            if group == target or group in self.wanted:
+                self.groups.setdefault(group, {})[name] = self.tar.extractfile(member).read()
+        return self.groups.get(target)
+
+    def _members(self, day, hour, msg):
+        group = _group(day, hour, msg)
+        members = self.groups.get(group) if group in self.complete and group in self.groups else self._advance(group)
+        if members is None:
+            raise FileNotFoundError('%s not found in %s' % ('/'.join(group), self.path))
+        return members
+
+    def read(self, day, hour, msg, name):
+        return self._members(day, hour, msg)[name]
+
+    def fingerprint(self, day, hour, msg):
+        # listing a group would read the stream: use the archive itself
+        st = os.stat(self.path)
+        return {'count': -1, 'digest': _digest([(os.path.basename(self.path), st.st_size, st.st_mtime_ns)])}
+
+
+class SevenZipSource(ZipSource):
+    """Raw files read from a .7z archive with py7zr, one group at a time."""
+
+    def __init__(self, path):
+        if not HAS_PY7ZR:
+            raise ImportError("reading .7z archives needs 'py7zr' (pip install py7zr)")
+        self.path = path
+        self.archive = py7zr.SevenZipFile(path, mode='r')
+        self.groups, self.cache = {}, {}
+        for info in self.archive.list():
+            key = member_key(info.filename)
+            if key is not None and not info.is_directory:
+                self.groups.setdefault(key[0], {})[key[1]] = info
+
+    def read(self, day, hour, msg, name):
+        group = _group(day, hour, msg)
+        if group not in self.cache:
+            members = self._members(day, hour, msg)
+            self.archive.reset()
+            files = self.archive.read(targets=[info.filename for info in members.values()])
+            self.cache[group] = {key[1]: files[path].read()
+                                 for path, key in ((path, member_key(path)) for path in files) if key is not None}
+        return self.cache[group][name]
+
+    def release(self, day, hour, msg):
+        self.cache.pop(_group(day, hour, msg), None)
+
+    def fingerprint(self, day, hour, msg):
+        members = self.groups.get(_group(day, hour, msg))
+        if members is None:
+            return None
+        return {'count': len(members),
+                'digest': _digest((name, info.uncompressed, info.crc32) for name, info in sorted(members.items()))}
+
+
+def open_source(path=RAW_DIR):
+    """
+    Open the raw data at path, once per process: a folder laid out as '<day>/<hour>/<MSG>/'
+    or an archive (.zip, .tar.*, .7z) holding that layout.
+    """
+    # worker processes forked from a process that opened the archive must not share its file offset
+    return _open_source(path or RAW_DIR, os.getpid())
+
+
+@lru_cache(maxsize=None)
+def _open_source(path, pid):
+    lname = path.lower()
+    if lname.endswith('.zip'):
+        return ZipSource(path)
+    if any(lname.endswith(ext) for ext in TAR_EXTS):
+        return TarSource(path)
+    if lname.endswith('.7z'):
+        return SevenZipSource(path)
+    return FolderSource(path)
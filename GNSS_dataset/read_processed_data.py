@@ -11,7 +11,10 @@ Ming Huang (huangming@ynu.edu.cn)
 12/28 2023
 """
 
-import json
+import os
+
+from processed_io import PROCESSED_DIR, find_product, load_product
+from processed_store import ProcessedStore
 
 
 def read_processed_data(day, hour, item):
@@ -28,15 +31,36 @@ def read_processed_data(day, hour, item):
     :return:
     """
 
-    fileName = 'processed data/%s/%s%s.json' % (day,item,hour)
+    # observationHH.npz (or the sparse .spz) is read when present, otherwise observationHH.json
+    fileName = find_product(os.path.join(PROCESSED_DIR, str(day)), item, hour)
     print('**'*50)
+    if fileName is None:
+        print('No processed file found for: ', os.path.join(PROCESSED_DIR, str(day), '%s%s' % (item, hour)))
+        return
     print('You are reading file: ', fileName)
-    with open(fileName, "r", encoding="utf-8") as f:
-        content0 = json.load(f)
+    content0 = load_product(fileName)
     for key,value in content0.items():
         print(key,': ', value)
 
 
+def read_processed_series(store_dir, key, start=None, end=None, svId=None):
+    """
+    This function reads the time series of one key over several days and hours from
+    the memory-mapped store built by processed_store.py, without loading the hourly files.
+
+    :param store_dir: folder of the store, e.g. 'store'
+    :param key: key of a processed file, e.g. 'cn0_G1', 'elev_E', 'hAcc'
+    :param start: first time (inclusive), e.g. '2023-09-12 14:00'
+    :param end: last time (exclusive), e.g. '2023-09-15 03:00'
+    :param svId: satellite identifier, e.g. 7 for GPS PRN 7 in 'cn0_G1'; None for all satellites
+    :return: (datetime64 times, values)
+    """
+    times, values = ProcessedStore(store_dir).series(key, start, end, svId)
+    print('**'*50)
+    print('You are reading %s (svId=%s) from %s to %s: %d epochs' % (key, svId, start, end, len(times)))
+    return times, values
+
+
 if __name__ == '__main__':
     items = ['observation','pvtSolution', 'satelliteInfomation']
     days = [12]
@@ -11,7 +11,15 @@ Ming Huang (huangming@ynu.edu.cn)
 12/28 2023
 """
 
-import json, os, time
+import os
+
+import numpy as np
+
+from json_backend import load_file, loads
+from processed_io import parse_record_time
+from processed_store import to_datetime64
+from raw_source import RAW_DIR, open_source
+from time_join import file_start_time
 
 
 def get_data_path(your_path):
@@ -31,33 +39,127 @@ def read_raw_data(day, hour, item):
     :param item: choose the item file from ['RXM-RAWX','NAV-PVT','NAV-DOP','NAV-SAT','NAV-POSECEF','NAV-SPAN']
     :return: None
     '''
-    fileName = '../GNSS_Dataset/Raw_data/%s/%s/RXM-RAWX'%(day, hour)
+    # the hour is read from its folder, or from its pack when raw_pack.py packed it
+    source = open_source()
     #fileName = 'G:/GNSSJson09_2/%s/%s/%s'%(day, hour,item)
-    json_names = os.listdir(fileName)
+    json_names = source.names(day, hour, item)
 
     # Read single file
-    with open(os.path.join(fileName, json_names[0]), "r", encoding="utf-8") as f:
-        content0 = json.load(f)
+    content0 = loads(source.read(day, hour, item, json_names[0]))
     for key,value in content0.items():
         print(key,': ', value)
 
     # Read one hour files
     for json_name in json_names:
-        print('**'*50)
-        print('You are reading file: ', os.path.join(fileName, json_name))
-        with open(os.path.join(fileName, json_name), "r", encoding="utf-8") as f:
-            content = json.load(f)
+        print('You are reading file: ', source.label(day, hour, item, json_name))
+        content = loads(source.read(day, hour, item, json_name))
         for key,value in content.items():
             print(key,': ', value)
-        time.sleep(5)
+    source.release(day, hour, item)
+
+
+def day_hour(epoch):
+    """Raw folder of an epoch: datetime64 -> (day of the month, hour), e.g. 2023-09-12T14:23:17 -> (12, 14)."""
+    day = (epoch.astype('datetime64[D]') - epoch.astype('datetime64[M]')).astype(int) + 1
+    hour = (epoch.astype('datetime64[h]') - epoch.astype('datetime64[D]')).astype(int)
+    return int(day), int(hour)
+
+
+class RawReader:
+    '''
+    Random access to the raw files by epoch time. The files of a (day, hour, message)
+    group are indexed by their 'start_time' the first time the group is used; only the
+    files of the epochs that are asked for are read and parsed.
+
+    Example:
+        reader = RawReader()
+        sat = reader.get('NAV-SAT', '2023-09-12 14:23:17')
+        for t, rawx in reader.range('RXM-RAWX', '2023-09-12 14:59:50', '2023-09-12 15:00:10'):
+            ...
+    '''
+
+    def __init__(self, raw=RAW_DIR):
+        '''
+        :param raw: raw data folder or archive (see raw_source.py)
+        '''
+        self.source = open_source(raw)
+        self.indexes = {}  # (day, hour, msg) -> (datetime64[ms] times, file names), sorted by time
+
+    def index(self, day, hour, msg):
+        '''
+        :param day: date
+        :param hour: hour
+        :param msg: message, e.g. 'NAV-SAT'
+        :return: (times, names) of the files of the group, sorted by time; empty when the group does not exist
+        '''
+        key = (int(day), int(hour), msg)
+        if key not in self.indexes:
+            try:
+                names = self.source.names(day, hour, msg)
+            except FileNotFoundError:
+                names = []
+            # pack indexes hold the 'start_time' of every file; folders and archives use the file names
+            times = self.source.times(day, hour, msg) if names else None
+            times = parse_record_time(times or [file_start_time({}, name) for name in names])
+            if not np.issubdtype(times.dtype, np.datetime64):
+                # names that are not times: read the 'start_time' of every file once
+                times = parse_record_time([file_start_time(loads(self.source.read(day, hour, msg, name)), name)
+                                           for name in names])
+            order = np.argsort(times, kind='stable')
+            self.indexes[key] = times[order], [names[i] for i in order]
+        return self.indexes[key]
+
+    def _read(self, day, hour, msg, name):
+        return loads(self.source.read(day, hour, msg, name))
+
+    def get(self, msg, epoch, tolerance=0):
+        '''
+        :param msg: message, e.g. 'NAV-SAT'
+        :param epoch: time of the epoch, e.g. '2023-09-12 14:23:17', datetime or datetime64
+        :param tolerance: seconds; the nearest epoch within this distance is returned
+        :return: parsed content of the file of the epoch; KeyError when there is none
+        '''
+        t = to_datetime64(epoch)
+        times, names = self.index(*day_hour(t), msg)
+        i = int(np.searchsorted(times, t))
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(times)]
+        if candidates:
+            j = min(candidates, key=lambda j: abs(times[j] - t))
+            if abs(times[j] - t) <= np.timedelta64(int(round(tolerance * 1000)), 'ms'):
+                return self._read(*day_hour(t), msg, names[j])
+        raise KeyError('No %s epoch at %s' % (msg, t))
+
+    def range(self, msg, start, end):
+        '''
+        Iterate over the epochs in [start, end), hour by hour. Every file is read and
+        parsed when the iteration reaches it.
+
+        :param msg: message, e.g. 'RXM-RAWX'
+        :param start: first time (inclusive), e.g. '2023-09-12 14:00'
+        :param end: last time (exclusive)
+        :return: iterator of (datetime64[ms] time, parsed content)
+        '''
+        t0, t1 = to_datetime64(start), to_datetime64(end)
+        hour = t0.astype('datetime64[h]')
+        while hour < t1:
+            day_, hour_ = day_hour(hour)
+            times, names = self.index(day_, hour_, msg)
+            first, last = np.searchsorted(times, [t0, t1])
+            for i in range(int(first), int(last)):
+                yield times[i], self._read(day_, hour_, msg, names[i])
+            hour += np.timedelta64(1, 'h')
+
+    def release(self):
+        '''Close the packs and drop the archive members kept by the source (the indexes are kept).'''
+        for day, hour, msg in self.indexes:
+            self.source.release(day, hour, msg)
 
 
 if __name__ == '__main__':
     # Read single file
     
     json_name = "Raw_data/12/0/RXM-RAWX/2023-09-12 00-00-01.json"
-    with open(json_name, "r", encoding="utf-8") as f:
-        content = json.load(f)
+    content = load_file(json_name)
     for key,value in content.items():
         print(key,': ', value)
 
@@ -0,0 +1,125 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Parsing of the recordTime columns of the processed files into datetime64[ms] arrays.
+
+The format is detected once per column from its first entry, and the whole column is
+converted in one vectorized pass: the strings are viewed as a (epochs, characters) byte
+array, checked and normalized to ISO 8601 in place, then parsed by NumPy. Accepted formats:
+
+    '2023-09-12 14:00:00'        start_time of the raw files (JSON processed files)
+    '2023-09-12 14-00-00'        raw file names
+    '2023/09/12 14:00:00'
+    '2023-09-12T14:00:00'        ISO 8601
+    any of them with a fraction of second ('.5', '.123')
+
+Numbers are read as seconds since 1970-01-01 UTC and datetime64 arrays (npz files) are
+used as they are. Entries that do not match the detected format are returned as NaT and
+flagged in the mask, never replaced by another time.
+
+"""
+
+import numpy as np
+
+# separators at positions 4, 7, 10, 13 and 16 of every accepted format
+SEPARATORS = {
+    'iso': b'-- ::',
+    'isoT': b'--T::',
+    'dashed': b'-- --',
+    'slashed': b'// ::',
+}
+SEPARATOR_POS = [4, 7, 10, 13, 16]
+DIGIT_POS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+ISO_SEPARATORS = np.frombuffer(b'--T::', dtype=np.uint8)
+
+
+def detect_format(sample):
+    """Name of the format of one recordTime entry (see SEPARATORS), 'seconds' for numbers, None if unknown."""
+    if isinstance(sample, (int, float, np.integer, np.floating)):
+        return 'seconds'
+    if isinstance(sample, bytes):
+        sample = sample.decode('ascii', 'replace')
+    if not isinstance(sample, str) or len(sample) < 19:
+        return None
+    for name, seps in SEPARATORS.items():
+        if all(sample[p] == chr(seps[i]) for i, p in enumerate(SEPARATOR_POS)) \
+                and all(sample[p].isdigit() for p in DIGIT_POS):
+            return name
+    return None
+
+
+def parse_times(values, fmt=None):
+    """
+    Convert a recordTime column into datetime64[ms].
+
+    :param values: list or array of strings, numbers (seconds since 1970) or datetime64
+    :param fmt: format name (see SEPARATORS); detected from the first entry when None
+    :return: (times, valid): datetime64[ms] array, NaT where an entry cannot be parsed,
+             and the boolean mask of the parsed entries
+    """
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        times = values.astype('datetime64[ms]')
+        return times, ~np.isnat(times)
+    values = list(values) if not isinstance(values, np.ndarray) else values
+    if len(values) == 0:
+        return np.zeros(0, dtype='datetime64[ms]'), np.zeros(0, dtype=bool)
+    if fmt is None:
+        fmt = detect_format(values[0])
+    if fmt == 'seconds':
+        seconds = np.array([v if isinstance(v, (int, float)) else np.nan for v in values], dtype=float) \
+            if not isinstance(values, np.ndarray) else values.astype(float)
+        valid = np.isfinite(seconds)
+        times = np.full(len(seconds), np.datetime64('NaT'), dtype='datetime64[ms]')
+        times[valid] = np.round(seconds[valid] * 1000).astype(np.int64).astype('datetime64[ms]')
+        return times, valid
+    if fmt is None:
+        return np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ms]'), np.zeros(len(values), dtype=bool)
+
+    # one row of bytes per entry; non-strings become '' and are rejected below
+    text = np.array([v if isinstance(v, (str, bytes)) else '' for v in values]) \
+        if not isinstance(values, np.ndarray) else values.astype(str)
+    data = np.char.encode(text, 'ascii', 'replace') if text.dtype.kind == 'U' else text.astype('S')
+    width = max(data.dtype.itemsize, 19)
+    data = data.astype('S%d' % width)
+    chars = data.view(np.uint8).reshape(len(data), width).copy()
+
+    seps = np.frombuffer(SEPARATORS[fmt], dtype=np.uint8)
+    digits = chars[:, DIGIT_POS]
+    valid = np.all(chars[:, SEPARATOR_POS] == seps, axis=1) & np.all((digits >= 48) & (digits <= 57), axis=1)
+    # after the seconds: nothing, or '.' and digits
+    tail = chars[:, 19:]
+    if tail.shape[1]:
+        end = (tail == 0)
+        frac_ok = (tail[:, :1] == ord('.')) | end[:, :1]
+        tail_digits = (tail[:, 1:] >= 48) & (tail[:, 1:] <= 57) | end[:, 1:]
+        valid &= frac_ok[:, 0] & np.all(tail_digits, axis=1)
+        # NUL padding must not be followed by characters
+        valid &= np.all(np.diff(end.astype(np.int8), axis=1) >= 0, axis=1)
+
+    chars[:, SEPARATOR_POS] = ISO_SEPARATORS
+    iso = chars.view('S%d' % width).ravel()
+    times = np.full(len(iso), np.datetime64('NaT'), dtype='datetime64[ms]')
+    try:
+        times[valid] = iso[valid].astype('datetime64[ms]')
+    except ValueError:
+        # well-formed but impossible dates (e.g. month 13): find them one by one
+        for i in np.flatnonzero(valid):
+            try:
+                times[i] = np.datetime64(iso[i].decode('ascii'), 'ms')
+            except ValueError:
+                valid[i] = False
+    return times, valid
+
+
+def record_times(content):
+    """
+    parse_times() of the recordTime of a processed hour. The hours loaded by
+    processed_io.load_product (ProcessedHour) keep the result, so that the plots of an
+    hour parse it only once; the recordTime of other dicts is parsed on every call.
+
+    :param content: content of a processed file
+    :return: (times, valid), see parse_times
+    """
+    if hasattr(content, 'record_times'):
+        return content.record_times()
+    return parse_times(content.get('recordTime', []))
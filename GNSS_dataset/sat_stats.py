@@ -0,0 +1,231 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Satellite usage statistics over any range of days and hours, from the
+satelliteInfomationHH files (svId_*, svUsed_*, cno_*, elev_* matrices):
+
+  - used:     epochs where the satellite is used in the navigation solution
+  - visible:  epochs where the satellite is listed in NAV-SAT (seconds at 1 Hz)
+  - cno:      mean and percentiles of C/N0 (dB-Hz) while visible
+  - elev:     mean and percentiles of the elevation (deg) while visible
+
+Every hour is reduced to a small partial (counts, sums and 1 dB-Hz / 1 deg histograms
+per satellite column) with vectorized reductions over its matrices. Partials are
+cached next to the processed files ('satStatsHH.npz', rebuilt when the
+satelliteInfomation file changes), and the statistics of a campaign are the sum of
+the partials of its hours.
+
+USAGE:
+    python sat_stats.py --days 12 13 14 --hours $(seq 0 23) --top 10
+    python sat_stats.py --days $(seq 12 30) --gnss G E --csv stats.csv
+
+"""
+
+import argparse, csv, os
+
+import numpy as np
+
+from processed_io import PROCESSED_DIR, find_product, load_product
+from ubx_decode import SAT_CONSTELLATIONS
+
+STATS_VERSION = 1
+CONSTELLATIONS = [(const, numSats) for const, gnssId, numSats in SAT_CONSTELLATIONS]
+CNO_BINS = np.arange(0, 101)      # 1 dB-Hz bins, C/N0 is a U1 in NAV-SAT
+ELEV_BINS = np.arange(-90, 92)    # 1 deg bins, elev is an I1 in NAV-SAT
+COUNTS = ('used', 'visible', 'cno_n', 'elev_n')
+SUMS = ('cno_sum', 'elev_sum')
+HISTS = {'cno_hist': CNO_BINS, 'elev_hist': ELEV_BINS}
+
+
+def _matrix(sat_info, key, numSats):
+    """[T, numSats] float array of a key, padded with NaN or cut to the width of its constellation."""
+    value = sat_info.get(key)
+    if value is None or len(value) == 0:
+        return None
+    arr = np.asarray(value, dtype=float)
+    arr = arr.reshape(len(arr), -1)
+    if arr.shape[1] < numSats:
+        arr = np.hstack([arr, np.full((len(arr), numSats - arr.shape[1]), np.nan)])
+    return arr[:, :numSats]
+
+
+def _histogram(values, mask, bins):
+    """[N, len(bins) - 1] histogram of every column of values where mask is True (integer bins)."""
+    cols = np.broadcast_to(np.arange(values.shape[1]), values.shape)[mask]
+    idx = np.clip(np.round(values[mask]).astype(int) - bins[0], 0, len(bins) - 2)
+    flat = np.bincount(cols * (len(bins) - 1) + idx, minlength=values.shape[1] * (len(bins) - 1))
+    return flat.reshape(values.shape[1], len(bins) - 1)
+
+
+def hour_partial(sat_info):
+    """
+    Partial statistics of one hour of satellites information.
+
+    :param sat_info: content of a satelliteInfomationHH file (json lists or npz arrays)
+    :return: {'epochs': int, '<field>_<const>': array} with, per satellite column of every
+             constellation, the counts COUNTS, the sums SUMS and the histograms HISTS
+    """
+    partial = {'epochs': np.array(len(sat_info.get('recordTime', [])))}
+    for const, numSats in CONSTELLATIONS:
+        svId = _matrix(sat_info, f'svId_{const}', numSats)
+        if svId is None:
+            continue
+        visible = svId > 0
+        used = _matrix(sat_info, f'svUsed_{const}', numSats)
+        cno = _matrix(sat_info, f'cno_{const}', numSats)
+        elev = _matrix(sat_info, f'elev_{const}', numSats)
+        partial[f'used_{const}'] = (used == 1).sum(axis=0) if used is not None else np.zeros(numSats, dtype=int)
+        partial[f'visible_{const}'] = visible.sum(axis=0)
+        for name, values in (('cno', cno), ('elev', elev)):
+            if values is None:
+                values = np.full(svId.shape, np.nan)
+            valid = visible & np.isfinite(values)
+            partial[f'{name}_n_{const}'] = valid.sum(axis=0)
+            partial[f'{name}_sum_{const}'] = np.where(valid, values, 0.0).sum(axis=0)
+            partial[f'{name}_hist_{const}'] = _histogram(values, valid, HISTS[f'{name}_hist'])
+    return partial
+
+
+def merge(partials):
+    """Sum of partials (hours, or already merged ranges)."""
+    total = {}
+    for partial in partials:
+        for key, value in partial.items():
+            total[key] = total[key] + value if key in total else np.array(value)
+    return total
+
+
+def stats_path(base, hour):
+    return os.path.join(base, 'satStats%s.npz' % hour)
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return np.array([STATS_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def load_hour_partial(base, hour, cache=True):
+    """
+    Partial statistics of a processed hour, from its cache file when it is up to date.
+
+    :param base: folder of the processed files of a day, e.g. 'processed data/12'
+    :param hour: hour (0-23)
+    :param cache: read and write 'satStatsHH.npz'
+    :return: partial, None when the hour has no satelliteInfomation file
+    """
+    source = find_product(base, 'satelliteInfomation', hour)
+    if source is None:
+        return None
+    stamp = _source_stamp(source)
+    path = stats_path(base, hour)
+    if cache and os.path.isfile(path):
+        with np.load(path, allow_pickle=False) as npz:
+            if np.array_equal(npz['source'], stamp):
+                return {key: npz[key] for key in npz.files if key != 'source'}
+    partial = hour_partial(load_product(source))
+    if cache:
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, source=stamp, **partial)
+        os.replace(tmp, path)
+    return partial
+
+
+def campaign_partial(days, hours=None, root=PROCESSED_DIR, cache=True):
+    """Merged partial of the given days and hours (all the hours present when hours is None)."""
+    partials = []
+    for day in days:
+        base = os.path.join(root, str(day))
+        for hour in (range(24) if hours is None else hours):
+            partial = load_hour_partial(base, hour, cache)
+            if partial is not None:
+                partials.append(partial)
+    return merge(partials)
+
+
+def _percentile(hist, bins, q):
+    """Nearest-rank percentile of every row of integer-bin histograms, NaN for empty rows."""
+    n = hist.sum(axis=1)
+    rank = np.maximum(np.ceil(q / 100.0 * n), 1)
+    index = (hist.cumsum(axis=1) < rank[:, None]).sum(axis=1)
+    return np.where(n > 0, bins[np.minimum(index, len(bins) - 2)], np.nan)
+
+
+def satellite_table(partial, gnss=None, percentiles=(10, 50, 90)):
+    """
+    One row per satellite seen in the partial.
+
+    :param partial: hour_partial(), load_hour_partial() or merge() result
+    :param gnss: constellation letters to keep, e.g. ['G', 'E'], None for all
+    :param percentiles: percentiles of C/N0 and elevation
+    :return: list of dicts: sat, const, svId, used, visible, used_ratio, cno_mean, cno_pXX, elev_mean, elev_pXX
+    """
+    rows = []
+    for const, numSats in CONSTELLATIONS:
+        if f'visible_{const}' not in partial or (gnss is not None and const not in gnss):
+            continue
+        visible = partial[f'visible_{const}']
+        values = {}
+        for name in ('cno', 'elev'):
+            n = partial[f'{name}_n_{const}']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values[f'{name}_mean'] = np.where(n > 0, partial[f'{name}_sum_{const}'] / n, np.nan)
+            for q in percentiles:
+                values[f'{name}_p{q}'] = _percentile(partial[f'{name}_hist_{const}'], HISTS[f'{name}_hist'], q)
+        for j in np.flatnonzero(visible > 0):
+            row = {'sat': '%s%02d' % (const, j + 1), 'const': const, 'svId': int(j + 1),
+                   'used': int(partial[f'used_{const}'][j]), 'visible': int(visible[j]),
+                   'used_ratio': float(partial[f'used_{const}'][j] / visible[j])}
+            row.update({key: float(value[j]) for key, value in values.items()})
+            rows.append(row)
+    return rows
+
+
+def top_used(sat_info, k=4):
+    """
+    Top-k (constellation, svid) pairs most frequently 'used' across the epochs of an hour;
+    ties are ranked by first use (epoch, then constellation and column order).
+    """
+    T = len(sat_info.get('recordTime', []))
+    ranked = []
+    for order, (const, numSats) in enumerate(CONSTELLATIONS):
+        svId = _matrix(sat_info, f'svId_{const}', numSats)
+        used = _matrix(sat_info, f'svUsed_{const}', numSats)
+        if svId is None or used is None:
+            continue
+        used = used[:T] == 1
+        counts = used.sum(axis=0)
+        first = used.argmax(axis=0)
+        for j in np.flatnonzero(counts):
+            ranked.append((-int(counts[j]), int(first[j]), order, int(j), const, int(svId[first[j], j])))
+    ranked.sort()
+    return [(const, svid) for *_, const, svid in ranked[:k]]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Satellite usage, visibility, C/N0 and elevation statistics.')
+    parser.add_argument('--root', default=PROCESSED_DIR, help='processed data folder, one sub-folder per day')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=None, help='hours of every day (default: all)')
+    parser.add_argument('--gnss', nargs='+', default=None, help='constellations, e.g. G E (default: all)')
+    parser.add_argument('--top', type=int, default=None, help='only print the N most used satellites')
+    parser.add_argument('--csv', default=None, help='write the whole table to a CSV file')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the satStatsHH.npz files')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    partial = campaign_partial(args.days, args.hours, args.root, cache=not args.no_cache)
+    rows = sorted(satellite_table(partial, args.gnss), key=lambda row: (-row['used'], row['sat']))
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['sat'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print('[OK] %s: %d satellites' % (args.csv, len(rows)))
+    print('%d epochs' % int(partial.get('epochs', 0)))
+    print('%-5s %8s %8s %6s %8s %6s %6s %6s %8s' % ('sat', 'used', 'visible', 'used%', 'cno', 'p10', 'p50', 'p90', 'elev'))
+    for row in rows[:args.top]:
+        print('%-5s %8d %8d %6.1f %8.1f %6.0f %6.0f %6.0f %8.1f'
+              % (row['sat'], row['used'], row['visible'], 100 * row['used_ratio'], row['cno_mean'],
+                 row['cno_p10'], row['cno_p50'], row['cno_p90'], row['elev_mean']))
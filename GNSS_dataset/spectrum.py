@@ -0,0 +1,248 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Jamming metrics and spectrogram of the MON-SPAN spectra extracted into spectrumHH
+(python extract_process_data.py --products span).
+
+Every metric is computed for all the epochs of an hour at once on the (epochs, 256)
+spectrum array of one RF block (bins in dB, bin i at center + span * (i - 128) / 256):
+
+    floor           median of the bins (dB)
+    peak            strongest bin (dB) and its frequency peak_freq (Hz)
+    peak_to_median  peak - floor (dB): a CW or narrow-band jammer stands out of the floor
+    power           total power of the block (dB, relative), power_<band> of the GNSS bands
+                    of BANDS inside the span
+    excess          largest rise of a bin above the reference spectrum (dB), by default the
+                    per-bin median of the hour: what changed, whatever the band-pass shape
+    notches         bins more than NOTCH_DEPTH dB below the median of their NOTCH_WIDTH
+                    neighbours inside the pass band, and notch_freq of the deepest one (Hz)
+    pga             PGA gain (dB): the automatic gain control lowers it under jamming
+
+The spectrogram of a whole campaign is reduced on the fly to the maximum of every bin in
+about one time bucket per pixel (long_term.MinMaxSeries), so that it is drawn in the same
+time for an hour or for days, and a short jammer is never averaged away.
+
+USAGE:
+    python spectrum.py --days 12 --hours 14                        # metrics of every hour
+    python spectrum.py --days 12 --hours $(seq 0 23) --plot --out plots
+    python spectrum.py --days 12 13 --block 2 --csv metrics.csv
+
+"""
+
+import argparse, csv, os
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from graphics import finish_figure, new_figure
+from long_term import BUCKETS, MinMaxSeries, time_ms
+from processed_io import PROCESSED_DIR, find_product, load_product
+from ubx_decode import SPAN_BINS
+
+# GNSS signals watched in the spectra: (low, high) frequency in Hz
+BANDS = {
+    'L1': (1575.42e6 - 1.023e6, 1575.42e6 + 1.023e6),    # GPS L1 C/A, Galileo E1, QZSS L1
+    'B1I': (1561.098e6 - 2.046e6, 1561.098e6 + 2.046e6),
+    'G1': (1598.0625e6, 1605.375e6),                    # GLONASS L1OF, channels -7..+6
+    'L2': (1227.60e6 - 1.023e6, 1227.60e6 + 1.023e6),    # GPS/QZSS L2C
+    'E5b': (1207.14e6 - 10.23e6, 1207.14e6 + 10.23e6),  # Galileo E5b, BDS B2I
+    'G2': (1242.9375e6, 1248.625e6),                    # GLONASS L2OF
+}
+NOTCH_DEPTH = 10.0  # dB
+NOTCH_WIDTH = 9  # bins
+METRICS = ('floor', 'peak', 'peak_freq', 'peak_to_median', 'power', 'excess', 'notches', 'notch_freq', 'pga')
+
+
+def block_arrays(content, block=1):
+    """
+    Spectra of one RF block of a spectrumHH content.
+
+    :return: (times, spectrum, center, span, pga): int64 ms [T] (-1 when unparseable),
+             float32 [T, 256] (NaN rows where the block is absent), float [T] each
+    """
+    times = time_ms(content)
+    spectrum = np.asarray(content.get('spectrum_%d' % block, np.zeros((len(times), SPAN_BINS))), dtype=np.float32)
+    spectrum = spectrum.reshape(len(times), -1)
+    center, span, pga = (np.asarray(content.get('%s_%d' % (field, block), np.zeros(len(times))), dtype=float)
+                         for field in ('center', 'span', 'pga'))
+    absent = span <= 0
+    spectrum[absent] = np.nan
+    center[absent] = span[absent] = pga[absent] = np.nan
+    return times, spectrum, center, span, pga
+
+
+def bin_frequencies(center, span, bins=SPAN_BINS):
+    """[T, bins] frequency (Hz) of every bin, UBX-MON-SPAN: center + span * (i - bins/2) / bins."""
+    return center[:, None] + span[:, None] * (np.arange(bins) - bins // 2) / bins
+
+
+def band_power(spectrum, freqs, low, high):
+    """Power (dB, relative) of the bins of every epoch between low and high Hz, NaN outside the span."""
+    inside = (freqs >= low) & (freqs <= high)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = np.where(inside, 10.0 ** (spectrum / 10.0), 0.0).sum(axis=1)
+        return np.where(inside.any(axis=1), 10 * np.log10(power), np.nan)
+
+
+def spectrum_metrics(spectrum, center, span, pga=None, reference=None, bands=BANDS):
+    """
+    Per-epoch jamming metrics (see the module docstring), vectorized over the epochs.
+
+    :param spectrum: [T, bins] spectra in dB, NaN rows for the missing epochs
+    :param center: [T] center frequency (Hz)
+    :param span: [T] span (Hz)
+    :param pga: [T] PGA gain (dB), or None
+    :param reference: [bins] reference spectrum for 'excess', default: per-bin median of the epochs
+    :param bands: {name: (low Hz, high Hz)} of the power_<name> metrics
+    :return: {name: [T] array}
+    """
+    spectrum = np.asarray(spectrum, dtype=np.float32)
+    T, bins = spectrum.shape
+    present = ~np.isnan(spectrum).any(axis=1)
+    metrics = {name: np.full(T, np.nan) for name in METRICS}
+    metrics.update({'power_%s' % name: np.full(T, np.nan) for name in bands})
+    if not present.any():
+        return metrics
+    s, freqs = spectrum[present], bin_frequencies(center[present], span[present], bins)
+
+    floor = np.median(s, axis=1)
+    peak_bin = s.argmax(axis=1)
+    peak = s[np.arange(len(s)), peak_bin]
+    if reference is None:
+        reference = np.median(s, axis=0)
+    # notches: bins well below their neighbourhood, inside the pass band (not in the filter skirts)
+    half = NOTCH_WIDTH // 2
+    padded = np.pad(s, ((0, 0), (half, half)), mode='edge')
+    local = np.median(np.lib.stride_tricks.sliding_window_view(padded, NOTCH_WIDTH, axis=1), axis=2)
+    depth = np.where(local > floor[:, None] + 3.0, local - s, 0.0)
+    notch = depth > NOTCH_DEPTH
+    deepest = depth.argmax(axis=1)
+
+    rows = np.flatnonzero(present)
+    metrics['floor'][rows] = floor
+    metrics['peak'][rows] = peak
+    metrics['peak_freq'][rows] = freqs[np.arange(len(s)), peak_bin]
+    metrics['peak_to_median'][rows] = peak - floor
+    metrics['power'][rows] = band_power(s, freqs, -np.inf, np.inf)
+    metrics['excess'][rows] = (s - reference).max(axis=1)
+    metrics['notches'][rows] = notch.sum(axis=1)
+    metrics['notch_freq'][rows] = np.where(notch.any(axis=1), freqs[np.arange(len(s)), deepest], np.nan)
+    if pga is not None:
+        metrics['pga'][rows] = np.asarray(pga, dtype=float)[present]
+    for name, (low, high) in bands.items():
+        metrics['power_%s' % name][rows] = band_power(s, freqs, low, high)
+    return metrics
+
+
+def hour_metrics(content, block=1, reference=None):
+    """(times ms, metrics) of one processed spectrumHH content."""
+    times, spectrum, center, span, pga = block_arrays(content, block)
+    return times, spectrum_metrics(spectrum, center, span, pga, reference)
+
+
+class Spectrogram:
+    """Decimated spectrogram (max per time bucket and bin) and metrics of a campaign, fed hour by hour."""
+
+    def __init__(self, block=1, buckets=BUCKETS):
+        self.block = block
+        self.spectra = MinMaxSeries(buckets)
+        self.metrics = MinMaxSeries(buckets)
+        self.center = self.span = None
+
+    def add_hour(self, content):
+        times, spectrum, center, span, pga = block_arrays(content, self.block)
+        keep = (times >= 0) & ~np.isnan(span)
+        if not keep.any():
+            return
+        if self.center is None:
+            self.center, self.span = float(np.median(center[keep])), float(np.median(span[keep]))
+        elif np.any(center[keep] != self.center) or np.any(span[keep] != self.span):
+            print('[WARN] block %d: center/span change, the frequency axis of the first hour is used' % self.block)
+        metrics = spectrum_metrics(spectrum, center, span, pga)
+        self.spectra.add(times[keep], spectrum[keep])
+        self.metrics.add(times[keep], np.column_stack([metrics['peak_to_median'], metrics['pga']])[keep])
+
+
+def plot_spectrogram(data, out_png=None, fig=None):
+    """Spectrogram (top) and peak-to-median / PGA (bottom) of a Spectrogram."""
+    reused = fig is not None
+    fig = new_figure(fig)
+    fig.set_size_inches(17, 8)
+    t, values = data.spectra.envelope()
+    if not len(t):
+        print('[WARN] block %d: no spectrum to plot' % data.block)
+        finish_figure(fig, None, reused)
+        return
+    ax1, ax2 = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+    hi = values[1::2]  # maximum of every bucket
+    half = np.timedelta64(data.spectra.width // 2, 'ms')
+    edges = np.append(t[::2] - half, t[-1] + half)  # bucket boundaries
+    freqs = (data.center + data.span * (np.arange(hi.shape[1] + 1) - 0.5 - hi.shape[1] // 2) / hi.shape[1]) / 1e6
+    mesh = ax1.pcolormesh(edges, freqs, np.ma.masked_invalid(hi.T), shading='flat', cmap='viridis')
+    fig.colorbar(mesh, ax=[ax1, ax2], label='dB (max per bucket)')
+    for name, (low, high) in BANDS.items():
+        if freqs[0] <= (low + high) / 2e6 <= freqs[-1]:
+            ax1.axhline((low + high) / 2e6, color='w', lw=0.5, ls=':')
+            ax1.text(edges[0], (low + high) / 2e6, ' ' + name, color='w', fontsize=7, va='bottom')
+    ax1.set_ylabel('Frequency (MHz)')
+    ax1.set_title(f'MON-SPAN RF block {data.block}')
+
+    tm, m = data.metrics.envelope()
+    ax2.plot(tm, m[:, 0], lw=0.8, label='peak - median (dB)')
+    ax2.plot(tm, m[:, 1], lw=0.8, label='PGA (dB)')
+    ax2.set_xlabel('Time')
+    ax2.legend(loc='upper right', fontsize=8)
+    ax2.grid(True, ls=':')
+    finish_figure(fig, out_png, reused)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Jamming metrics and spectrogram of the MON-SPAN spectra.')
+    parser.add_argument('--root', default=PROCESSED_DIR, help='processed data folder, one sub-folder per day')
+    parser.add_argument('--days', type=int, nargs='+', required=True)
+    parser.add_argument('--hours', type=int, nargs='+', default=list(range(24)))
+    parser.add_argument('--block', type=int, default=1, help='RF block (1: L1 band, 2: L2/L5 band on the ZED-F9P)')
+    parser.add_argument('--csv', default=None, help='write the metrics of every epoch to a CSV file')
+    parser.add_argument('--plot', action='store_true', help='draw the spectrogram')
+    parser.add_argument('--buckets', type=int, default=BUCKETS, help='time buckets of the spectrogram')
+    parser.add_argument('--out', default=None, help='folder of spectrogram_<block>.png (default: show it)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.out:
+        plt.switch_backend('Agg')
+    data = Spectrogram(args.block, args.buckets)
+    writer = None
+    if args.csv:
+        f = open(args.csv, 'w', newline='')
+        writer = csv.writer(f)
+        writer.writerow(['recordTime'] + list(METRICS) + ['power_%s' % name for name in BANDS])
+    print('%-6s %-4s %7s %7s %9s %9s %8s %8s' % ('day', 'hour', 'epochs', 'floor', 'peak-med', 'excess',
+                                                 'notched', 'min PGA'))
+    for day in args.days:
+        base = os.path.join(args.root, str(day))
+        for hour in args.hours:
+            path = find_product(base, 'spectrum', hour)
+            if path is None:
+                continue
+            content = load_product(path)
+            times, metrics = hour_metrics(content, args.block)
+            print('%-6s %-4s %7d %7.1f %9.1f %9.1f %8d %8.0f'
+                  % (day, hour, len(times), np.nanmedian(metrics['floor']), np.nanmax(metrics['peak_to_median']),
+                     np.nanmax(metrics['excess']), int((metrics['notches'] > 0).sum()), np.nanmin(metrics['pga'])))
+            if writer:
+                columns = [metrics[name] for name in METRICS] + [metrics['power_%s' % name] for name in BANDS]
+                stamps = np.where(times >= 0, times, 0).astype('datetime64[ms]').astype(str)
+                writer.writerows([stamp] + ['%.6g' % v for v in row] for stamp, row in zip(stamps, zip(*columns)))
+            if args.plot:
+                data.add_hour(content)
+    if writer:
+        f.close()
+        print('[OK] %s' % args.csv)
+    if args.plot:
+        out_png = os.path.join(args.out, 'spectrogram_%d.png' % args.block) if args.out else None
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+        plot_spectrogram(data, out_png)
@@ -0,0 +1,77 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Time-keyed join of the message streams of one hour, used by main_code_pvt in
+extract_process_data.py to align NAV-PVT, NAV-POSECEF, NAV-CLOCK and NAV-DOP.
+
+Every file's 'start_time' is parsed once; the epochs of all the streams are merged
+into one sorted time axis, and every value is written to the row of its own epoch.
+An epoch missing from a stream leaves NaN in the fields of that stream (a gap),
+instead of shifting the rest of the hour.
+
+"""
+
+import numpy as np
+
+from processed_io import parse_record_time
+
+
+def file_start_time(content, file_name):
+    """
+    Epoch time of a raw file: its 'start_time', or the time in its name
+    ('2023-09-12 14-00-05.json' -> '2023-09-12 14:00:05') when the key is missing.
+    """
+    if 'start_time' in content:
+        return content['start_time']
+    stem = file_name.rsplit('.', 1)[0]
+    date, _, clock = stem.partition(' ')
+    return '%s %s' % (date, clock.replace('-', ':'))
+
+
+def time_keys(times):
+    """Join keys of 'start_time' strings: int64 milliseconds, or the strings when they cannot be parsed."""
+    parsed = parse_record_time(times)
+    if np.issubdtype(parsed.dtype, np.datetime64):
+        return parsed.astype('datetime64[ms]').astype('int64')
+    return parsed.astype(str)
+
+
+def join_on_time(streams):
+    """
+    Full outer join of message streams on their epoch time.
+
+    :param streams: [(name, fields, times, rows)], fields: names of the values of a file,
+                    times: 'start_time' of every file, rows: field values of every file, same order as times
+    :return: (recordTime, columns, summary)
+             recordTime: sorted 'start_time' strings of all the epochs
+             columns: {field: len(recordTime) values, NaN in the gaps of its stream}
+             summary: {name: {'epochs': files read, 'gaps': epochs missing, 'duplicates': files dropped}}
+    """
+    all_times = [t for name, fields, times, rows in streams for t in times]
+    keys = time_keys(all_times)
+    union, first = np.unique(keys, return_index=True)
+    recordTime = [all_times[i] for i in first]
+
+    columns, summary, start = {}, {}, 0
+    for name, fields, times, rows in streams:
+        index = np.searchsorted(union, keys[start:start + len(times)]).tolist()
+        start += len(times)
+        values = [[float('nan')] * len(union) for _ in fields]
+        for i, row in zip(index, rows):  # a duplicated epoch keeps its last file
+            for column, value in zip(values, row):
+                column[i] = value
+        filled = len(set(index))
+        columns.update(zip(fields, values))
+        summary[name] = {'epochs': len(times), 'gaps': len(union) - filled, 'duplicates': len(times) - filled}
+    return recordTime, columns, summary
+
+
+def format_summary(summary):
+    """One line summary of join_on_time, e.g. 'NAV-PVT 3600 (0 gaps), NAV-DOP 3598 (2 gaps)'."""
+    parts = []
+    for name, counts in summary.items():
+        text = '%s %d (%d gaps' % (name, counts['epochs'], counts['gaps'])
+        if counts['duplicates']:
+            text += ', %d duplicates' % counts['duplicates']
+        parts.append(text + ')')
+    return ', '.join(parts)
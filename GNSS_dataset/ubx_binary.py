@@ -0,0 +1,484 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Extraction of the processed products straight from a binary u-blox log (.ubx, as
+recorded by u-center or any serial logger of the ZED-F9P), without exporting every
+message to one JSON file per second first.
+
+The log is memory-mapped and read in three vectorized passes:
+
+  1. frames: the UBX frames (0xB5 0x62, class, id, length, payload, checksum) are chained
+     from one length field to the next, skipping the NMEA sentences and the garbage between
+     them, and every checksum is verified at once with NumPy; a frame with a bad checksum is
+     dropped and the chain is resumed just after its sync bytes.
+  2. messages: the payloads of one message type are gathered into one structured array
+     (UBX_DTYPES), and their repeated blocks (RXM-RAWX measurements, NAV-SAT satellites,
+     MON-SPAN RF blocks) into a second one with the epoch of every block.
+  3. products: the blocks of a whole hour are scattered at once into observationHH,
+     satelliteInfomationHH, pvtSolutionHH and spectrumHH (ubx_decode.py), with the keys,
+     values and units of extract_process_data.py (scaled fields as exported by pyubx2,
+     e.g. lat in deg, prRes in m, DOPs x 0.01).
+
+The epochs are timed with the receiver's clock, as UTC: RXM-RAWX from rcvTow/week/leapS,
+the NAV messages from their iTOW in the GPS week of the nearest RXM-RAWX or NAV-PVT, and
+MON-SPAN, which carries no time, with the epoch of the navigation message before it. The
+products are written per UTC day and hour to "processed data/<day>/".
+
+USAGE:
+    python ubx_binary.py ../recordings/COM3_230912_140000.ubx --formats npz
+    python ubx_binary.py rooftop.ubx --products rax sat pvt span --days 12 --hours 14 15
+
+"""
+
+import argparse, mmap, os, time
+
+import numpy as np
+
+from accumulator import EpochAccumulator
+from extract_process_data import OBSERVATION_KEYS, PRODUCT_ITEMS, PVT_MESSAGES, SATELLITE_KEYS
+from processed_io import FORMATS, save_product
+from time_join import format_summary
+from ubx_decode import (RAX_COLUMNS, RAX_FIELDS, RAX_WIDTH, VS_WIDTH, rax_layout, scatter_rax,
+                        SAT_COLUMNS, SAT_FIELDS, SAT_FILL, SAT_WIDTH, sat_layout, scatter_sat,
+                        SPAN_BLOCKS, SPAN_FIELDS, span_arrays, span_keys)
+
+SYNC = b'\xb5\x62'
+CHECKSUM_CHUNK = 4096  # frames whose checksums are verified together
+
+GPS_EPOCH_MS = 315964800000  # 1980-01-06 00:00:00 UTC in ms since 1970
+WEEK_MS = 604800000
+GPS_LEAP_SECONDS = 18  # GPS - UTC since 2017, used until an RXM-RAWX gives it
+
+# (class, id) of the messages read from the log
+UBX_IDS = {
+    'RXM-RAWX': (0x02, 0x15),
+    'NAV-SAT': (0x01, 0x35),
+    'NAV-PVT': (0x01, 0x07),
+    'NAV-POSECEF': (0x01, 0x01),
+    'NAV-CLOCK': (0x01, 0x22),
+    'NAV-DOP': (0x01, 0x04),
+    'MON-SPAN': (0x0A, 0x31),
+}
+# payload layouts (UBX protocol, little-endian): fixed part, repeated block, key with the number of blocks
+UBX_DTYPES = {
+    'RXM-RAWX': (np.dtype([('rcvTow', '<f8'), ('week', '<u2'), ('leapS', 'i1'), ('numMeas', 'u1'),
+                           ('recStat', 'u1'), ('version', 'u1'), ('reserved0', '<u2')]),
+                 np.dtype([('prMes', '<f8'), ('cpMes', '<f8'), ('doMes', '<f4'), ('gnssId', 'u1'), ('svId', 'u1'),
+                           ('sigId', 'u1'), ('freqId', 'u1'), ('locktime', '<u2'), ('cno', 'u1'),
+                           ('prStdev', 'u1'), ('cpStdev', 'u1'), ('doStdev', 'u1'), ('trkStat', 'u1'),
+                           ('reserved1', 'u1')]),
+                 'numMeas'),
+    'NAV-SAT': (np.dtype([('iTOW', '<u4'), ('version', 'u1'), ('numSvs', 'u1'), ('reserved0', '<u2')]),
+                np.dtype([('gnssId', 'u1'), ('svId', 'u1'), ('cno', 'u1'), ('elev', 'i1'), ('azim', '<i2'),
+                          ('prRes', '<i2'), ('flags', '<u4')]),
+                'numSvs'),
+    'NAV-PVT': (np.dtype([('iTOW', '<u4'), ('year', '<u2'), ('month', 'u1'), ('day', 'u1'), ('hour', 'u1'),
+                          ('min', 'u1'), ('sec', 'u1'), ('valid', 'u1'), ('tAcc', '<u4'), ('nano', '<i4'),
+                          ('fixType', 'u1'), ('flags', 'u1'), ('flags2', 'u1'), ('numSV', 'u1'),
+                          ('lon', '<i4'), ('lat', '<i4'), ('height', '<i4'), ('hMSL', '<i4'), ('hAcc', '<u4'),
+                          ('vAcc', '<u4'), ('velN', '<i4'), ('velE', '<i4'), ('velD', '<i4'), ('gSpeed', '<i4'),
+                          ('headMot', '<i4'), ('sAcc', '<u4'), ('headAcc', '<u4'), ('pDOP', '<u2'),
+                          ('flags3', '<u2'), ('reserved0', '<u4'), ('headVeh', '<i4'), ('magDec', '<i2'),
+                          ('magAcc', '<u2')]),
+                None, None),
+    'NAV-POSECEF': (np.dtype([('iTOW', '<u4'), ('ecefX', '<i4'), ('ecefY', '<i4'), ('ecefZ', '<i4'),
+                              ('pAcc', '<u4')]),
+                    None, None),
+    'NAV-CLOCK': (np.dtype([('iTOW', '<u4'), ('clkB', '<i4'), ('clkD', '<i4'), ('tAcc', '<u4'), ('fAcc', '<u4')]),
+                  None, None),
+    'NAV-DOP': (np.dtype([('iTOW', '<u4')] + [(name, '<u2') for name in
+                                              ('gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP')]),
+                None, None),
+    'MON-SPAN': (np.dtype([('version', 'u1'), ('numRfBlocks', 'u1'), ('reserved0', '<u2')]),
+                 np.dtype([('spectrum', 'u1', (256,)), ('span', '<u4'), ('res', '<u4'), ('center', '<u4'),
+                           ('pga', 'u1'), ('reserved1', 'u1', (3,))]),
+                 'numRfBlocks'),
+}
+# decimals of the scaled fields (raw integer / 10**decimals), as pyubx2 exports them
+UBX_SCALES = {
+    'NAV-PVT': {'lon': 7, 'lat': 7, 'headMot': 5, 'headAcc': 5, 'pDOP': 2, 'headVeh': 5, 'magDec': 2, 'magAcc': 2},
+    'NAV-DOP': {name: 2 for name in ('gDOP', 'pDOP', 'tDOP', 'vDOP', 'hDOP', 'nDOP', 'eDOP')},
+    'NAV-SAT': {'prRes': 1},
+}
+# fields packed in bitfields: name -> (bitfield, shift, mask)
+UBX_BITS = {
+    'RXM-RAWX': {'prStd': ('prStdev', 0, 0x0F), 'cpStd': ('cpStdev', 0, 0x0F), 'doStd': ('doStdev', 0, 0x0F)},
+    'NAV-SAT': {'qualityInd': ('flags', 0, 0x07), 'svUsed': ('flags', 3, 0x01), 'health': ('flags', 4, 0x03)},
+}
+NAV_MSGS = [msg for msg in UBX_IDS if msg.startswith('NAV-')]
+
+
+def _walk(buf, pos, resume=None):
+    """
+    Follow the chain of frames from pos: (offsets, lengths, stop). The walk stops at the end
+    of the buffer, or at the first offset of resume (stop is then that offset).
+    """
+    offsets, lengths = [], []
+    size = len(buf)
+    pos = buf.find(SYNC, pos)
+    while 0 <= pos <= size - 8:
+        if resume is not None and pos in resume:
+            return offsets, lengths, pos
+        length = buf[pos + 4] | buf[pos + 5] << 8
+        end = pos + 8 + length
+        if end > size:  # truncated frame, or a sync pattern inside NMEA text or garbage
+            pos = buf.find(SYNC, pos + 2)
+            continue
+        offsets.append(pos)
+        lengths.append(length)
+        pos = end if buf[end:end + 2] == SYNC else buf.find(SYNC, end)
+    return offsets, lengths, -1
+
+
+def checksums_ok(data, offsets, lengths):
+    """
+    Verify the 8-bit Fletcher checksums of frames, CHECKSUM_CHUNK frames at a time.
+
+    Over the checksummed bytes b[s..e) (class to end of payload), CK_A = sum(b) and
+    CK_B = sum of the running sums = sum(C[i] - C[s-1]) with C the cumulative sum of the
+    bytes; all of it modulo 256, so C is kept as uint8 and wraps freely.
+
+    :param data: uint8 array of the log
+    :param offsets: [N] offsets of the sync bytes of the frames, increasing
+    :param lengths: [N] payload lengths
+    :return: [N] bool
+    """
+    offsets, lengths = np.asarray(offsets, dtype=np.int64), np.asarray(lengths, dtype=np.int64)
+    ok = np.zeros(len(offsets), dtype=bool)
+    for i in range(0, len(offsets), CHECKSUM_CHUNK):
+        s = offsets[i:i + CHECKSUM_CHUNK] + 2
+        e = s + 4 + lengths[i:i + CHECKSUM_CHUNK]
+        lo = s[0]
+        seg = np.append(data[lo:e[-1]], np.uint8(0))  # reduceat needs every index, even the last end, in range
+        cum = np.cumsum(seg, dtype=np.uint8)
+        bounds = np.column_stack([s - lo, e - lo]).ravel()
+        ck_a = np.add.reduceat(seg, bounds)[::2] % 256
+        before = np.where(s > lo, cum[np.maximum(s - lo - 1, 0)], 0).astype(np.int64)
+        ck_b = (np.add.reduceat(cum, bounds)[::2].astype(np.int64) - (e - s) * before) % 256
+        ok[i:i + CHECKSUM_CHUNK] = (ck_a == data[e]) & (ck_b == data[e + 1])
+    return ok
+
+
+def frame_index(buf, data):
+    """
+    Offsets and payload lengths of the valid UBX frames of a log.
+
+    :param buf: the mapped log (bytes-like with find)
+    :param data: the same log as a uint8 array
+    :return: (offsets, lengths, dropped): int64 arrays, number of frames with a bad checksum
+    """
+    offsets, lengths, _ = _walk(buf, 0)
+    ok = checksums_ok(data, offsets, lengths)
+    dropped = 0
+    while not ok.all():
+        # a bad frame may also have a bad length: walk again from just after its sync bytes
+        # until the chain meets a frame that was already found
+        k = int(np.argmin(ok))
+        dropped += 1
+        rest = {offset: j for j, offset in enumerate(offsets[k + 1:], start=k + 1)}
+        new_offsets, new_lengths, stop = _walk(buf, offsets[k] + 2, rest)
+        j = rest.get(stop, len(offsets))
+        offsets = offsets[:k] + new_offsets + offsets[j:]
+        lengths = lengths[:k] + new_lengths + lengths[j:]
+        ok = np.concatenate([ok[:k], checksums_ok(data, new_offsets, new_lengths), ok[j:]])
+    return np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64), dropped
+
+
+def _gather(data, starts, dtype):
+    """Records of a structured dtype read at the byte offsets starts, as one array."""
+    return data[np.asarray(starts)[:, None] + np.arange(dtype.itemsize)].view(dtype).ravel()
+
+
+def _scaled(msg, records, name):
+    """Field of the decoded records with the scaling and bitfields of the JSON export."""
+    if name in UBX_BITS.get(msg, {}):
+        field, shift, mask = UBX_BITS[msg][name]
+        return (records[field].astype(np.int64) >> shift) & mask
+    values = records[name]
+    decimals = UBX_SCALES.get(msg, {}).get(name)
+    if decimals is not None:
+        return values / 10.0 ** decimals
+    return values.astype(np.int64 if values.dtype.kind in 'iu' else np.float64)
+
+
+def _ffill(values, known):
+    """Values carried forward to the following entries where unknown, backward before the first known one."""
+    index = np.where(known, np.arange(len(values)), -1)
+    np.maximum.accumulate(index, out=index)
+    if known.any():
+        index[index < 0] = np.flatnonzero(known)[0]
+    return values[np.maximum(index, 0)]
+
+
+def _utc_ms(year, month, day, hour, minute, sec):
+    """UTC ms since 1970 of date/time fields, vectorized."""
+    months = (np.asarray(year, dtype=np.int64) - 1970) * 12 + np.asarray(month, dtype=np.int64) - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + np.asarray(day, dtype=np.int64) - 1
+    return ((days * 24 + hour) * 60 + minute) * 60000 + np.asarray(sec, dtype=np.int64) * 1000
+
+
+def time_strings(times_ms):
+    """recordTime strings of UTC ms: '2023-09-12 14:00:00', with milliseconds only when some epochs need them."""
+    unit = 's' if np.all(times_ms % 1000 == 0) else 'ms'
+    text = np.datetime_as_string(np.asarray(times_ms, dtype=np.int64).astype('datetime64[ms]'), unit=unit)
+    return [s.replace('T', ' ') for s in text.tolist()]
+
+
+class UbxLog:
+    """
+    A memory-mapped .ubx log, decoded message by message.
+
+    Example:
+        with UbxLog('rooftop.ubx') as log:
+            pvt = log.records('NAV-PVT')                   # structured array, one record per frame
+            times = log.times('NAV-PVT')                   # int64 UTC ms of every record
+            blocks, epoch = log.blocks('RXM-RAWX')         # all the measurements, and their record
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.data = np.frombuffer(self._map, dtype=np.uint8)
+        self.offsets, self.lengths, self.dropped = frame_index(self._map, self.data)
+        self.kinds = self.data[self.offsets + 2].astype(np.int64) << 8 | self.data[self.offsets + 3]
+        self._records, self._times = {}, None
+
+    def close(self):
+        self.data = None
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def frames(self, msg):
+        """Positions (in self.offsets) of the frames of a message whose length matches its layout."""
+        cls, msg_id = UBX_IDS[msg]
+        fixed, block, count_key = UBX_DTYPES[msg]
+        frames = np.flatnonzero(self.kinds == (cls << 8 | msg_id))
+        frames = frames[self.lengths[frames] >= fixed.itemsize]
+        if block is None:
+            return frames[self.lengths[frames] == fixed.itemsize]
+        counts = _gather(self.data, self.offsets[frames] + 6, fixed)[count_key].astype(np.int64)
+        return frames[self.lengths[frames] == fixed.itemsize + counts * block.itemsize]
+
+    def records(self, msg):
+        """Fixed part of every frame of a message: (frames, structured array)."""
+        if msg not in self._records:
+            frames = self.frames(msg)
+            self._records[msg] = frames, _gather(self.data, self.offsets[frames] + 6, UBX_DTYPES[msg][0])
+        return self._records[msg]
+
+    def blocks(self, msg, select=None):
+        """
+        Repeated blocks of a message.
+
+        :param msg: 'RXM-RAWX', 'NAV-SAT' or 'MON-SPAN'
+        :param select: records (indices into records(msg)) to decode, default all of them
+        :return: (blocks, record): structured array of all the blocks, in frame order, and the
+                 position in select of the record of every block
+        """
+        fixed, block, count_key = UBX_DTYPES[msg]
+        frames, records = self.records(msg)
+        select = np.arange(len(frames)) if select is None else np.asarray(select, dtype=np.int64)
+        counts = records[count_key][select].astype(np.int64)
+        record = np.repeat(np.arange(len(select)), counts)
+        first = np.cumsum(counts) - counts
+        starts = (np.repeat(self.offsets[frames[select]] + 6 + fixed.itemsize, counts)
+                  + (np.arange(len(record)) - np.repeat(first, counts)) * block.itemsize)
+        return _gather(self.data, starts, block), record
+
+    def _frame_times(self):
+        """UTC ms of every frame (-1 when it cannot be dated), see the module docstring."""
+        n = len(self.offsets)
+        gps, leap = np.full(n, -1, dtype=np.int64), np.full(n, GPS_LEAP_SECONDS, dtype=np.int64)
+        has_leap = np.zeros(n, dtype=bool)
+        frames, rawx = self.records('RXM-RAWX')
+        gps[frames] = rawx['week'].astype(np.int64) * WEEK_MS + np.round(rawx['rcvTow'] * 1000).astype(np.int64)
+        valid_leap = (rawx['recStat'] & 0x01).astype(bool)
+        leap[frames[valid_leap]] = rawx['leapS'][valid_leap]
+        has_leap[frames[valid_leap]] = True
+        leap = _ffill(leap, has_leap) if has_leap.any() else leap
+        frames_pvt, pvt = self.records('NAV-PVT')
+        dated = (pvt['valid'] & 0x03) == 0x03  # validDate and validTime
+        utc = _utc_ms(pvt['year'], pvt['month'], pvt['day'], pvt['hour'], pvt['min'], pvt['sec'])
+        gps[frames_pvt[dated]] = utc[dated] - GPS_EPOCH_MS + leap[frames_pvt[dated]] * 1000
+        if not (gps >= 0).any():
+            raise ValueError('%s: no RXM-RAWX or dated NAV-PVT to find the GPS week' % self.path)
+        reference = _ffill(gps, gps >= 0)
+
+        utc = np.full(n, -1, dtype=np.int64)
+        utc[frames] = gps[frames] - leap[frames] * 1000 + GPS_EPOCH_MS
+        for msg in NAV_MSGS:
+            frames, records = self.records(msg)
+            iTOW = records['iTOW'].astype(np.int64)
+            week = np.round((reference[frames] - iTOW) / WEEK_MS).astype(np.int64)
+            utc[frames] = week * WEEK_MS + iTOW - leap[frames] * 1000 + GPS_EPOCH_MS
+        # messages without time (MON-SPAN) follow the epoch before them
+        return _ffill(utc, utc >= 0)
+
+    def times(self, msg):
+        """UTC ms (int64) of every record of a message."""
+        if self._times is None:
+            self._times = self._frame_times()
+        return self._times[self.records(msg)[0]]
+
+    def hours(self, msg, days=None, hours=None):
+        """
+        Records of a message grouped by UTC day of the month and hour, in time order.
+
+        :return: {(day, hour): record positions}
+        """
+        times = self.times(msg)
+        order = np.argsort(times, kind='stable')
+        date = times[order].astype('datetime64[ms]').astype('datetime64[D]')
+        day = (date - date.astype('datetime64[M]')).astype(np.int64) + 1
+        hour = (times[order] // 3600000) % 24
+        groups = {}
+        for key in sorted(set(zip(day.tolist(), hour.tolist()))):
+            if (days is None or key[0] in days) and (hours is None or key[1] in hours):
+                groups[key] = order[(day == key[0]) & (hour == key[1])]
+        return groups
+
+    def summary(self):
+        """Number of frames of every message, e.g. {'RXM-RAWX': 3600, ..., 'other': 12, 'bad checksum': 0}."""
+        counts = {msg: len(self.records(msg)[0]) for msg in UBX_IDS}
+        counts['other'] = len(self.offsets) - sum(counts.values())
+        counts['bad checksum'] = self.dropped
+        return counts
+
+
+def _block_columns(msg, blocks, columns):
+    """(columns, blocks) float array of the block fields, as decode_columns() returns them for a JSON epoch."""
+    if not len(blocks):
+        return np.zeros((len(columns), 0))
+    return np.vstack([_scaled(msg, blocks, column) for column in columns]).astype(float)
+
+
+def rax_hour(log, select):
+    """observationHH content of the RXM-RAWX records select (in time order)."""
+    blocks, record = log.blocks('RXM-RAWX', select)
+    acc = EpochAccumulator(len(select))
+    acc.add_block('vs', rax_layout(), 1, VS_WIDTH)
+    acc.add_block('obs', rax_layout(), len(RAX_FIELDS), RAX_WIDTH)
+    scatter_rax(_block_columns('RXM-RAWX', blocks, RAX_COLUMNS), acc.block_rows('obs', len(select)),
+                acc.block_rows('vs', len(select))[:, 0], epochs=record)
+    recordTime = time_strings(log.times('RXM-RAWX')[select])
+    return dict(zip(OBSERVATION_KEYS, [recordTime] + [acc.get(key) for key in OBSERVATION_KEYS[1:]]))
+
+
+def sat_hour(log, select):
+    """satelliteInfomationHH content of the NAV-SAT records select (in time order)."""
+    blocks, record = log.blocks('NAV-SAT', select)
+    acc = EpochAccumulator(len(select))
+    acc.add_block('sat', sat_layout(), len(SAT_FIELDS), SAT_WIDTH, fill=[SAT_FILL.get(field, 0.0) for field in SAT_FIELDS])
+    scatter_sat(_block_columns('NAV-SAT', blocks, SAT_COLUMNS), acc.block_rows('sat', len(select)), epochs=record)
+    recordTime = time_strings(log.times('NAV-SAT')[select])
+    numSvs = log.records('NAV-SAT')[1]['numSvs'][select].astype(np.int64)
+    return dict(zip(SATELLITE_KEYS, [recordTime, numSvs] + [acc.get(key) for key in SATELLITE_KEYS[2:]]))
+
+
+def pvt_hour(log, selects):
+    """
+    pvtSolutionHH content of the NAV-PVT, NAV-POSECEF, NAV-CLOCK and NAV-DOP records of one hour,
+    joined on their time as time_join.join_on_time does: NaN in the gaps of a message, the last
+    record of a duplicated epoch.
+
+    :param selects: {msg: record positions} of the hour
+    :return: (content, summary) with the summary of join_on_time
+    """
+    none = np.zeros(0, dtype=np.int64)
+    times = {msg: log.times(msg)[selects.get(msg, none)] for msg, fields in PVT_MESSAGES}
+    union = np.unique(np.concatenate(list(times.values())))
+    content, summary = {'recordTime': time_strings(union)}, {}
+    for msg, fields in PVT_MESSAGES:
+        index = np.searchsorted(union, times[msg])
+        records = log.records(msg)[1][selects.get(msg, none)]
+        filled = len(np.unique(index))
+        for field in fields:
+            values = _scaled(msg, records, field)
+            column = np.full(len(union), np.nan) if filled < len(union) else np.empty(len(union), dtype=values.dtype)
+            column[index] = values
+            content[field] = column
+        summary[msg] = {'epochs': len(index), 'gaps': len(union) - filled, 'duplicates': len(index) - filled}
+    return content, summary
+
+
+def span_hour(log, select):
+    """spectrumHH content of the MON-SPAN records select (in time order)."""
+    blocks, record = log.blocks('MON-SPAN', select)
+    arrays = span_arrays(len(select))
+    numRfBlocks = log.records('MON-SPAN')[1]['numRfBlocks'][select]
+    arrays['numRfBlocks'][:] = numRfBlocks
+    first = np.cumsum(numRfBlocks.astype(np.int64)) - numRfBlocks
+    number = np.arange(len(record)) - first[record] + 1  # 1-based RF block of every block
+    for block in range(1, SPAN_BLOCKS + 1):
+        rows = number == block
+        for field in ['spectrum'] + SPAN_FIELDS:
+            arrays['%s_%d' % (field, block)][record[rows]] = blocks[field][rows]
+    recordTime = time_strings(log.times('MON-SPAN')[select])
+    return dict(zip(['recordTime'] + span_keys(), [recordTime] + [arrays[key] for key in span_keys()]))
+
+
+# messages read by every product, as PRODUCT_MESSAGES in extract_process_data.py
+PRODUCT_MSG = {'rax': 'RXM-RAWX', 'sat': 'NAV-SAT', 'span': 'MON-SPAN'}
+HOUR_BUILDERS = {'rax': rax_hour, 'sat': sat_hour, 'span': span_hour}
+
+
+def extract_ubx(path, products=('rax', 'sat', 'pvt'), formats=('json',), days=None, hours=None, verbose=True):
+    """
+    Write the processed hours of a binary UBX log.
+
+    :param path: .ubx file
+    :param products: any of 'rax', 'sat', 'pvt', 'span' (see extract_process_data.PRODUCTS)
+    :param formats: output formats, any of 'json', 'npz' and 'spz'
+    :param days: days of the month to write, default all the days of the log
+    :param hours: hours to write, default all the hours of the log
+    :param verbose: print the frames found and every file written
+    :return: list of the written paths
+    """
+    paths = []
+    with UbxLog(path) as log:
+        if verbose:
+            print('%s: %s' % (path, ', '.join('%s %d' % item for item in log.summary().items())))
+        for product in products:
+            if product == 'pvt':
+                groups = {msg: log.hours(msg, days, hours) for msg, fields in PVT_MESSAGES}
+                for day, hour in sorted(set().union(*groups.values())):
+                    content, summary = pvt_hour(log, {msg: g[(day, hour)] for msg, g in groups.items()
+                                                      if (day, hour) in g})
+                    if verbose or any(counts['gaps'] for counts in summary.values()):
+                        print('pvt day=%s hour=%s: %d epochs, %s' % (day, hour, len(content['recordTime']),
+                                                                     format_summary(summary)))
+                    paths += save_product(day, hour, PRODUCT_ITEMS[product], content, formats)
+                continue
+            for (day, hour), select in log.hours(PRODUCT_MSG[product], days, hours).items():
+                paths += save_product(day, hour, PRODUCT_ITEMS[product], HOUR_BUILDERS[product](log, select), formats)
+                if verbose:
+                    print('%s day=%s hour=%s: %d epochs' % (product, day, hour, len(select)))
+    return paths
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Extract the processed products straight from binary UBX logs.')
+    parser.add_argument('logs', nargs='+', help='.ubx file(s)')
+    parser.add_argument('--products', nargs='+', choices=sorted(PRODUCT_ITEMS), default=['rax', 'sat', 'pvt'])
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['json'], help='output format(s) of the processed files')
+    parser.add_argument('--days', type=int, nargs='+', default=None, help='UTC day(s) of the month to write, default all')
+    parser.add_argument('--hours', type=int, nargs='+', default=None, help='UTC hour(s) to write, default all')
+    parser.add_argument('--quiet', action='store_true')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    for log_path in args.logs:
+        t0 = time.perf_counter()
+        written = extract_ubx(log_path, args.products, args.formats, args.days, args.hours, verbose=not args.quiet)
+        print('[OK] %s: %d files in %.1f s' % (log_path, len(written), time.perf_counter() - t0))
@@ -0,0 +1,222 @@
+"""
+
+Please place this script into the folder "./GNSS dataset/"
+Single-pass decoder of the RXM-RAWX, NAV-SAT and MON-SPAN JSON files used by extract_process_data.py.
+
+The raw JSON files store the repeated blocks of a message as flattened keys
+('gnssId_01', 'svId_01', ..., 'gnssId_10', ...). An epoch is decoded once into
+a (columns, measurements) array, and every measurement is given its position in
+a row where all constellations and bands sit side by side. One fancy-indexing
+assignment then scatters all the fields of the epoch at once.
+
+"""
+
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+# constellations of observationHH.json: (key letter, gnssId, number of satellites, sigId of the 2nd band)
+RAX_CONSTELLATIONS = [('G', 0, 32, 3), ('E', 2, 36, 6), ('B', 3, 63, 2), ('Q', 5, 10, 5), ('R', 6, 33, 2)]
+# observation fields, RAX_NAMES gives the RXM-RAWX name of those named differently
+RAX_FIELDS = ['cn0', 'prMes', 'cpMes', 'doMes', 'prStd', 'cpStd', 'doStd']
+RAX_NAMES = {'cn0': 'cno'}
+# repeated RXM-RAWX block columns needed by observationHH.json
+RAX_COLUMNS = ['gnssId', 'svId', 'sigId'] + [RAX_NAMES.get(field, field) for field in RAX_FIELDS]
+
+# constellations of satelliteInfomationHH.json: (key letter, gnssId, number of satellites)
+SAT_CONSTELLATIONS = [('G', 0, 32), ('E', 2, 36), ('B', 3, 63), ('Q', 5, 10), ('R', 6, 33)]
+# satellites information fields, all with the same name in NAV-SAT
+SAT_FIELDS = ['svId', 'svUsed', 'cno', 'elev', 'azim', 'prRes', 'qualityInd', 'health']
+# value of the satellites that are not received, for the fields where 0 is meaningful
+SAT_FILL = {'svUsed': 0.11, 'qualityInd': 0.11, 'health': 0.11}
+# repeated NAV-SAT block columns needed by satelliteInfomationHH.json
+SAT_COLUMNS = ['gnssId'] + SAT_FIELDS
+
+# MON-SPAN: RF blocks kept in spectrumHH.json (2 on the ZED-F9P), bins of every spectrum (U1, dB),
+# scalar fields of every block (center, span and resolution in Hz, PGA gain in dB) and their types
+SPAN_BLOCKS = 2
+SPAN_BINS = 256
+SPAN_FIELDS = ['center', 'span', 'res', 'pga']
+SPAN_DTYPES = {'spectrum': np.uint8, 'center': np.int64, 'span': np.int64, 'res': np.int64, 'pga': np.int16}
+
+NUM_GNSS_IDS = 256  # gnssId is a U1 in the UBX protocol
+
+
+def _layout(widths):
+    """Return the offset of every (name, width) segment of a row and the row width."""
+    offsets, width = {}, 0
+    for name, numSats in widths:
+        offsets[name] = width
+        width += numSats
+    return offsets, width
+
+
+# position of every constellation (VS, NAV-SAT fields) and constellation/band (observations) in a row
+VS_OFFSETS, VS_WIDTH = _layout([(const, numSats) for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS])
+RAX_OFFSETS, RAX_WIDTH = _layout([(const + band, numSats) for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS
+                                  for band in ('1', '2')])
+SAT_OFFSETS, SAT_WIDTH = _layout([(const, numSats) for const, gnssId, numSats in SAT_CONSTELLATIONS])
+
+
+def _gnss_table(constellations, values):
+    """Lookup array gnssId -> value of its constellation (-1 for the constellations not extracted)."""
+    table = np.full(NUM_GNSS_IDS, -1, dtype=int)
+    for constellation, value in zip(constellations, values):
+        table[constellation[1]] = value
+    return table
+
+
+_RAX_NUMSATS = _gnss_table(RAX_CONSTELLATIONS, [c[2] for c in RAX_CONSTELLATIONS])
+_RAX_SIGID2 = _gnss_table(RAX_CONSTELLATIONS, [c[3] for c in RAX_CONSTELLATIONS])
+_RAX_VS_OFFSET = _gnss_table(RAX_CONSTELLATIONS, [VS_OFFSETS[c[0]] for c in RAX_CONSTELLATIONS])
+_RAX_BAND1_OFFSET = _gnss_table(RAX_CONSTELLATIONS, [RAX_OFFSETS[c[0] + '1'] for c in RAX_CONSTELLATIONS])
+_RAX_BAND2_OFFSET = _gnss_table(RAX_CONSTELLATIONS, [RAX_OFFSETS[c[0] + '2'] for c in RAX_CONSTELLATIONS])
+_SAT_NUMSATS = _gnss_table(SAT_CONSTELLATIONS, [c[2] for c in SAT_CONSTELLATIONS])
+_SAT_OFFSET = _gnss_table(SAT_CONSTELLATIONS, [SAT_OFFSETS[c[0]] for c in SAT_CONSTELLATIONS])
+
+
+def rax_layout():
+    """
+    Field views of the observation blocks: [(output key, block, plane, offset, numSats)],
+    e.g. ('cn0_G1', 'obs', 0, 0, 32) or ('VSG', 'vs', 0, 0, 32).
+    """
+    layout = [('VS%s' % const, 'vs', 0, VS_OFFSETS[const], numSats)
+              for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS]
+    for const, gnssId, numSats, sigId2 in RAX_CONSTELLATIONS:
+        for band in ('1', '2'):
+            layout += [('%s_%s%s' % (field, const, band), 'obs', plane, RAX_OFFSETS[const + band], numSats)
+                       for plane, field in enumerate(RAX_FIELDS)]
+    return layout
+
+
+def sat_layout():
+    """Field views of the satellites information block: [(output key, block, plane, offset, numSats)]."""
+    return [('%s_%s' % (field, const), 'sat', plane, SAT_OFFSETS[const], numSats)
+            for const, gnssId, numSats in SAT_CONSTELLATIONS
+            for plane, field in enumerate(SAT_FIELDS)]
+
+
+def block_keys(columns, num):
+    """Return the flattened keys of the repeated columns, e.g. ['svId_01', ..., 'svId_num', 'cno_01', ...]."""
+    return ['%s_%02d' % (column, i) for column in columns for i in range(1, num + 1)]
+
+
+@lru_cache(maxsize=None)
+def _block_getter(columns, num):
+    """itemgetter of the flattened keys, built once per (columns, number of blocks)."""
+    return itemgetter(*block_keys(columns, num))
+
+
+def decode_columns(content, count_key, columns):
+    """
+    Decode the repeated blocks of one epoch into column arrays.
+
+    :param content: json file content opened by python
+    :param count_key: key with the number of blocks, 'numMeas' (RXM-RAWX) or 'numSvs' (NAV-SAT)
+    :param columns: names of the repeated fields to decode, e.g. RAX_COLUMNS
+    :return: float array of shape (len(columns), content[count_key]), one row per column
+    """
+    num = content[count_key]
+    if num == 0:
+        return np.zeros((len(columns), 0))
+    return np.array(_block_getter(tuple(columns), num)(content), dtype=float).reshape(len(columns), num)
+
+
+def _sat_index(svId, numSats):
+    """
+    Column of every satellite in its numSats-wide segment (svId - 1). Out-of-range
+    identifiers go to the last column, as the original per-file loops did.
+    """
+    isvId = svId.astype(int) - 1
+    return np.where((isvId < 0) | (isvId >= numSats), numSats - 1, isvId)
+
+
+def scatter_rax(cols, obs_row, vs_row, epochs=None):
+    """
+    Scatter the decoded RXM-RAWX columns of one epoch into the observation rows.
+    Measurements of other constellations or signals are ignored; when a satellite
+    appears twice, the last measurement wins.
+
+    :param cols: columns returned by decode_columns(content, 'numMeas', RAX_COLUMNS)
+    :param obs_row: (len(RAX_FIELDS), RAX_WIDTH) row of the epoch, laid out as rax_layout()
+    :param vs_row: (VS_WIDTH,) row of the visible satellites of the epoch
+    :param epochs: row of every measurement when cols holds the measurements of several epochs
+                   (ubx_binary.py); obs_row and vs_row are then the (epochs, len(RAX_FIELDS), RAX_WIDTH)
+                   and (epochs, VS_WIDTH) arrays of all those epochs
+    """
+    gnssId = cols[0].astype(int) % NUM_GNSS_IDS
+    numSats = _RAX_NUMSATS[gnssId]
+    known = numSats > 0
+    gnssId, numSats, cols = gnssId[known], numSats[known], cols[:, known]
+    svId, sigId = cols[1], cols[2]
+    isvId = _sat_index(svId, numSats)
+    # 1st band is sigId 0, 2nd band is sigId2, other signals are ignored
+    band1 = sigId == 0
+    used = band1 | (sigId == _RAX_SIGID2[gnssId])
+    pos = np.where(band1, _RAX_BAND1_OFFSET[gnssId], _RAX_BAND2_OFFSET[gnssId]) + isvId
+    if epochs is None:
+        vs_row[_RAX_VS_OFFSET[gnssId] + isvId] = svId
+        obs_row[:, pos[used]] = cols[3:, used]
+    else:
+        epochs = epochs[known]
+        vs_row[epochs, _RAX_VS_OFFSET[gnssId] + isvId] = svId
+        obs_row[epochs[used], :, pos[used]] = cols[3:, used].T
+
+
+def scatter_sat(cols, sat_row, epochs=None):
+    """
+    Scatter the decoded NAV-SAT columns of one epoch into the satellites information row.
+
+    :param cols: columns returned by decode_columns(content, 'numSvs', SAT_COLUMNS)
+    :param sat_row: (len(SAT_FIELDS), SAT_WIDTH) row of the epoch, laid out as sat_layout()
+    :param epochs: row of every satellite when cols holds several epochs; sat_row is then the
+                   (epochs, len(SAT_FIELDS), SAT_WIDTH) array of all those epochs
+    """
+    gnssId = cols[0].astype(int) % NUM_GNSS_IDS
+    numSats = _SAT_NUMSATS[gnssId]
+    known = numSats > 0
+    pos = _SAT_OFFSET[gnssId[known]] + _sat_index(cols[1, known], numSats[known])
+    if epochs is None:
+        sat_row[:, pos] = cols[1:, known]
+    else:
+        sat_row[epochs[known], :, pos] = cols[1:, known].T
+
+
+def span_keys():
+    """Keys of spectrumHH.json after 'recordTime': numRfBlocks, spectrum_1, center_1, span_1, res_1, pga_1, spectrum_2, ..."""
+    return ['numRfBlocks'] + ['%s_%d' % (field, block) for block in range(1, SPAN_BLOCKS + 1)
+                              for field in ['spectrum'] + SPAN_FIELDS]
+
+
+def span_arrays(numEpochs):
+    """Zeroed spectrumHH arrays of numEpochs epochs: key -> array, (epochs, SPAN_BINS) uint8 for the spectra."""
+    arrays = {'numRfBlocks': np.zeros(numEpochs, dtype=np.uint8)}
+    for key in span_keys()[1:]:
+        field = key.rsplit('_', 1)[0]
+        shape = (numEpochs, SPAN_BINS) if field == 'spectrum' else (numEpochs,)
+        arrays[key] = np.zeros(shape, dtype=SPAN_DTYPES[field])
+    return arrays
+
+
+def scatter_span(content, arrays, t):
+    """
+    Copy the RF blocks of one MON-SPAN epoch into row t of span_arrays(). The spectrum of
+    a block is read from 'spectrum_01' (list of the bins) or, when the export flattens it
+    too, from 'spectrum_01_001' ... 'spectrum_01_256'. Blocks beyond SPAN_BLOCKS are
+    ignored and absent blocks stay 0.
+
+    :param content: json file content opened by python
+    :param arrays: span_arrays() of the chunk
+    :param t: row of the epoch
+    """
+    numRfBlocks = int(content.get('numRfBlocks', 0))
+    arrays['numRfBlocks'][t] = numRfBlocks
+    for block in range(1, min(numRfBlocks, SPAN_BLOCKS) + 1):
+        spectrum = content.get('spectrum_%02d' % block)
+        if spectrum is None:
+            spectrum = [content['spectrum_%02d_%03d' % (block, i)] for i in range(1, SPAN_BINS + 1)]
+        spectrum = np.asarray(spectrum)[:SPAN_BINS]
+        arrays['spectrum_%d' % block][t, :len(spectrum)] = spectrum
+        for field in SPAN_FIELDS:
+            arrays['%s_%d' % (field, block)][t] = content['%s_%02d' % (field, block)]
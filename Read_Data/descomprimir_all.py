@@ -10,6 +10,8 @@ import bz2
 import lzma
 import shutil
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Intento opcional de soporte 7z
 try:
@@ -24,6 +26,9 @@ ZIP_EXTS = (".zip",)
 SEVENZ_EXTS = (".7z",)
 SINGLE_FILE_EXTS = (".gz", ".bz2", ".xz")  # Solo cuando NO son .tar.*
 
+# Filtro de seguridad de tarfile (Python >= 3.11.4 / 3.12) además de la validación propia
+TAR_FILTER = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
 def _normalize_case_suffixes(name: str) -> str:
     """Normaliza a minúsculas solo para comparación por sufijos."""
     return name.lower()
@@ -63,61 +68,118 @@ def _safe_join(base_dir: Path, target_path: str) -> Path:
         raise RuntimeError(f"Extracción insegura detectada: {target_path}")
     return dest
 
-def _safe_extract_tar(tar: tarfile.TarFile, path: Path) -> None:
-    for member in tar.getmembers():
+def _safe_extract_tar(tar: tarfile.TarFile, path: Path) -> tuple[int, int]:
+    """
+    Valida y extrae cada miembro en una sola pasada del stream (tar abierto con "r|*"),
+    sin leer dos veces un .tar.gz. Devuelve (archivos, bytes descomprimidos).
+    """
+    files = nbytes = 0
+    for member in tar:
         _safe_join(path, member.name)  # valida
-    tar.extractall(path)
+        if member.issym():
+            _safe_join(path, os.path.join(os.path.dirname(member.name), member.linkname))
+        elif member.islnk():
+            _safe_join(path, member.linkname)
+        tar.extract(member, path, **TAR_FILTER)
+        if member.isfile():
+            files += 1
+            nbytes += member.size
+    return files, nbytes
 
-def _safe_extract_zip(zf: zipfile.ZipFile, path: Path) -> None:
-    for member in zf.namelist():
-        _safe_join(path, member)
-    zf.extractall(path)
+def _safe_extract_zip(zf: zipfile.ZipFile, path: Path, members: list[zipfile.ZipInfo] | None = None) -> tuple[int, int]:
+    """Valida y extrae los miembros indicados (todos por defecto). Devuelve (archivos, bytes descomprimidos)."""
+    members = zf.infolist() if members is None else members
+    for member in members:
+        _safe_join(path, member.filename)
+    files = nbytes = 0
+    for member in members:
+        zf.extract(member, path)
+        if not member.is_dir():
+            files += 1
+            nbytes += member.file_size
+    return files, nbytes
 
-def extract_archive(archive_path: Path, overwrite: bool = False, delete_archive: bool = False) -> str:
+def _extract_zip_part(archive_path: Path, out_dir: Path, names: list[str]) -> tuple[int, int]:
+    """Extrae una parte de los miembros de un zip (un trabajo de --jobs)."""
+    with zipfile.ZipFile(archive_path, "r") as zf:
+        return _safe_extract_zip(zf, out_dir, [zf.getinfo(name) for name in names])
+
+def _rate(files: int, nbytes: int, elapsed: float) -> str:
+    elapsed = max(elapsed, 1e-9)
+    return (f"{files} archivo(s), {nbytes / 1e6:.1f} MB en {elapsed:.1f} s "
+            f"({nbytes / 1e6 / elapsed:.1f} MB/s, {files / elapsed:.0f} archivos/s)")
+
+def _split_zip(zf: zipfile.ZipFile, out_dir: Path, jobs: int) -> list[list[str]]:
     """
-    Extrae un archivo comprimido:
-      - zip / tar.* → carpeta con mismo nombre del archivo (sin extensión).
-      - .gz/.bz2/.xz (no tar) → archivo descomprimido en mismo directorio.
+    Reparte los archivos de un zip en `jobs` partes de tamaño parecido. Las carpetas se
+    crean antes, para que los procesos no compitan al crear las mismas.
+    """
+    members = zf.infolist()
+    for member in members:
+        _safe_join(out_dir, member.filename)  # valida todo antes de escribir nada
+    folders = {(out_dir / m.filename).parent for m in members} | {out_dir / m.filename for m in members if m.is_dir()}
+    for folder in sorted(folders):
+        folder.mkdir(parents=True, exist_ok=True)
+    parts: list[list[str]] = [[] for _ in range(jobs)]
+    files = sorted((m for m in members if not m.is_dir()), key=lambda m: m.compress_size, reverse=True)
+    for i, member in enumerate(files):
+        parts[i % jobs].append(member.filename)
+    return [part for part in parts if part]
+
+def _extract_archive(archive_path: Path, overwrite: bool = False, delete_archive: bool = False,
+                     pool: ProcessPoolExecutor | None = None, jobs: int = 1) -> tuple[str, int, int]:
+    """
+    Igual que extract_archive, devolviendo además (archivos, bytes descomprimidos).
+    Con `pool`, los miembros de un zip se reparten en `jobs` trabajos.
     """
     archive_path = archive_path.resolve()
     if not archive_path.is_file():
-        return f"[SKIP] No es archivo: {archive_path}"
+        return f"[SKIP] No es archivo: {archive_path}", 0, 0
 
+    t0 = time.perf_counter()
     try:
         if _is_tar_archive(archive_path):
             out_dir = archive_path.with_name(_base_name_without_archive_suffix(archive_path))
             if out_dir.exists() and not overwrite:
-                return f"[SKIP] Carpeta destino ya existe: {out_dir}"
+                return f"[SKIP] Carpeta destino ya existe: {out_dir}", 0, 0
             out_dir.mkdir(parents=True, exist_ok=True)
-            with tarfile.open(archive_path, mode="r:*") as tf:
-                _safe_extract_tar(tf, out_dir)
+            with tarfile.open(archive_path, mode="r|*") as tf:  # stream: se lee una sola vez
+                files, nbytes = _safe_extract_tar(tf, out_dir)
             msg = f"[OK] TAR extraído en: {out_dir}"
 
         elif _is_zip_archive(archive_path):
             out_dir = archive_path.with_name(_base_name_without_archive_suffix(archive_path))
             if out_dir.exists() and not overwrite:
-                return f"[SKIP] Carpeta destino ya existe: {out_dir}"
+                return f"[SKIP] Carpeta destino ya existe: {out_dir}", 0, 0
             out_dir.mkdir(parents=True, exist_ok=True)
             with zipfile.ZipFile(archive_path, "r") as zf:
-                _safe_extract_zip(zf, out_dir)
+                if pool is None or jobs <= 1:
+                    files, nbytes = _safe_extract_zip(zf, out_dir)
+                else:
+                    parts = _split_zip(zf, out_dir, jobs)
+                    results = [f.result() for f in [pool.submit(_extract_zip_part, archive_path, out_dir, part)
+                                                    for part in parts]]
+                    files, nbytes = sum(r[0] for r in results), sum(r[1] for r in results)
             msg = f"[OK] ZIP extraído en: {out_dir}"
 
         elif _is_7z_archive(archive_path):
             if not HAS_PY7ZR:
-                return f"[WARN] .7z detectado pero 'py7zr' no está instalado: {archive_path}"
+                return f"[WARN] .7z detectado pero 'py7zr' no está instalado: {archive_path}", 0, 0
             out_dir = archive_path.with_name(_base_name_without_archive_suffix(archive_path))
             if out_dir.exists() and not overwrite:
-                return f"[SKIP] Carpeta destino ya existe: {out_dir}"
+                return f"[SKIP] Carpeta destino ya existe: {out_dir}", 0, 0
             out_dir.mkdir(parents=True, exist_ok=True)
             with py7zr.SevenZipFile(archive_path, mode="r") as z:
+                infos = [info for info in z.list() if not info.is_directory]
                 z.extractall(path=str(out_dir))
+            files, nbytes = len(infos), sum(info.uncompressed for info in infos)
             msg = f"[OK] 7z extraído en: {out_dir}"
 
         elif _is_single_file_compressed(archive_path):
             # .gz/.bz2/.xz → un solo archivo descomprimido
             dest = archive_path.with_suffix("")  # quita último sufijo
             if dest.exists() and not overwrite:
-                return f"[SKIP] Archivo destino ya existe: {dest}"
+                return f"[SKIP] Archivo destino ya existe: {dest}", 0, 0
 
             if archive_path.suffix.lower() == ".gz":
                 opener = gzip.open
@@ -126,15 +188,17 @@ def extract_archive(archive_path: Path, overwrite: bool = False, delete_archive:
             elif archive_path.suffix.lower() == ".xz":
                 opener = lzma.open
             else:
-                return f"[SKIP] Formato no reconocido: {archive_path.suffix}"
+                return f"[SKIP] Formato no reconocido: {archive_path.suffix}", 0, 0
 
             with opener(archive_path, "rb") as f_in, open(dest, "wb") as f_out:
                 shutil.copyfileobj(f_in, f_out)
+            files, nbytes = 1, dest.stat().st_size
             msg = f"[OK] Archivo descomprimido: {dest}"
 
         else:
-            return f"[SKIP] No es un archivo comprimido soportado: {archive_path.name}"
+            return f"[SKIP] No es un archivo comprimido soportado: {archive_path.name}", 0, 0
 
+        msg += f" — {_rate(files, nbytes, time.perf_counter() - t0)}"
         if delete_archive:
             try:
                 os.remove(archive_path)
@@ -142,12 +206,25 @@ def extract_archive(archive_path: Path, overwrite: bool = False, delete_archive:
             except Exception as e:
                 msg += f" (no se pudo eliminar origen: {e})"
 
-        return msg
+        return msg, files, nbytes
 
     except Exception as e:
-        return f"[ERR] {archive_path.name}: {e}"
+        return f"[ERR] {archive_path.name}: {e}", 0, 0
 
-def decompress_all(root: Path, recursive: bool = True, overwrite: bool = False, delete_archive: bool = False) -> None:
+def extract_archive(archive_path: Path, overwrite: bool = False, delete_archive: bool = False) -> str:
+    """
+    Extrae un archivo comprimido:
+      - zip / tar.* → carpeta con mismo nombre del archivo (sin extensión).
+      - .gz/.bz2/.xz (no tar) → archivo descomprimido en mismo directorio.
+    """
+    return _extract_archive(archive_path, overwrite, delete_archive)[0]
+
+def decompress_all(root: Path, recursive: bool = True, overwrite: bool = False, delete_archive: bool = False,
+                   jobs: int = 1) -> None:
+    """
+    Descomprime todos los archivos encontrados en root. Con jobs > 1 los archivos se
+    descomprimen en paralelo, y los miembros de cada zip se reparten entre los procesos.
+    """
     root = root.resolve()
     if not root.exists():
         print(f"[ERR] Ruta no existe: {root}", file=sys.stderr)
@@ -170,9 +247,30 @@ def decompress_all(root: Path, recursive: bool = True, overwrite: bool = False,
         print("[INFO] No se encontraron archivos comprimidos.")
         return
 
-    print(f"[INFO] Encontrados {len(targets)} archivo(s) comprimido(s).")
-    for p in sorted(targets):
-        print(extract_archive(p, overwrite=overwrite, delete_archive=delete_archive))
+    print(f"[INFO] Encontrados {len(targets)} archivo(s) comprimido(s), {jobs} proceso(s).")
+    t0 = time.perf_counter()
+    total_files = total_bytes = 0
+    if jobs <= 1:
+        for p in sorted(targets):
+            msg, n, nbytes = _extract_archive(p, overwrite=overwrite, delete_archive=delete_archive)
+            print(msg)
+            total_files, total_bytes = total_files + n, total_bytes + nbytes
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # tar, 7z y archivos simples: un trabajo por archivo
+            futures = [pool.submit(_extract_archive, p, overwrite, delete_archive)
+                       for p in sorted(targets) if not _is_zip_archive(p)]
+            # zip: los miembros se reparten entre los procesos
+            for p in sorted(targets):
+                if _is_zip_archive(p):
+                    msg, n, nbytes = _extract_archive(p, overwrite, delete_archive, pool=pool, jobs=jobs)
+                    print(msg)
+                    total_files, total_bytes = total_files + n, total_bytes + nbytes
+            for future in futures:
+                msg, n, nbytes = future.result()
+                print(msg)
+                total_files, total_bytes = total_files + n, total_bytes + nbytes
+    print(f"[INFO] Total: {_rate(total_files, total_bytes, time.perf_counter() - t0)}")
 
 def parse_args():
     ap = argparse.ArgumentParser(
@@ -182,6 +280,7 @@ def parse_args():
     ap.add_argument("--no-recursive", action="store_true", help="No buscar recursivamente en subcarpetas.")
     ap.add_argument("--overwrite", action="store_true", help="Sobrescribir si el destino ya existe.")
     ap.add_argument("--delete-archive", action="store_true", help="Eliminar el archivo comprimido después de extraer.")
+    ap.add_argument("--jobs", type=int, default=1, help="Procesos en paralelo (0 = todos los CPUs).")
     return ap.parse_args()
 
 if __name__ == "__main__":
@@ -191,6 +290,7 @@ if __name__ == "__main__":
         recursive=not args.no_recursive,
         overwrite=args.overwrite,
         delete_archive=args.delete_archive,
+        jobs=args.jobs or os.cpu_count() or 1,
     )
 
 